@@ -1,10 +1,20 @@
 from django.conf import settings
-from django.contrib.auth.models import AbstractUser
+from django.contrib.auth.models import AbstractUser, UserManager
 from django.db import models
+from django.db.models import Case, F, Value, When
 from django.db.models.signals import post_save
 from django.dispatch import receiver
 from django.utils import timezone
 
+from .signals import user_leveled_up
+
+
+class CustomUserManager(UserManager):
+    """Hide soft-deleted users (``CustomUser.all_objects`` still returns them for the purge)."""
+
+    def get_queryset(self):
+        return super().get_queryset().filter(deleted_at__isnull=True)
+
 
 class CustomUser(AbstractUser):
     user_id = models.AutoField(primary_key=True)
@@ -16,6 +26,20 @@ class CustomUser(AbstractUser):
     user_URL = models.URLField(blank=True)
     user_bio = models.TextField(blank=True)
     apple_user_id = models.CharField(max_length=255, unique=True, null=True, blank=True, db_index=True)
+    # 退会（論理削除）の時刻。投稿・いいね・フォローとカウンタは purge_deleted コマンドが後から処理する
+    deleted_at = models.DateTimeField(null=True, blank=True)
+
+    objects = CustomUserManager()
+    all_objects = UserManager()
+
+    class Meta(AbstractUser.Meta):
+        indexes = [
+            models.Index(
+                fields=["deleted_at"],
+                name="user_deleted_idx",
+                condition=models.Q(deleted_at__isnull=False),
+            ),
+        ]
 
 
 class UserStats(models.Model):
@@ -98,6 +122,10 @@ class UserStats(models.Model):
 
     class Meta:
         db_table = "user_stats"
+        indexes = [
+            # /api/users/ の並び（いいね獲得数の多い順）
+            models.Index(fields=["-total_likes_received", "-user"], name="stats_likes_received_idx"),
+        ]
 
     def __str__(self) -> str:  # pragma: no cover - readable admin value
         return f"Stats<{self.user_id}>"
@@ -107,20 +135,10 @@ class UserStats(models.Model):
             return
         expected_level = self.calculate_level_from_exp(self.experience_points)
         if expected_level > self.user.user_level:
-            old_level = self.user.user_level
             self.user.user_level = expected_level
             self.user.save(update_fields=["user_level"])
             self.last_level_up = timezone.now()
-
-            # Send push notification for level up
-            from api.services.notifications import (
-                check_and_notify_user_level_ranking,
-                notify_level_up,
-            )
-
-            notify_level_up(user_id=self.user.user_id, new_level=expected_level)
-            # Check level ranking notification
-            check_and_notify_user_level_ranking(self.user.user_id)
+            user_leveled_up.send(sender=UserStats, user_id=self.user.user_id, level=expected_level)
 
     def gain_experience(self, points: int):
         if points <= 0:
@@ -148,6 +166,43 @@ class UserStats(models.Model):
         self.save(update_fields=["total_likes_received"])
         self.gain_experience(self.LIKE_RECEIVE_EXP * value)
 
+    @classmethod
+    def register_like(cls, received, given):
+        """
+        Count one like on the author's (``received``) and liker's (``given``) stats in one UPDATE.
+
+        ``post_save`` が送られないので、呼び出し側でプロフィールキャッシュを無効化する。
+        レベルアップした行だけ従来どおり ``last_level_up`` を保存する。
+        """
+        rows = [stats for stats in (received, given) if stats is not None]
+        if not rows:
+            return
+
+        def delta(stats, amount):
+            if stats is None:
+                return Value(0)
+            return Case(When(pk=stats.pk, then=Value(amount)), default=Value(0))
+
+        cls.objects.filter(pk__in={stats.pk for stats in rows}).update(
+            total_likes_received=F("total_likes_received") + delta(received, 1),
+            total_likes_given=F("total_likes_given") + delta(given, 1),
+            experience_points=F("experience_points")
+            + delta(received, cls.LIKE_RECEIVE_EXP)
+            + delta(given, cls.LIKE_GAIN_EXP),
+            updated_at=timezone.now(),
+        )
+        if received is not None:
+            received.total_likes_received += 1
+            received.experience_points += cls.LIKE_RECEIVE_EXP
+        if given is not None:
+            given.total_likes_given += 1
+            given.experience_points += cls.LIKE_GAIN_EXP
+        for stats in rows:
+            leveled_at = stats.last_level_up
+            stats._apply_level_up_if_needed()
+            if stats.last_level_up != leveled_at:
+                stats.save(update_fields=["last_level_up"])
+
     def update_follow_counts(self, *, followers_delta: int = 0, following_delta: int = 0):
         if followers_delta:
             self.follower_count = max(0, self.follower_count + followers_delta)
@@ -0,0 +1,4 @@
+from django.dispatch import Signal
+
+# UserStats のレベルアップ後に送られる（引数: user_id, level）。通知は api アプリが受け取る
+user_leveled_up = Signal()
@@ -1,3 +1,11 @@
 from django.contrib import admin
 
-# Register your models here.
+from .models import SlowQueryLog
+
+
+@admin.register(SlowQueryLog)
+class SlowQueryLogAdmin(admin.ModelAdmin):
+    list_display = ("created_at", "view", "duration_ms", "fingerprint")
+    list_filter = ("view", "database")
+    search_fields = ("sql", "fingerprint")
+    readonly_fields = [field.name for field in SlowQueryLog._meta.fields]
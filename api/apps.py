@@ -4,3 +4,51 @@ from django.apps import AppConfig
 class ApiConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'api'
+
+    def ready(self):
+        from django.db.backends.signals import connection_created
+        from django.db.models.signals import post_delete, post_save
+
+        from accounts.models import CustomUser, UserStats
+        from accounts.signals import user_leveled_up
+        from post.models import Post
+
+        from .middleware import install_execute_dispatch
+        from .services import author_feed, notifications, profile_cache
+        from .services.object_cache import invalidate_instance
+        from .tracing import trace_methods
+
+        connection_created.connect(install_execute_dispatch, dispatch_uid="api_execute_dispatch")
+        for model in (CustomUser, UserStats, Post):
+            for signal in (post_save, post_delete):
+                signal.connect(
+                    invalidate_instance,
+                    sender=model,
+                    dispatch_uid=f"object_cache_{model._meta.label_lower}_{signal is post_save}",
+                )
+        post_save.connect(author_feed.on_post_saved, sender=Post, dispatch_uid="author_feed_saved")
+        post_delete.connect(author_feed.on_post_deleted, sender=Post, dispatch_uid="author_feed_deleted")
+        post_delete.connect(
+            lambda sender, instance, **kwargs: profile_cache.bump(instance.pk),
+            sender=CustomUser,
+            weak=False,
+            dispatch_uid="profile_cache_user_deleted",
+        )
+        post_save.connect(
+            profile_cache.on_user_saved, sender=CustomUser, dispatch_uid="profile_cache_user_saved"
+        )
+        post_save.connect(
+            profile_cache.on_stats_saved, sender=UserStats, dispatch_uid="profile_cache_stats_saved"
+        )
+        user_leveled_up.connect(notifications.on_user_leveled_up, dispatch_uid="notify_level_up")
+        trace_methods(
+            UserStats,
+            {
+                "gain_experience": "user_stats.gain_experience",
+                "register_post_created": "user_stats.register_post_created",
+                "register_like_given": "user_stats.register_like_given",
+                "register_like_received": "user_stats.register_like_received",
+                "register_like": "user_stats.register_like",
+                "update_follow_counts": "user_stats.update_follow_counts",
+            },
+        )
@@ -0,0 +1,151 @@
+"""
+Read-replica routing
+
+`ReadReplicaMiddleware` がリクエストごとに読み取り先を決め、`ReadReplicaRouter` が
+そのリクエスト内の読み取りクエリを振り分ける（書き込みは常にプライマリ）。
+
+- レプリカを使うのは GET/HEAD で、`use_read_replica = True` のビュー、または
+  ViewSet の `read_replica_actions` に含まれるアクションのみ。
+- 書き込みに成功したクライアント（Authorization ヘッダ／セッション単位）は
+  `READ_YOUR_WRITES_SECONDS` の間プライマリから読む。いいね状態やカウンタが巻き戻って見えないようにするため。
+- レプリカの遅延を `REPLICA_LAG_CHECK_INTERVAL` ごとに確認し、`REPLICA_MAX_LAG_SECONDS` を
+  超えたレプリカ（確認に失敗したものを含む）は使わない。
+"""
+
+import hashlib
+import logging
+import random
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from types import SimpleNamespace
+from typing import Optional
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import DEFAULT_DB_ALIAS, connections
+
+from . import metrics
+
+logger = logging.getLogger(__name__)
+
+_route: ContextVar[Optional[SimpleNamespace]] = ContextVar("db_route", default=None)
+_health = {}
+
+READ_METHODS = ("GET", "HEAD")
+# ログイン直後のトークンがレプリカに届く前に 401 にならないよう、認証は常にプライマリで行う
+PRIMARY_ONLY_MODELS = {"authtoken.token"}
+
+LAG_SQL = """
+    SELECT CASE
+        WHEN pg_last_wal_receive_lsn() = pg_last_wal_replay_lsn() THEN 0
+        ELSE COALESCE(EXTRACT(EPOCH FROM now() - pg_last_xact_replay_timestamp()), 0)
+    END
+"""
+
+
+def replica_aliases() -> list:
+    return list(getattr(settings, "REPLICA_DATABASES", []))
+
+
+class ReadReplicaRouter:
+    """Send reads to the alias chosen for the current request; everything else to primary."""
+
+    def db_for_read(self, model, **hints):
+        route = _route.get()
+        if route is None or not route.alias:
+            return DEFAULT_DB_ALIAS
+        if model._meta.label_lower not in PRIMARY_ONLY_MODELS:
+            return route.alias
+        return DEFAULT_DB_ALIAS
+
+    def db_for_write(self, model, **hints):
+        # インスタンスのヒント（レプリカから読んだオブジェクト）に関わらずプライマリへ
+        return DEFAULT_DB_ALIAS
+
+    def allow_relation(self, obj1, obj2, **hints):
+        return True
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+        if db in replica_aliases():
+            return False
+        return None
+
+
+@contextmanager
+def request_route():
+    """Scope a mutable routing decision to the current request (primary until set)."""
+    route = SimpleNamespace(alias=None)
+    token = _route.set(route)
+    try:
+        yield route
+    finally:
+        _route.reset(token)
+
+
+def writer_key(request) -> Optional[str]:
+    ident = request.META.get("HTTP_AUTHORIZATION") or request.COOKIES.get(
+        settings.SESSION_COOKIE_NAME
+    )
+    if not ident:
+        return None
+    return "rw-sticky:" + hashlib.sha1(ident.encode()).hexdigest()
+
+
+def mark_recent_write(request):
+    key = writer_key(request)
+    if key:
+        cache.set(key, 1, getattr(settings, "READ_YOUR_WRITES_SECONDS", 10))
+
+
+def is_read_view(request, view_func) -> bool:
+    if request.method not in READ_METHODS:
+        return False
+    view_class = getattr(view_func, "cls", None)
+    if view_class is None:
+        return False
+    actions = getattr(view_func, "actions", None)
+    if actions:
+        action = actions.get(request.method.lower())
+        return action in getattr(view_class, "read_replica_actions", ())
+    return getattr(view_class, "use_read_replica", False)
+
+
+def replica_lag(alias: str) -> float:
+    """Seconds the replica's replay is behind (0 for backends without replication info)."""
+    connection = connections[alias]
+    if connection.vendor != "postgresql":
+        return 0.0
+    with connection.cursor() as cursor:
+        cursor.execute(LAG_SQL)
+        return float(cursor.fetchone()[0])
+
+
+def replica_is_healthy(alias: str) -> bool:
+    checked = _health.get(alias)
+    now = time.monotonic()
+    if checked is not None and now - checked[0] < getattr(settings, "REPLICA_LAG_CHECK_INTERVAL", 5):
+        return checked[1]
+    try:
+        lag = replica_lag(alias)
+        healthy = lag <= getattr(settings, "REPLICA_MAX_LAG_SECONDS", 5)
+        metrics.set_gauge("db_replica_lag_seconds", lag, database=alias)
+    except Exception as e:
+        logger.warning(f"Replica lag check failed for {alias}: {e}")
+        healthy = False
+    if not healthy and (checked is None or checked[1]):
+        logger.warning(f"Replica {alias} is lagging or unavailable; reading from primary.")
+    metrics.set_gauge("db_replica_healthy", int(healthy), database=alias)
+    _health[alias] = (now, healthy)
+    return healthy
+
+
+def choose_database(request, view_func) -> str:
+    replicas = replica_aliases()
+    if not replicas or not is_read_view(request, view_func):
+        return DEFAULT_DB_ALIAS
+    key = writer_key(request)
+    if key and cache.get(key):
+        return DEFAULT_DB_ALIAS
+    healthy = [alias for alias in replicas if replica_is_healthy(alias)]
+    return random.choice(healthy) if healthy else DEFAULT_DB_ALIAS
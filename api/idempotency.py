@@ -0,0 +1,103 @@
+"""
+Idempotency-Key
+
+モバイルの再送で同じ書き込み（いいね・フォロー・投稿・デバイストークン登録）が
+繰り返されないよう、`Idempotency-Key` ヘッダ付きリクエストの結果を
+`IDEMPOTENCY_KEY_SECONDS` の間キャッシュし、同じキーの再送には保存済みレスポンスを返す。
+再送のコストはキャッシュの読み込み 1 回で、バリデーション・DB 書き込み・通知は再実行しない。
+
+- キーはユーザ（未ログインは IP）・パスごとに別扱い。同じキーで本文が異なる場合は 422。
+- 最初のリクエストの処理中に届いた再送は 409（クライアントは少し待って再送する）。
+- 5xx と例外の結果は保存しないので、同じキーで再試行できる。
+- ヘッダがなければ従来どおり毎回処理する。
+"""
+
+import functools
+import hashlib
+import json
+
+from django.conf import settings
+from django.core.cache import cache
+from rest_framework import status
+from rest_framework.response import Response
+
+from . import metrics
+
+HEADER = "Idempotency-Key"
+MAX_KEY_LENGTH = 255
+# 処理中マーカーの寿命（プロセスが落ちても再送を永久に拒まないように）
+PENDING_SECONDS = 30
+
+
+def cache_key(request, key: str) -> str:
+    user = getattr(request, "user", None)
+    owner = f"user:{user.pk}" if getattr(user, "is_authenticated", False) else (
+        f"ip:{request.META.get('REMOTE_ADDR')}"
+    )
+    digest = hashlib.sha256(f"{owner}:{request.path}:{key}".encode()).hexdigest()
+    return f"idem:{digest}"
+
+
+def fingerprint(request) -> str:
+    body = json.dumps(request.data, sort_keys=True, default=str)
+    return hashlib.sha256(body.encode()).hexdigest()
+
+
+def replay(stored) -> Response:
+    response = Response(stored["data"], status=stored["status"], headers=stored["headers"])
+    response["Idempotent-Replayed"] = "true"
+    return response
+
+
+def idempotent(method):
+    """Decorate a view's ``create`` / ``post`` so retries with the same key replay the response."""
+
+    @functools.wraps(method)
+    def wrapper(self, request, *args, **kwargs):
+        key = request.headers.get(HEADER)
+        if not key:
+            return method(self, request, *args, **kwargs)
+        if len(key) > MAX_KEY_LENGTH:
+            return Response(
+                {"error": f"{HEADER} must be at most {MAX_KEY_LENGTH} characters"},
+                status=status.HTTP_400_BAD_REQUEST,
+            )
+        storage_key = cache_key(request, key)
+        digest = fingerprint(request)
+        stored = cache.get(storage_key)
+        if stored is None and cache.add(storage_key, {"fingerprint": digest}, PENDING_SECONDS):
+            return _run(method, self, request, storage_key, digest, *args, **kwargs)
+        stored = stored or cache.get(storage_key) or {}
+        if stored.get("fingerprint") != digest:
+            return Response(
+                {"error": f"{HEADER} was already used with a different request"},
+                status=status.HTTP_422_UNPROCESSABLE_ENTITY,
+            )
+        if "status" not in stored:
+            return Response(
+                {"error": "A request with this Idempotency-Key is still in progress"},
+                status=status.HTTP_409_CONFLICT,
+            )
+        metrics.inc("idempotent_replays_total", view=type(self).__name__)
+        return replay(stored)
+
+    return wrapper
+
+
+def _run(method, view, request, storage_key, digest, *args, **kwargs):
+    try:
+        response = method(view, request, *args, **kwargs)
+    except Exception:
+        cache.delete(storage_key)
+        raise
+    if response.status_code >= 500:
+        cache.delete(storage_key)
+        return response
+    stored = {
+        "fingerprint": digest,
+        "status": response.status_code,
+        "data": json.loads(json.dumps(response.data, default=str)),
+        "headers": {name: value for name, value in response.items() if name != "Content-Type"},
+    }
+    cache.set(storage_key, stored, getattr(settings, "IDEMPOTENCY_KEY_SECONDS", 86400))
+    return response
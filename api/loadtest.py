@@ -0,0 +1,494 @@
+"""
+Load-test harness
+
+シード済みデータセットに対して、ローカルで起動したアプリへ
+クライアントごとに 1 スレッド（`requests` のブロッキング I/O）で現実的なトラフィックを流し、
+エンドポイントごとのレイテンシ (p50/p95/p99)、スループット、DBクエリ数を集計する。
+
+使い方は `python manage.py loadtest --help` を参照。
+"""
+
+import random
+import re
+import threading
+import time
+from collections import defaultdict
+from dataclasses import dataclass, field
+from datetime import timedelta
+from typing import Optional
+
+import requests
+from django.contrib.auth.hashers import make_password
+from django.core.handlers.wsgi import WSGIHandler
+from django.core.servers.basehttp import ThreadedWSGIServer, WSGIRequestHandler
+from django.db import connection, transaction
+from django.db.models import Count
+from django.utils import timezone
+
+from .services import like_rollups, profile_cache, trending
+
+LOADTEST_USERNAME_PREFIX = "loadtest_"
+QUERY_COUNT_HEADER = "X-Query-Count"
+_SERVER_TIMING_QUERIES_RE = re.compile(r'desc="(\d+) queries"')
+
+# シナリオごとのアクション重み（相対値）
+MIX_WEIGHTS = {
+    "timeline_latest": 20,
+    "timeline_popular": 10,
+    "timeline_following": 15,
+    "ranking_posts": 5,
+    "ranking_posts_24h": 5,
+    "ranking_users_total_likes": 3,
+    "ranking_users_level": 2,
+    "ranking_users_followers": 2,
+    "search_users": 5,
+    "search_posts": 5,
+    "like": 20,
+    "follow": 8,
+}
+
+SEARCH_WORDS = ["hello", "today", "coffee", "music", "night", "game", "study", "rain"]
+
+
+@dataclass
+class SeedResult:
+    user_ids: list
+    post_ids: list
+    hot_post_id: Optional[int]
+    tokens: dict = field(default_factory=dict)  # user_id -> token key
+
+
+def reset_dataset():
+    """Delete every user (and cascaded rows) created by a previous seed."""
+    from accounts.models import CustomUser
+
+    CustomUser.objects.filter(username__startswith=LOADTEST_USERNAME_PREFIX).delete()
+
+
+def seed_dataset(
+    *,
+    users: int,
+    posts: int,
+    follows_per_user: int,
+    likes_per_user: int,
+    seed: int = 42,
+    batch_size: int = 1000,
+) -> SeedResult:
+    """
+    Bulk-insert a reproducible dataset and recompute every denormalized counter.
+
+    The first post is the "hot" post used by the hot-post scenario.
+    """
+    from rest_framework.authtoken.models import Token
+
+    from accounts.models import CustomUser, UserStats
+    from follow.models import Follow
+    from post.models import Like, Post
+
+    rng = random.Random(seed)
+    password = make_password("loadtest-password")
+    now = timezone.now()
+
+    with transaction.atomic():
+        CustomUser.objects.bulk_create(
+            [
+                CustomUser(
+                    username=f"{LOADTEST_USERNAME_PREFIX}{i}",
+                    user_name=f"Load Tester {i}",
+                    user_mail=f"{LOADTEST_USERNAME_PREFIX}{i}@example.com",
+                    email=f"{LOADTEST_USERNAME_PREFIX}{i}@example.com",
+                    password=password,
+                )
+                for i in range(users)
+            ],
+            batch_size=batch_size,
+        )
+        user_ids = list(
+            CustomUser.objects.filter(username__startswith=LOADTEST_USERNAME_PREFIX)
+            .order_by("user_id")
+            .values_list("user_id", flat=True)
+        )
+        # bulk_create では post_save シグナルが発火しないため stats を明示的に作成
+        UserStats.objects.bulk_create(
+            [UserStats(user_id=uid) for uid in user_ids], batch_size=batch_size
+        )
+        Token.objects.bulk_create(
+            [Token(user_id=uid, key=Token.generate_key()) for uid in user_ids],
+            batch_size=batch_size,
+        )
+
+        Post.objects.bulk_create(
+            [
+                Post(
+                    user_id=rng.choice(user_ids),
+                    context=f"{rng.choice(SEARCH_WORDS)} post {i} {rng.choice(SEARCH_WORDS)}",
+                    # 直近 72 時間に散らして 24h フィルタが効くようにする
+                    time=now - timedelta(seconds=rng.randint(0, 72 * 3600)),
+                )
+                for i in range(posts)
+            ],
+            batch_size=batch_size,
+        )
+        post_times = dict(
+            Post.objects.filter(user_id__in=user_ids)
+            .order_by("post_id")
+            .values_list("post_id", "time")
+        )
+        post_ids = list(post_times)
+
+        follows = set()
+        for uid in user_ids:
+            candidates = rng.sample(user_ids, min(follows_per_user + 1, len(user_ids)))
+            for aim in [aim for aim in candidates if aim != uid][:follows_per_user]:
+                follows.add((uid, aim))
+        Follow.objects.bulk_create(
+            [Follow(user_id=u, aim_user_id=a) for u, a in follows],
+            batch_size=batch_size,
+        )
+
+        likes = set()
+        for uid in user_ids:
+            for pid in rng.sample(post_ids, min(likes_per_user, len(post_ids))):
+                likes.add((uid, pid))
+        Like.objects.bulk_create(
+            [Like(user_id=u, post_id=p, post_time=post_times[p]) for u, p in likes],
+            batch_size=batch_size,
+        )
+
+        _recompute_counters(user_ids, batch_size=batch_size)
+
+    tokens = dict(Token.objects.filter(user_id__in=user_ids).values_list("user_id", "key"))
+    return SeedResult(
+        user_ids=user_ids,
+        post_ids=post_ids,
+        hot_post_id=post_ids[0] if post_ids else None,
+        tokens=tokens,
+    )
+
+
+def _recompute_counters(user_ids, *, batch_size):
+    from accounts.models import CustomUser, UserStats
+    from follow.models import Follow
+    from post.models import Like, Post
+
+    like_counts = dict(
+        Like.objects.filter(post__user_id__in=user_ids)
+        .values_list("post_id")
+        .annotate(n=Count("id"))
+    )
+    posts = list(Post.objects.filter(user_id__in=user_ids).only("post_id", "like_count"))
+    for post in posts:
+        post.like_count = like_counts.get(post.post_id, 0)
+    posts = trending.recompute(posts)
+    Post.objects.bulk_update(posts, ["like_count", "trending_score"], batch_size=batch_size)
+    like_rollups.rebuild(author_ids=user_ids, batch_size=batch_size)
+
+    def _per_user(qs, key):
+        return dict(qs.values_list(key).annotate(n=Count("pk")))
+
+    received = _per_user(Like.objects.filter(post__user_id__in=user_ids), "post__user_id")
+    given = _per_user(Like.objects.filter(user_id__in=user_ids), "user_id")
+    followers = _per_user(Follow.objects.filter(aim_user_id__in=user_ids), "aim_user_id")
+    following = _per_user(Follow.objects.filter(user_id__in=user_ids), "user_id")
+    post_counts = _per_user(Post.objects.filter(user_id__in=user_ids), "user_id")
+
+    stats_rows = list(UserStats.objects.filter(user_id__in=user_ids))
+    for stats in stats_rows:
+        uid = stats.user_id
+        stats.total_likes_received = received.get(uid, 0)
+        stats.total_likes_given = given.get(uid, 0)
+        stats.follower_count = followers.get(uid, 0)
+        stats.following_count = following.get(uid, 0)
+        stats.post_count = post_counts.get(uid, 0)
+        stats.experience_points = (
+            stats.post_count * UserStats.POST_CREATE_EXP
+            + stats.total_likes_received * UserStats.LIKE_RECEIVE_EXP
+            + stats.total_likes_given * UserStats.LIKE_GAIN_EXP
+        )
+    UserStats.objects.bulk_update(
+        stats_rows,
+        [
+            "total_likes_received",
+            "total_likes_given",
+            "follower_count",
+            "following_count",
+            "post_count",
+            "experience_points",
+        ],
+        batch_size=batch_size,
+    )
+
+    levels = {
+        stats.user_id: UserStats.calculate_level_from_exp(stats.experience_points)
+        for stats in stats_rows
+    }
+    users = list(CustomUser.objects.filter(user_id__in=user_ids).only("user_id", "user_level"))
+    for user in users:
+        user.user_level = levels.get(user.user_id, 1)
+    CustomUser.objects.bulk_update(users, ["user_level"], batch_size=batch_size)
+    # bulk_update は save() を通らないのでプロフィールキャッシュを明示的に無効化する
+    for user_id in user_ids:
+        profile_cache.bump(user_id)
+
+
+def load_existing_dataset() -> SeedResult:
+    """Reuse a dataset seeded by a previous run (``--skip-seed``)."""
+    from rest_framework.authtoken.models import Token
+
+    from post.models import Post
+
+    tokens = dict(
+        Token.objects.filter(user__username__startswith=LOADTEST_USERNAME_PREFIX).values_list(
+            "user_id", "key"
+        )
+    )
+    user_ids = sorted(tokens)
+    post_ids = list(
+        Post.objects.filter(user_id__in=user_ids).order_by("post_id").values_list("post_id", flat=True)
+    )
+    return SeedResult(
+        user_ids=user_ids,
+        post_ids=post_ids,
+        hot_post_id=post_ids[0] if post_ids else None,
+        tokens=tokens,
+    )
+
+
+# --- Local server ---
+
+
+class QueryCountingApplication:
+    """WSGI wrapper that reports the number of SQL queries per request in a header."""
+
+    def __init__(self, application):
+        self.application = application
+
+    def __call__(self, environ, start_response):
+        count = [0]
+
+        def counter(execute, sql, params, many, context):
+            count[0] += 1
+            return execute(sql, params, many, context)
+
+        def counting_start_response(status, headers, exc_info=None):
+            headers.append((QUERY_COUNT_HEADER, str(count[0])))
+            return start_response(status, headers, exc_info)
+
+        with connection.execute_wrapper(counter):
+            return self.application(environ, counting_start_response)
+
+
+class _QuietRequestHandler(WSGIRequestHandler):
+    def log_message(self, format, *args):
+        pass
+
+
+class LocalServer:
+    """Threaded WSGI server running the app in a background thread."""
+
+    def __init__(self, host: str = "127.0.0.1", port: int = 0):
+        self.httpd = ThreadedWSGIServer((host, port), _QuietRequestHandler)
+        self.httpd.set_app(QueryCountingApplication(WSGIHandler()))
+        self.thread = threading.Thread(target=self.httpd.serve_forever, daemon=True)
+
+    @property
+    def url(self) -> str:
+        host, port = self.httpd.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def __enter__(self):
+        self.thread.start()
+        return self
+
+    def __exit__(self, *exc):
+        self.httpd.shutdown()
+        self.httpd.server_close()
+
+
+# --- Traffic ---
+
+
+@dataclass
+class Sample:
+    endpoint: str
+    latency: float
+    status: int
+    queries: Optional[int]
+
+
+def percentile(values, pct: float) -> float:
+    """Nearest-rank percentile of ``values`` (0 when empty)."""
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    index = max(0, min(len(ordered) - 1, int(round(pct / 100 * len(ordered))) - 1))
+    return ordered[index]
+
+
+def summarize(samples, elapsed: float) -> dict:
+    """Aggregate samples into per-endpoint latency / throughput / query stats."""
+    grouped = defaultdict(list)
+    for sample in samples:
+        grouped[sample.endpoint].append(sample)
+
+    summary = {}
+    for endpoint, rows in sorted(grouped.items()):
+        latencies = [row.latency * 1000 for row in rows]
+        queries = [row.queries for row in rows if row.queries is not None]
+        summary[endpoint] = {
+            "requests": len(rows),
+            "errors": sum(1 for row in rows if row.status == 0 or row.status >= 500),
+            "client_errors": sum(1 for row in rows if 400 <= row.status < 500 and row.status != 429),
+            # スロットリング（429）は書き込み経路の失敗と分けて数える
+            "throttled": sum(1 for row in rows if row.status == 429),
+            "rps": len(rows) / elapsed if elapsed else 0.0,
+            "p50_ms": percentile(latencies, 50),
+            "p95_ms": percentile(latencies, 95),
+            "p99_ms": percentile(latencies, 99),
+            "avg_queries": sum(queries) / len(queries) if queries else None,
+            "max_queries": max(queries) if queries else None,
+        }
+    return summary
+
+
+def compare(baseline: dict, current: dict) -> dict:
+    """Per-endpoint ``current - baseline`` deltas of two ``summarize`` results."""
+    deltas = {}
+    for endpoint in sorted(set(baseline) & set(current)):
+        before, after = baseline[endpoint], current[endpoint]
+        deltas[endpoint] = {
+            # throttled を持たない以前の --json とも比べられるようにする
+            key: after.get(key, 0) - before.get(key, 0)
+            for key in ("requests", "errors", "throttled", "rps", "p50_ms", "p95_ms", "p99_ms")
+        }
+    return deltas
+
+
+def _query_count(response) -> Optional[int]:
+    """Read the query count from the harness header or the ``Server-Timing`` db metric."""
+    header = response.headers.get(QUERY_COUNT_HEADER)
+    if header:
+        return int(header)
+    match = _SERVER_TIMING_QUERIES_RE.search(response.headers.get("Server-Timing", ""))
+    return int(match.group(1)) if match else None
+
+
+class TrafficDriver:
+    """Drive ``clients`` threads, one blocking ``requests`` session each, for ``duration`` seconds."""
+
+    def __init__(self, base_url: str, dataset: SeedResult, *, clients: int, duration: float,
+                 scenario: str = "mix", seed: int = 42):
+        self.base_url = base_url.rstrip("/")
+        self.dataset = dataset
+        self.clients = clients
+        self.duration = duration
+        self.scenario = scenario
+        self.seed = seed
+        self.samples: list = []
+
+    def run(self) -> float:
+        deadline = time.perf_counter() + self.duration
+        user_ids = list(self.dataset.tokens)
+        rng = random.Random(self.seed)
+        rng.shuffle(user_ids)
+        threads = [
+            threading.Thread(
+                target=self._client,
+                args=(index, user_ids[index % len(user_ids)], deadline),
+                name=f"loadtest-client-{index}",
+                daemon=True,
+            )
+            for index in range(self.clients)
+        ]
+        started = time.perf_counter()
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        return time.perf_counter() - started
+
+    def _client(self, index: int, user_id: int, deadline: float):
+        rng = random.Random(self.seed + index)
+        session = requests.Session()
+        session.headers["Authorization"] = f"Token {self.dataset.tokens[user_id]}"
+        actions = list(MIX_WEIGHTS)
+        weights = [MIX_WEIGHTS[name] for name in actions]
+        try:
+            while time.perf_counter() < deadline:
+                if self.scenario == "hot-post":
+                    action = "hot_like"
+                else:
+                    action = rng.choices(actions, weights)[0]
+                self._perform(session, rng, user_id, action)
+        finally:
+            session.close()
+
+    def _request(self, session, endpoint: str, method: str, path: str, **kwargs):
+        started = time.perf_counter()
+        try:
+            response = session.request(method, self.base_url + path, timeout=30, **kwargs)
+        except requests.RequestException:
+            self.samples.append(Sample(endpoint, time.perf_counter() - started, 0, None))
+            return None
+        latency = time.perf_counter() - started
+        self.samples.append(Sample(endpoint, latency, response.status_code, _query_count(response)))
+        return response
+
+    def _perform(self, session, rng, user_id: int, action: str):
+        dataset = self.dataset
+        if action.startswith("timeline_"):
+            tab = action.split("_", 1)[1]
+            self._request(session, action, "GET", "/api/timeline/", params={"tab": tab})
+        elif action == "ranking_posts":
+            self._request(session, action, "GET", "/api/rankings/posts/likes/")
+        elif action == "ranking_posts_24h":
+            self._request(session, action, "GET", "/api/rankings/posts/likes/", params={"range": "24h"})
+        elif action.startswith("ranking_users_"):
+            path = {
+                "ranking_users_total_likes": "/api/rankings/users/total-likes/",
+                "ranking_users_level": "/api/rankings/users/level/",
+                "ranking_users_followers": "/api/rankings/users/followers/",
+            }[action]
+            self._request(session, action, "GET", path)
+        elif action == "search_users":
+            self._request(session, action, "GET", "/api/search/users/", params={"q": "tester 1"})
+        elif action == "search_posts":
+            self._request(session, action, "GET", "/api/search/posts/", params={"q": rng.choice(SEARCH_WORDS)})
+        elif action == "like":
+            self._like_cycle(session, user_id, rng.choice(dataset.post_ids), "like")
+        elif action == "hot_like":
+            self._like_cycle(session, user_id, dataset.hot_post_id, "hot_like")
+        elif action == "follow":
+            aim_user_id = rng.choice(dataset.user_ids)
+            if aim_user_id == user_id:
+                return
+            response = self._request(
+                session, "follow_create", "POST", "/api/follows/", json={"aim_user_id": aim_user_id}
+            )
+            if response is not None and response.status_code == 201:
+                self._request(
+                    session, "follow_destroy", "DELETE", f"/api/follows/{response.json()['id']}/"
+                )
+
+    def _like_cycle(self, session, user_id: int, post_id: int, prefix: str):
+        response = self._request(
+            session, f"{prefix}_create", "POST", "/api/likes/", json={"post_id": post_id}
+        )
+        if response is None:
+            return
+        like_id = None
+        if response.status_code == 201:
+            like_id = response.json()["id"]
+        elif response.status_code == 400:
+            # シード済みのいいねと衝突した場合は既存のいいねを解除して次の周回に備える
+            existing = self._request(
+                session,
+                "like_list",
+                "GET",
+                "/api/likes/",
+                params={"user_id": user_id, "post_id": post_id},
+            )
+            if existing is not None and existing.status_code == 200 and existing.json():
+                like_id = existing.json()[0]["id"]
+        if like_id is not None:
+            self._request(session, f"{prefix}_destroy", "DELETE", f"/api/likes/{like_id}/")
@@ -0,0 +1,84 @@
+import copy
+import json
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connections
+from django.db.utils import load_backend
+
+from api.loadtest import percentile
+
+
+class Command(BaseCommand):
+    help = (
+        "Measure per-request connection overhead: connect + SELECT 1 + close with a fresh "
+        "connection per request versus a psycopg connection pool."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--database", default="default")
+        parser.add_argument("--iterations", type=int, default=200)
+        parser.add_argument("--json", dest="json_path", help="Write the results as JSON to this path.")
+
+    def handle(self, *args, **options):
+        alias = options["database"]
+        base = connections.settings[alias]
+        if connections[alias].vendor != "postgresql":
+            raise CommandError("bench_connections requires a PostgreSQL database.")
+        if options["iterations"] < 1:
+            raise CommandError("--iterations must be at least 1")
+
+        pool_options = base.get("OPTIONS", {}).get("pool") or True
+        results = {
+            "no_pool": self._bench(base, None, options["iterations"]),
+            "pool": self._bench(base, pool_options, options["iterations"]),
+        }
+
+        self.stdout.write(f"{'mode':<10}{'p50 ms':>10}{'p95 ms':>10}{'p99 ms':>10}{'mean ms':>10}")
+        for mode, row in results.items():
+            self.stdout.write(
+                f"{mode:<10}{row['p50_ms']:>10.2f}{row['p95_ms']:>10.2f}"
+                f"{row['p99_ms']:>10.2f}{row['mean_ms']:>10.2f}"
+            )
+        saved = results["no_pool"]["p50_ms"] - results["pool"]["p50_ms"]
+        self.stdout.write(f"Connection setup removed from p50: {saved:.2f} ms")
+
+        if options["json_path"]:
+            with open(options["json_path"], "w") as fp:
+                json.dump(results, fp, indent=2)
+
+    def _bench(self, base, pool_options, iterations: int) -> dict:
+        settings_dict = copy.deepcopy(base)
+        settings_dict["CONN_MAX_AGE"] = 0
+        settings_dict.setdefault("OPTIONS", {}).pop("pool", None)
+        if pool_options:
+            settings_dict["OPTIONS"]["pool"] = pool_options
+        alias = f"bench_{'pool' if pool_options else 'no_pool'}"
+        backend = load_backend(settings_dict["ENGINE"])
+        conn = backend.DatabaseWrapper(settings_dict, alias)
+
+        latencies = []
+        try:
+            # プールの初期接続はウォームアップとして計測から除外する
+            conn.ensure_connection()
+            conn.close()
+            for _ in range(iterations):
+                started = time.perf_counter()
+                conn.ensure_connection()
+                with conn.cursor() as cursor:
+                    cursor.execute("SELECT 1")
+                    cursor.fetchone()
+                conn.close()
+                latencies.append((time.perf_counter() - started) * 1000)
+        finally:
+            conn.close()
+            if pool_options:
+                conn.close_pool()
+
+        return {
+            "iterations": iterations,
+            "p50_ms": round(percentile(latencies, 50), 3),
+            "p95_ms": round(percentile(latencies, 95), 3),
+            "p99_ms": round(percentile(latencies, 99), 3),
+            "mean_ms": round(sum(latencies) / len(latencies), 3),
+        }
@@ -0,0 +1,26 @@
+from django.core.management.base import BaseCommand
+
+from api.services import like_rollups
+
+
+class Command(BaseCommand):
+    help = (
+        "Fold hourly like buckets into daily ones and prune buckets older than "
+        "ROLLUP_RETENTION_DAYS. Run hourly (cron / Cloud Scheduler)."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--batch-size", type=int, default=5000)
+        parser.add_argument(
+            "--rebuild",
+            action="store_true",
+            help="Recreate every bucket from like rows first (initial backfill or repair).",
+        )
+
+    def handle(self, *args, **options):
+        if options["rebuild"]:
+            created = like_rollups.rebuild(batch_size=options["batch_size"])
+            self.stdout.write(f"Rebuilt {created} hourly buckets from likes")
+        compacted = like_rollups.compact(batch_size=options["batch_size"])
+        pruned = like_rollups.prune()
+        self.stdout.write(f"Compacted {compacted} hourly buckets, pruned {pruned} expired buckets")
@@ -0,0 +1,45 @@
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.db import close_old_connections
+
+from api.services import trending
+
+
+class Command(BaseCommand):
+    help = (
+        "Apply time decay to Post.trending_score. Run every TRENDING_DECAY_INTERVAL_SECONDS "
+        "(cron / Cloud Scheduler), or keep it running with --loop."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--interval",
+            type=float,
+            default=None,
+            help="Seconds of decay to apply (defaults to TRENDING_DECAY_INTERVAL_SECONDS).",
+        )
+        parser.add_argument("--batch-size", type=int, default=5000)
+        parser.add_argument(
+            "--loop",
+            action="store_true",
+            help="Decay repeatedly, sleeping --interval seconds between runs.",
+        )
+
+    def handle(self, *args, **options):
+        interval = options["interval"] or settings.TRENDING_DECAY_INTERVAL_SECONDS
+        if interval <= 0:
+            raise CommandError("--interval must be positive")
+
+        while True:
+            started = time.monotonic()
+            updated = trending.decay(interval, batch_size=options["batch_size"])
+            self.stdout.write(
+                f"Decayed {updated} posts by {trending.decay_factor(interval):.4f} "
+                f"in {time.monotonic() - started:.2f}s"
+            )
+            if not options["loop"]:
+                return
+            close_old_connections()
+            time.sleep(max(interval - (time.monotonic() - started), 0))
@@ -0,0 +1,45 @@
+import sys
+
+from django.core.management.base import BaseCommand, CommandError
+from django.utils.dateparse import parse_datetime
+
+from api.services import export
+
+
+class Command(BaseCommand):
+    help = (
+        "Write posts, likes, follows or user_stats as NDJSON (optionally gzipped) to a file or "
+        "stdout, streaming rows through a server-side cursor."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("table", choices=sorted(export.TABLES))
+        parser.add_argument("--output", "-o", default="-", help="File path, or - for stdout.")
+        parser.add_argument("--gzip", action="store_true")
+        parser.add_argument("--since-id", type=int, help="Only rows with a primary key above this.")
+        parser.add_argument("--since", help="Only rows created/updated at or after this ISO 8601 time.")
+        parser.add_argument("--chunk-size", type=int, default=export.CHUNK_SIZE)
+        parser.add_argument("--database", default=None, help="Database alias to read from.")
+
+    def handle(self, *args, **options):
+        since = None
+        if options["since"]:
+            since = parse_datetime(options["since"])
+            if since is None:
+                raise CommandError("--since must be an ISO 8601 datetime")
+        chunks = export.stream(
+            options["table"],
+            gzip=options["gzip"],
+            since_id=options["since_id"],
+            since=since,
+            chunk_size=options["chunk_size"],
+            using=options["database"],
+        )
+        if options["output"] == "-":
+            for chunk in chunks:
+                sys.stdout.buffer.write(chunk)
+            sys.stdout.buffer.flush()
+            return
+        with open(options["output"], "wb") as output:
+            for chunk in chunks:
+                output.write(chunk)
@@ -0,0 +1,149 @@
+import json
+
+from django.core.management.base import BaseCommand, CommandError
+from django.test.utils import override_settings
+
+from api import loadtest
+
+
+class Command(BaseCommand):
+    help = (
+        "Seed a load-test dataset, start the app locally and drive concurrent "
+        "traffic, reporting per-endpoint p50/p95/p99 latency, throughput and query counts."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--users", type=int, default=200)
+        parser.add_argument("--posts", type=int, default=2000)
+        parser.add_argument("--follows-per-user", type=int, default=20)
+        parser.add_argument("--likes-per-user", type=int, default=30)
+        parser.add_argument("--seed", type=int, default=42, help="Random seed for data and traffic.")
+        parser.add_argument(
+            "--skip-seed",
+            action="store_true",
+            help="Reuse the dataset created by a previous run.",
+        )
+        parser.add_argument(
+            "--reset",
+            action="store_true",
+            help="Delete a previously seeded dataset before seeding.",
+        )
+        parser.add_argument("--clients", type=int, default=20, help="Concurrent clients (one thread each).")
+        parser.add_argument("--duration", type=float, default=30.0, help="Seconds of traffic.")
+        parser.add_argument(
+            "--scenario",
+            choices=["mix", "hot-post"],
+            default="mix",
+            help="mix: realistic read/write mix. hot-post: every client likes/unlikes one post.",
+        )
+        parser.add_argument(
+            "--url",
+            help="Target an already running server instead of starting one in-process.",
+        )
+        parser.add_argument(
+            "--throttle",
+            action="store_true",
+            help="Keep rate limiting on for the in-process server (off by default so the "
+            "write mix measures the write path, not THROTTLE_RATES).",
+        )
+        parser.add_argument("--json", dest="json_path", help="Write the summary as JSON to this path.")
+        parser.add_argument(
+            "--compare",
+            dest="baseline_path",
+            help="Print deltas against a previous --json run (e.g. threaded WSGI vs ASGI).",
+        )
+
+    def handle(self, *args, **options):
+        if options["clients"] < 1:
+            raise CommandError("--clients must be at least 1")
+
+        if options["reset"]:
+            loadtest.reset_dataset()
+        if options["skip_seed"]:
+            dataset = loadtest.load_existing_dataset()
+        else:
+            self.stdout.write("Seeding dataset...")
+            dataset = loadtest.seed_dataset(
+                users=options["users"],
+                posts=options["posts"],
+                follows_per_user=options["follows_per_user"],
+                likes_per_user=options["likes_per_user"],
+                seed=options["seed"],
+            )
+        if not dataset.tokens or not dataset.post_ids:
+            raise CommandError("Dataset is empty. Run without --skip-seed first.")
+
+        def drive(base_url):
+            self.stdout.write(
+                f"Driving {options['clients']} clients for {options['duration']}s "
+                f"({options['scenario']}) against {base_url}"
+            )
+            driver = loadtest.TrafficDriver(
+                base_url,
+                dataset,
+                clients=options["clients"],
+                duration=options["duration"],
+                scenario=options["scenario"],
+                seed=options["seed"],
+            )
+            elapsed = driver.run()
+            return loadtest.summarize(driver.samples, elapsed), elapsed
+
+        if options["url"]:
+            summary, elapsed = drive(options["url"])
+        else:
+            # シードユーザはレート（いいね 60/分 など）よりはるかに速く書き込むため、既定では切る
+            with override_settings(THROTTLE_ENABLED=options["throttle"]):
+                with loadtest.LocalServer() as server:
+                    summary, elapsed = drive(server.url)
+
+        self._print_summary(summary, elapsed)
+        throttled = sum(row["throttled"] for row in summary.values())
+        if throttled:
+            self.stderr.write(
+                f"{throttled} requests were throttled (429). Start the target server with "
+                "THROTTLE_ENABLED=0 to measure the write path instead of the rate limits."
+            )
+        if options["json_path"]:
+            with open(options["json_path"], "w") as fp:
+                json.dump({"elapsed": elapsed, "endpoints": summary}, fp, indent=2)
+        if options["baseline_path"]:
+            with open(options["baseline_path"]) as fp:
+                baseline = json.load(fp)["endpoints"]
+            self._print_comparison(loadtest.compare(baseline, summary))
+
+    def _print_summary(self, summary, elapsed):
+        header = (
+            f"{'endpoint':<28}{'reqs':>7}{'err':>6}{'4xx':>6}{'429':>6}{'rps':>9}"
+            f"{'p50ms':>9}{'p95ms':>9}{'p99ms':>9}{'avgQ':>7}{'maxQ':>6}"
+        )
+        self.stdout.write(header)
+        self.stdout.write("-" * len(header))
+        total = 0
+        for endpoint, row in summary.items():
+            total += row["requests"]
+            avg_q = "-" if row["avg_queries"] is None else f"{row['avg_queries']:.1f}"
+            max_q = "-" if row["max_queries"] is None else str(row["max_queries"])
+            self.stdout.write(
+                f"{endpoint:<28}{row['requests']:>7}{row['errors']:>6}{row['client_errors']:>6}"
+                f"{row['throttled']:>6}"
+                f"{row['rps']:>9.1f}{row['p50_ms']:>9.1f}{row['p95_ms']:>9.1f}"
+                f"{row['p99_ms']:>9.1f}{avg_q:>7}{max_q:>6}"
+            )
+        self.stdout.write("-" * len(header))
+        self.stdout.write(f"total {total} requests in {elapsed:.1f}s ({total / elapsed:.1f} req/s)")
+
+    def _print_comparison(self, deltas):
+        header = (
+            f"{'endpoint (vs baseline)':<28}{'Δreqs':>8}{'Δerr':>6}{'Δ429':>6}{'Δrps':>9}"
+            f"{'Δp50ms':>9}{'Δp95ms':>9}{'Δp99ms':>9}"
+        )
+        self.stdout.write("")
+        self.stdout.write(header)
+        self.stdout.write("-" * len(header))
+        for endpoint, row in deltas.items():
+            self.stdout.write(
+                f"{endpoint:<28}{row['requests']:>+8}{row['errors']:>+6}{row['throttled']:>+6}"
+                f"{row['rps']:>+9.1f}"
+                f"{row['p50_ms']:>+9.1f}{row['p95_ms']:>+9.1f}{row['p99_ms']:>+9.1f}"
+            )
@@ -0,0 +1,42 @@
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+
+from api.services import partitioning
+
+
+class Command(BaseCommand):
+    help = (
+        "Create monthly partitions of post/like ahead of time (run daily), or convert the "
+        "existing tables into partitioned ones with --convert (PostgreSQL only)."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--months-ahead",
+            type=int,
+            default=None,
+            help="Months after the current one to create (defaults to PARTITION_MONTHS_AHEAD).",
+        )
+        parser.add_argument(
+            "--convert",
+            action="store_true",
+            help="Turn the existing tables into partitioned tables first (takes exclusive locks).",
+        )
+        parser.add_argument("--dry-run", action="store_true", help="Print the SQL without running it.")
+
+    def handle(self, *args, **options):
+        if connection.vendor != "postgresql":
+            raise CommandError("partition_tables requires a PostgreSQL database.")
+        if options["months_ahead"] is not None and options["months_ahead"] < 0:
+            raise CommandError("--months-ahead must not be negative")
+
+        statements = []
+        if options["convert"]:
+            statements += partitioning.convert(dry_run=options["dry_run"])
+        statements += partitioning.ensure_partitions(
+            options["months_ahead"], dry_run=options["dry_run"]
+        )
+        for sql in statements:
+            self.stdout.write(f"{sql};" if options["dry_run"] else sql)
+        if not statements:
+            self.stdout.write("Partitions are up to date.")
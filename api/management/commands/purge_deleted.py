@@ -0,0 +1,23 @@
+from django.core.management.base import BaseCommand
+
+from api.services import deletion
+
+
+class Command(BaseCommand):
+    help = (
+        "Delete soft-deleted posts and users with their likes and follows in small batches, "
+        "adjusting the counters of everyone affected. Run every few minutes (cron / Cloud Scheduler)."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--batch-size", type=int, default=1000, help="Rows deleted per transaction."
+        )
+
+    def handle(self, *args, **options):
+        counts = deletion.purge(batch_size=options["batch_size"])
+        self.stdout.write(
+            "Purged {posts} posts, {users} users, {likes} likes, {follows} follows".format(
+                **{"posts": 0, "users": 0, "likes": 0, "follows": 0, **counts}
+            )
+        )
@@ -0,0 +1,29 @@
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+from api.services import suggestions
+
+
+class Command(BaseCommand):
+    help = (
+        "Recompute stored follow suggestions for users whose follows changed since the last "
+        "run (or for every user with --full). Run every few minutes (cron / Cloud Scheduler)."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--full", action="store_true", help="Recompute every active user.")
+        parser.add_argument(
+            "--workers",
+            type=int,
+            default=None,
+            help="Processes scoring candidates (defaults to SUGGESTIONS_WORKERS).",
+        )
+        parser.add_argument("--batch-size", type=int, default=5000)
+
+    def handle(self, *args, **options):
+        workers = options["workers"] or settings.SUGGESTIONS_WORKERS
+        if workers < 1:
+            raise CommandError("--workers must be at least 1")
+        refresh = suggestions.refresh_all if options["full"] else suggestions.refresh_dirty
+        written = refresh(workers=workers, batch_size=options["batch_size"])
+        self.stdout.write(f"Stored {written} follow suggestions")
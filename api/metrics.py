@@ -0,0 +1,329 @@
+"""
+Prometheus metrics
+
+ホットパスではロックを取らないよう、値はスレッドごとのシャード（dict）に記録し、
+スクレイプ時に全シャードを合算する。終了したスレッドのシャードは新しいシャードの登録時と
+スクレイプ時に 1 つの `_retired` にまとめるため、リクエストごとにスレッドを作るサーバでも増え続けない。
+ヒストグラムのバケットは `BUCKETS` で指標ごとに決める（既定は秒の `DEFAULT_BUCKETS`）。`METRICS_MULTIPROC_DIR` を設定すると
+各ワーカープロセスが定期的に自分のスナップショットを `metrics_<pid>.json` に書き出し、
+`/metrics` はディレクトリ内の全ファイルを合算して返す（gunicorn の複数ワーカー対応）。
+"""
+
+import json
+import math
+import os
+import tempfile
+import threading
+import time
+from contextlib import contextmanager
+from pathlib import Path
+
+from django.conf import settings
+
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+# 秒以外の単位の指標
+BUCKETS = {
+    "db_queries_per_request": (1, 2, 5, 10, 20, 50, 100, 200),
+}
+
+HELP = {
+    "http_requests_total": "HTTP requests by view, method and status.",
+    "http_request_duration_seconds": "End-to-end request latency by view.",
+    "db_query_duration_seconds": "Total DB time per request by view.",
+    "db_queries_per_request": "Number of SQL queries per request by view.",
+    "serializer_duration_seconds": "Time spent building serializer.data.",
+    "notification_sends_total": "FCM send attempts by result.",
+    "notification_token_deactivations_total": "Device tokens deactivated after FCM rejected them.",
+    "fcm_send_duration_seconds": "Latency of FCM send calls.",
+    "cache_requests_total": "Cache lookups by cache and result.",
+    "cache_hit_ratio": "Cache hit ratio by cache.",
+    "throttled_requests_total": "Requests rejected by the token-bucket throttle by scope.",
+    "idempotent_replays_total": "Writes answered from a stored Idempotency-Key response by view.",
+    "metrics_flush_lag_seconds": "Seconds since a worker process last flushed its metrics.",
+    "db_pool_size": "Connections currently managed by the psycopg pool.",
+    "db_pool_available": "Idle connections ready in the psycopg pool.",
+    "db_pool_requests_waiting": "Requests currently waiting for a pooled connection.",
+    "db_pool_requests_total": "Connections requested from the pool since start.",
+    "db_pool_requests_wait_ms": "Total milliseconds spent waiting for a pooled connection.",
+    "db_pool_requests_errors": "Pool requests that failed (timeout or queue full).",
+    "db_pool_connections_lost": "Pooled connections found broken by the health check.",
+    "db_replica_lag_seconds": "Replication lag of each read replica at the last check.",
+    "db_replica_healthy": "1 when the read replica is used, 0 when reads fail over to primary.",
+}
+
+# psycopg_pool の get_stats() のキー → 公開するゲージ名
+POOL_STATS = {
+    "pool_size": "db_pool_size",
+    "pool_available": "db_pool_available",
+    "requests_waiting": "db_pool_requests_waiting",
+    "requests_num": "db_pool_requests_total",
+    "requests_wait_ms": "db_pool_requests_wait_ms",
+    "requests_errors": "db_pool_requests_errors",
+    "connections_lost": "db_pool_connections_lost",
+}
+
+_local = threading.local()
+_lock = threading.Lock()
+# [(スレッド, シャード)]
+_shards = []
+_retired = {"counters": {}, "histograms": {}}
+_gauges = {}
+_flusher_pid = None
+
+
+def _labels_key(labels: dict) -> tuple:
+    return tuple(sorted((key, str(value)) for key, value in labels.items()))
+
+
+def buckets(name: str) -> tuple:
+    return BUCKETS.get(name, DEFAULT_BUCKETS)
+
+
+def _shard() -> dict:
+    shard = getattr(_local, "shard", None)
+    if shard is None:
+        shard = {"counters": {}, "histograms": {}}
+        _local.shard = shard
+        with _lock:
+            _retire_finished()
+            _shards.append((threading.current_thread(), shard))
+        _ensure_flusher()
+    return shard
+
+
+def inc(name: str, value: float = 1, **labels):
+    counters = _shard()["counters"]
+    key = (name, _labels_key(labels))
+    counters[key] = counters.get(key, 0) + value
+
+
+def observe(name: str, value: float, **labels):
+    histograms = _shard()["histograms"]
+    key = (name, _labels_key(labels))
+    bounds = buckets(name)
+    row = histograms.get(key)
+    if row is None:
+        # [bucket counts..., +Inf count, sum]
+        row = histograms[key] = [0] * (len(bounds) + 1) + [0.0]
+    for index, bound in enumerate(bounds):
+        if value <= bound:
+            row[index] += 1
+            break
+    else:
+        row[len(bounds)] += 1
+    row[-1] += value
+
+
+def set_gauge(name: str, value: float, **labels):
+    _gauges[(name, _labels_key(labels))] = value
+
+
+@contextmanager
+def timer(name: str, **labels):
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        observe(name, time.perf_counter() - started, **labels)
+
+
+def record_cache_access(cache: str, hit: bool):
+    inc("cache_requests_total", cache=cache, result="hit" if hit else "miss")
+
+
+def record_pool_stats():
+    """Copy psycopg pool statistics of every configured database into gauges."""
+    from django.db import connections
+
+    for conn in connections.all():
+        pool = getattr(conn, "pool", None)
+        if pool is None:
+            continue
+        stats = pool.get_stats()
+        for key, name in POOL_STATS.items():
+            set_gauge(name, stats.get(key, 0), database=conn.alias)
+
+
+# --- Snapshots ---
+
+
+def _copy(mapping: dict) -> list:
+    # 他スレッドが書き込み中でも読み取れるよう、サイズ変更時はリトライする
+    while True:
+        try:
+            return list(mapping.items())
+        except RuntimeError:
+            continue
+
+
+def _merge_into(target: dict, shard: dict):
+    counters, histograms = target["counters"], target["histograms"]
+    for key, value in _copy(shard["counters"]):
+        counters[key] = counters.get(key, 0) + value
+    for key, row in _copy(shard["histograms"]):
+        merged = histograms.get(key)
+        histograms[key] = list(row) if merged is None else [a + b for a, b in zip(merged, row)]
+
+
+def _retire_finished():
+    """Fold shards of finished threads into ``_retired`` (called with ``_lock`` held)."""
+    alive = []
+    for thread, shard in _shards:
+        if thread.is_alive():
+            alive.append((thread, shard))
+        else:
+            _merge_into(_retired, shard)
+    _shards[:] = alive
+
+
+def snapshot() -> dict:
+    """Merge every thread shard of this process into a JSON-serializable dict."""
+    record_pool_stats()
+    merged = {"counters": {}, "histograms": {}}
+    with _lock:
+        _retire_finished()
+        _merge_into(merged, _retired)
+        for _, shard in _shards:
+            _merge_into(merged, shard)
+    counters, histograms = merged["counters"], merged["histograms"]
+    return {
+        "pid": os.getpid(),
+        "flushed_at": time.time(),
+        "counters": [[name, list(labels), value] for (name, labels), value in counters.items()],
+        "histograms": [[name, list(labels), row] for (name, labels), row in histograms.items()],
+        "gauges": [[name, list(labels), value] for (name, labels), value in _copy(_gauges)],
+    }
+
+
+def _multiproc_dir():
+    directory = getattr(settings, "METRICS_MULTIPROC_DIR", None)
+    return Path(directory) if directory else None
+
+
+def flush():
+    """Write this process's snapshot to the multiprocess directory (atomic replace)."""
+    directory = _multiproc_dir()
+    if directory is None:
+        return
+    directory.mkdir(parents=True, exist_ok=True)
+    fd, tmp_path = tempfile.mkstemp(dir=directory, suffix=".tmp")
+    with os.fdopen(fd, "w") as fp:
+        json.dump(snapshot(), fp)
+    os.replace(tmp_path, directory / f"metrics_{os.getpid()}.json")
+
+
+def _ensure_flusher():
+    global _flusher_pid
+    if _multiproc_dir() is None or _flusher_pid == os.getpid():
+        return
+    _flusher_pid = os.getpid()
+    interval = getattr(settings, "METRICS_FLUSH_INTERVAL", 10)
+
+    def run():
+        while True:
+            time.sleep(interval)
+            try:
+                flush()
+            except OSError:
+                pass
+
+    threading.Thread(target=run, name="metrics-flusher", daemon=True).start()
+
+
+def collect() -> list:
+    """Return snapshots of every live worker (or just this process)."""
+    directory = _multiproc_dir()
+    if directory is None:
+        return [snapshot()]
+    flush()
+    stale_after = getattr(settings, "METRICS_STALE_SECONDS", 86400)
+    snapshots = []
+    for path in directory.glob("metrics_*.json"):
+        try:
+            with path.open() as fp:
+                data = json.load(fp)
+        except (OSError, ValueError):
+            continue
+        if time.time() - data["flushed_at"] > stale_after:
+            path.unlink(missing_ok=True)
+            continue
+        snapshots.append(data)
+    return snapshots
+
+
+# --- Exposition ---
+
+
+def _format_labels(labels) -> str:
+    if not labels:
+        return ""
+    body = ",".join(
+        '{}="{}"'.format(key, str(value).replace("\\", "\\\\").replace('"', '\\"'))
+        for key, value in labels
+    )
+    return "{" + body + "}"
+
+
+def _format_value(value) -> str:
+    if isinstance(value, float) and math.isinf(value):
+        return "+Inf"
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+def render(snapshots) -> str:
+    counters, histograms, gauges = {}, {}, {}
+    now = time.time()
+    for data in snapshots:
+        for name, labels, value in data["counters"]:
+            key = (name, tuple(map(tuple, labels)))
+            counters[key] = counters.get(key, 0) + value
+        for name, labels, row in data["histograms"]:
+            key = (name, tuple(map(tuple, labels)))
+            merged = histograms.get(key)
+            histograms[key] = list(row) if merged is None else [a + b for a, b in zip(merged, row)]
+        for name, labels, value in data["gauges"]:
+            key = (name, tuple(map(tuple, labels)) + (("pid", str(data["pid"])),))
+            gauges[key] = value
+        gauges[("metrics_flush_lag_seconds", (("pid", str(data["pid"])),))] = round(
+            now - data["flushed_at"], 3
+        )
+
+    cache_totals = {}
+    for (name, labels), value in counters.items():
+        if name == "cache_requests_total":
+            label_map = dict(labels)
+            hits, total = cache_totals.get(label_map["cache"], (0, 0))
+            if label_map["result"] == "hit":
+                hits += value
+            cache_totals[label_map["cache"]] = (hits, total + value)
+    for cache, (hits, total) in cache_totals.items():
+        gauges[("cache_hit_ratio", (("cache", cache),))] = round(hits / total, 4) if total else 0
+
+    lines = []
+
+    def header(name, kind):
+        if HELP.get(name):
+            lines.append(f"# HELP {name} {HELP[name]}")
+        lines.append(f"# TYPE {name} {kind}")
+
+    for kind, series in (("counter", counters), ("gauge", gauges)):
+        seen = set()
+        for (name, labels), value in sorted(series.items()):
+            if name not in seen:
+                header(name, kind)
+                seen.add(name)
+            lines.append(f"{name}{_format_labels(labels)} {_format_value(value)}")
+
+    seen = set()
+    for (name, labels), row in sorted(histograms.items()):
+        if name not in seen:
+            header(name, "histogram")
+            seen.add(name)
+        cumulative = 0
+        for bound, count in zip(list(buckets(name)) + [math.inf], row[:-1]):
+            cumulative += count
+            le_labels = tuple(labels) + (("le", _format_value(float(bound))),)
+            lines.append(f"{name}_bucket{_format_labels(le_labels)} {cumulative}")
+        lines.append(f"{name}_sum{_format_labels(labels)} {_format_value(row[-1])}")
+        lines.append(f"{name}_count{_format_labels(labels)} {cumulative}")
+    return "\n".join(lines) + "\n"
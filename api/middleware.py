@@ -0,0 +1,333 @@
+import functools
+import json
+import logging
+import random
+import re
+import threading
+import time
+from collections import Counter
+from contextlib import contextmanager
+from contextvars import ContextVar
+from types import SimpleNamespace
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.conf import settings
+
+logger = logging.getLogger("api.sql")
+
+_IN_LIST_RE = re.compile(r"IN \((?:%s, )*%s\)")
+_NUMBER_RE = re.compile(r"\b\d+\b")
+_WHITESPACE_RE = re.compile(r"\s+")
+
+_execute_wrappers: ContextVar[tuple] = ContextVar("execute_wrappers", default=())
+
+
+def normalize_sql(sql: str) -> str:
+    """Reduce a SQL statement to its shape (placeholders/IN lists/numbers collapsed)."""
+    shape = _IN_LIST_RE.sub("IN (...)", sql)
+    shape = _NUMBER_RE.sub("?", shape)
+    return _WHITESPACE_RE.sub(" ", shape).strip()
+
+
+def _dispatch_execute(execute, sql, params, many, context):
+    for wrapper in reversed(_execute_wrappers.get()):
+        execute = functools.partial(wrapper, execute)
+    return execute(sql, params, many, context)
+
+
+def install_execute_dispatch(sender, connection, **kwargs):
+    """``connection_created`` receiver routing every connection through ``execute_wrapper``."""
+    if _dispatch_execute not in connection.execute_wrappers:
+        # 先頭に入れておけば connection.execute_wrapper() の pop() と干渉しない
+        connection.execute_wrappers.insert(0, _dispatch_execute)
+
+
+@contextmanager
+def execute_wrapper(wrapper):
+    """
+    Apply ``wrapper`` to every query run in the current context.
+
+    Unlike ``connection.execute_wrapper`` this follows the request into the
+    ``sync_to_async`` threads used by async views and the async ORM, because the
+    wrappers live in a context variable rather than on a thread-local connection.
+    """
+    token = _execute_wrappers.set(_execute_wrappers.get() + (wrapper,))
+    try:
+        yield
+    finally:
+        _execute_wrappers.reset(token)
+
+
+class HybridMiddleware:
+    """
+    Base for middleware that runs natively under WSGI and ASGI.
+
+    Subclasses implement ``wrap(request)``, a context manager yielding a scope whose
+    ``response`` attribute is filled in before the block exits.
+    """
+
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        with self.wrap(request) as scope:
+            scope.response = self.get_response(request)
+        return scope.response
+
+    async def __acall__(self, request):
+        with self.wrap(request) as scope:
+            scope.response = await self.get_response(request)
+        return scope.response
+
+    def wrap(self, request):
+        raise NotImplementedError
+
+
+class QueryStats:
+    """Per-request SQL counters collected through ``connection.execute_wrapper``."""
+
+    def __init__(self, *, track_shapes: bool = False, slow_threshold=None, request=None):
+        self.count = 0
+        self.duration = 0.0
+        self.track_shapes = track_shapes
+        self.shapes = Counter()
+        self.slow_threshold = slow_threshold
+        self.request = request
+
+    def __call__(self, execute, sql, params, many, context):
+        started = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            elapsed = time.perf_counter() - started
+            self.duration += elapsed
+            self.count += 1
+            if self.track_shapes:
+                self.shapes[sql] += 1
+            if self.slow_threshold is not None and elapsed >= self.slow_threshold and not many:
+                self._report_slow(sql, params, elapsed, context)
+
+    def _report_slow(self, sql, params, elapsed, context):
+        from .slow_queries import report
+
+        match = getattr(self.request, "resolver_match", None)
+        report(
+            sql,
+            params,
+            duration=elapsed,
+            view=match.view_name if match else "",
+            using=context["connection"].alias,
+        )
+
+    def repeated_shapes(self, threshold: int) -> list:
+        """Return ``(shape, count)`` pairs executed at least ``threshold`` times (N+1 candidates)."""
+        grouped = Counter()
+        for sql, count in self.shapes.items():
+            grouped[normalize_sql(sql)] += count
+        return [(shape, count) for shape, count in grouped.most_common() if count >= threshold]
+
+
+class QueryInstrumentationMiddleware(HybridMiddleware):
+    """
+    Count SQL queries and DB time per request.
+
+    Every request gets a ``Server-Timing`` header (cheap counters only). A sampled
+    fraction additionally records SQL shapes to detect N+1 patterns and emits a
+    structured JSON log line; requests with N+1 candidates are logged as warnings.
+    """
+
+    @contextmanager
+    def wrap(self, request):
+        scope = SimpleNamespace(response=None)
+        if not getattr(settings, "QUERY_INSTRUMENTATION_ENABLED", True):
+            yield scope
+            return
+
+        sample_rate = getattr(settings, "QUERY_INSTRUMENTATION_SAMPLE_RATE", 0.0)
+        sampled = sample_rate > 0 and random.random() < sample_rate
+        slow_ms = getattr(settings, "SLOW_QUERY_THRESHOLD_MS", None)
+        stats = QueryStats(
+            track_shapes=sampled,
+            slow_threshold=slow_ms / 1000 if slow_ms is not None else None,
+            request=request,
+        )
+        request.query_stats = stats
+
+        started = time.perf_counter()
+        with execute_wrapper(stats):
+            yield scope
+        total = time.perf_counter() - started
+
+        response = scope.response
+        response["Server-Timing"] = (
+            f'db;dur={stats.duration * 1000:.2f};desc="{stats.count} queries", '
+            f"total;dur={total * 1000:.2f}"
+        )
+        if sampled:
+            self._log(request, response, stats, total)
+
+    def _log(self, request, response, stats, total):
+        threshold = getattr(settings, "QUERY_INSTRUMENTATION_N_PLUS_ONE_THRESHOLD", 5)
+        repeated = stats.repeated_shapes(threshold)
+        match = getattr(request, "resolver_match", None)
+        payload = {
+            "event": "request_sql",
+            "method": request.method,
+            "path": request.path,
+            "view": match.view_name if match else None,
+            "status": response.status_code,
+            "queries": stats.count,
+            "db_ms": round(stats.duration * 1000, 2),
+            "total_ms": round(total * 1000, 2),
+            "n_plus_one": [{"sql": shape, "count": count} for shape, count in repeated],
+        }
+        level = logging.WARNING if repeated else logging.INFO
+        logger.log(level, json.dumps(payload, ensure_ascii=False))
+
+
+class ProfilingMiddleware(HybridMiddleware):
+    """
+    Wrap a request in ``api.profiling.SamplingProfiler`` when asked to.
+
+    Profiling is switched on by the ``X-Profile: 1`` header from a staff user or
+    by ``PROFILING_SAMPLE_RATE``. The header triggers an early DRF authentication
+    so non-staff requests never take a slot; without it the request pays for one
+    header lookup.
+    """
+
+    HEADER = "HTTP_X_PROFILE"
+
+    def __init__(self, get_response):
+        super().__init__(get_response)
+        self._slots = threading.BoundedSemaphore(getattr(settings, "PROFILING_MAX_CONCURRENT", 2))
+
+    async def __acall__(self, request):
+        # サンプラーは 1 スレッドのスタックしか追えないため、ASGI（イベントループと
+        # sync_to_async スレッドをまたぐ）リクエストはプロファイルしない
+        return await self.get_response(request)
+
+    @contextmanager
+    def wrap(self, request):
+        scope = SimpleNamespace(response=None)
+        requested = request.META.get(self.HEADER) == "1"
+        sample_rate = getattr(settings, "PROFILING_SAMPLE_RATE", 0.0)
+        sampled = sample_rate > 0 and random.random() < sample_rate
+        if not (sampled or (requested and _is_staff_request(request))):
+            yield scope
+            return
+        if not self._slots.acquire(blocking=False):
+            yield scope
+            return
+
+        from .profiling import SamplingProfiler, store_profile
+
+        try:
+            profiler = SamplingProfiler(
+                threading.get_ident(),
+                interval=getattr(settings, "PROFILING_INTERVAL", 0.005),
+            ).start()
+            try:
+                yield scope
+            finally:
+                stacks = profiler.stop()
+
+            match = getattr(request, "resolver_match", None)
+            endpoint = match.view_name if match else "unresolved"
+            store_profile(endpoint, stacks)
+            scope.response["X-Profile-Samples"] = str(sum(stacks.values()))
+        finally:
+            self._slots.release()
+
+
+def _is_staff_request(request) -> bool:
+    """Authenticate with DRF's configured authenticators ahead of the view."""
+    from rest_framework.exceptions import APIException
+    from rest_framework.request import Request
+    from rest_framework.settings import api_settings
+
+    drf_request = Request(
+        request, authenticators=[auth() for auth in api_settings.DEFAULT_AUTHENTICATION_CLASSES]
+    )
+    try:
+        return drf_request.user.is_staff
+    except APIException:
+        # 認証エラーの応答はビュー側の認証に任せる
+        return False
+
+
+class MetricsMiddleware(HybridMiddleware):
+    """Record per-view latency, DB time and query-count histograms (see ``api.metrics``)."""
+
+    @contextmanager
+    def wrap(self, request):
+        from . import metrics
+
+        scope = SimpleNamespace(response=None)
+        started = time.perf_counter()
+        yield scope
+        elapsed = time.perf_counter() - started
+
+        match = getattr(request, "resolver_match", None)
+        view = match.view_name if match else "unresolved"
+        metrics.observe("http_request_duration_seconds", elapsed, view=view, method=request.method)
+        metrics.inc(
+            "http_requests_total", view=view, method=request.method, status=scope.response.status_code
+        )
+        stats = getattr(request, "query_stats", None)
+        if stats is not None:
+            metrics.observe("db_query_duration_seconds", stats.duration, view=view)
+            metrics.observe("db_queries_per_request", stats.count, view=view)
+
+
+class TracingMiddleware(HybridMiddleware):
+    """Open a root span per request and a child span per SQL query (see ``api.tracing``)."""
+
+    @contextmanager
+    def wrap(self, request):
+        from . import tracing
+
+        scope = SimpleNamespace(response=None)
+        if not tracing.is_enabled():
+            yield scope
+            return
+
+        def db_span(execute, sql, params, many, context):
+            with tracing.span("db.query", sql=sql[:300]):
+                return execute(sql, params, many, context)
+
+        with tracing.start_trace("http.request", method=request.method, path=request.path) as root:
+            with execute_wrapper(db_span):
+                yield scope
+            match = getattr(request, "resolver_match", None)
+            root.name = f"{request.method} {match.view_name if match else 'unresolved'}"
+            root.set_attribute("status", scope.response.status_code)
+
+
+class ReadReplicaMiddleware(HybridMiddleware):
+    """Pick the database for a request's reads (see ``api.db_router``)."""
+
+    @contextmanager
+    def wrap(self, request):
+        from . import db_router
+
+        scope = SimpleNamespace(response=None)
+        with db_router.request_route() as route:
+            request.db_route = route
+            yield scope
+        if request.method not in db_router.READ_METHODS and scope.response.status_code < 400:
+            db_router.mark_recent_write(request)
+
+    def process_view(self, request, view_func, view_args, view_kwargs):
+        from . import db_router
+
+        route = getattr(request, "db_route", None)
+        if route is not None:
+            route.alias = db_router.choose_database(request, view_func)
+        return None
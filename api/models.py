@@ -1,3 +1,21 @@
 from django.db import models
 
-# Create your models here.
+
+class SlowQueryLog(models.Model):
+    """SQL statements that exceeded SLOW_QUERY_THRESHOLD_MS, with their plan."""
+
+    fingerprint = models.CharField(max_length=40, db_index=True)
+    sql = models.TextField()
+    params = models.TextField(blank=True)
+    view = models.CharField(max_length=100, blank=True)
+    database = models.CharField(max_length=50, default="default")
+    duration_ms = models.FloatField()
+    plan = models.TextField(blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        db_table = "slow_query_log"
+        ordering = ["-created_at"]
+
+    def __str__(self) -> str:
+        return f"SlowQuery<{self.fingerprint[:8]}:{self.duration_ms:.0f}ms>"
@@ -0,0 +1,87 @@
+from django.conf import settings
+from rest_framework.pagination import CursorPagination
+from rest_framework.response import Response
+
+
+class KeysetCursorPagination(CursorPagination):
+    """
+    Cursor pagination over ``(created_at, id)`` backed by a matching composite index.
+
+    OFFSET と違い深いページでも索引を範囲検索するだけで済む。``opt_in`` のクラスは
+    ``cursor`` / ``page_size`` が指定されなければ、``LIST_PAGINATION_COMPAT`` の間は従来の
+    形式（ページのエンベロープなしの配列）で先頭 ``max_page_size`` 件を返し、続きがあれば
+    ``Link: <...>; rel="next"`` ヘッダを付ける。無効にすると常に ``{"next", "previous", "results"}``
+    で返す。ビューが ``get_pagination_ordering()`` を持てば、その並び（絞り込みに合う索引の順）を使う。
+    """
+
+    page_size = 20
+    page_size_query_param = "page_size"
+    max_page_size = 100
+    ordering = ("-created_at", "-id")
+    cursor_query_param = "cursor"
+    opt_in = False
+
+    def is_requested(self, request) -> bool:
+        params = request.query_params
+        return not self.opt_in or self.cursor_query_param in params or self.page_size_query_param in params
+
+    def paginate_queryset(self, queryset, request, view=None):
+        self.plain = not self.is_requested(request) and getattr(settings, "LIST_PAGINATION_COMPAT", True)
+        return super().paginate_queryset(queryset, request, view)
+
+    def get_page_size(self, request):
+        if getattr(self, "plain", False):
+            return self.max_page_size
+        return super().get_page_size(request)
+
+    def get_ordering(self, request, queryset, view):
+        if view is not None and hasattr(view, "get_pagination_ordering"):
+            return view.get_pagination_ordering()
+        return super().get_ordering(request, queryset, view)
+
+    def get_paginated_response(self, data):
+        if not getattr(self, "plain", False):
+            return super().get_paginated_response(data)
+        next_link = self.get_next_link()
+        headers = {"Link": f'<{next_link}>; rel="next"'} if next_link else None
+        return Response(data, headers=headers)
+
+    def paginate_first_page(self, objects, request, view=None):
+        """
+        First page from ``objects`` already sorted by ``ordering`` (e.g. from a cache).
+
+        ``objects`` には 1 ページ + 1 件を渡す（次ページの有無と ``next`` のカーソル位置に使う）。
+        ``next`` は DB からページングした場合と同じカーソルになる。
+        """
+        self.request = request
+        self.plain = False
+        self.page_size = self.get_page_size(request)
+        self.base_url = request.build_absolute_uri()
+        self.ordering = self.get_ordering(request, None, view)
+        self.cursor = None
+        self.page = list(objects[: self.page_size])
+        self.has_previous = False
+        self.has_next = len(objects) > self.page_size
+        if self.has_next:
+            self.next_position = self._get_position_from_instance(objects[self.page_size], self.ordering)
+        return self.page
+
+
+class OptInKeysetCursorPagination(KeysetCursorPagination):
+    opt_in = True
+
+
+class FollowCursorPagination(OptInKeysetCursorPagination):
+    ordering = ("-time", "-id")
+
+
+class PostCursorPagination(OptInKeysetCursorPagination):
+    """``/api/posts/``; ``PostViewSet.get_pagination_ordering`` picks the index per filter."""
+
+    ordering = ("-time", "-post_id")
+
+
+class UserCursorPagination(OptInKeysetCursorPagination):
+    """``/api/users/`` by likes received over ``stats_likes_received_idx``."""
+
+    ordering = ("-total_likes", "-user_id")
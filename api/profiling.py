@@ -0,0 +1,111 @@
+"""
+On-demand sampling profiler
+
+リクエストを処理しているスレッドのスタックを別スレッドから一定間隔でサンプリングし、
+flamegraph.pl / speedscope で読める collapsed stacks 形式でエンドポイントごとに保存する。
+ビュー・シリアライザなど、リクエストスレッド上で動く処理のみが含まれる。
+NOTIFICATIONS_ASYNC（既定）では FCM 送信が `fcm-send` スレッドプールで動くため、送信処理は含まれない。
+"""
+
+import os
+import re
+import sys
+import tempfile
+import threading
+import time
+from collections import Counter
+from pathlib import Path
+
+from django.conf import settings
+
+_SAFE_NAME_RE = re.compile(r"[^A-Za-z0-9_.-]")
+_write_lock = threading.Lock()
+
+
+class SamplingProfiler:
+    """Sample the stack of one thread every ``interval`` seconds from a helper thread."""
+
+    def __init__(self, thread_id: int, interval: float = 0.005):
+        self.thread_id = thread_id
+        self.interval = interval
+        self.stacks = Counter()
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, name="sampling-profiler", daemon=True)
+
+    def start(self):
+        self._thread.start()
+        return self
+
+    def stop(self) -> Counter:
+        self._stop.set()
+        self._thread.join()
+        return self.stacks
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            frame = sys._current_frames().get(self.thread_id)
+            if frame is None:
+                continue
+            self.stacks[_collapse(frame)] += 1
+
+
+def _collapse(frame) -> str:
+    names = []
+    while frame is not None:
+        code = frame.f_code
+        names.append(f"{frame.f_globals.get('__name__', '?')}:{code.co_name}")
+        frame = frame.f_back
+    names.reverse()
+    return ";".join(names)
+
+
+def profile_dir() -> Path:
+    return Path(getattr(settings, "PROFILING_OUTPUT_DIR", tempfile.gettempdir()))
+
+
+def profile_path(endpoint: str) -> Path:
+    return profile_dir() / f"{_SAFE_NAME_RE.sub('_', endpoint)}.collapsed"
+
+
+def read_profile(path: Path) -> Counter:
+    stacks = Counter()
+    if not path.exists():
+        return stacks
+    with path.open() as fp:
+        for line in fp:
+            stack, _, count = line.rstrip("\n").rpartition(" ")
+            if stack and count.isdigit():
+                stacks[stack] += int(count)
+    return stacks
+
+
+def store_profile(endpoint: str, stacks: Counter) -> Path:
+    """Merge ``stacks`` into the endpoint's collapsed-stack file (atomic replace)."""
+    path = profile_path(endpoint)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    with _write_lock:
+        merged = read_profile(path)
+        merged.update(stacks)
+        fd, tmp_path = tempfile.mkstemp(dir=path.parent, suffix=".tmp")
+        with os.fdopen(fd, "w") as fp:
+            for stack, count in merged.most_common():
+                fp.write(f"{stack} {count}\n")
+        os.replace(tmp_path, path)
+    return path
+
+
+def list_profiles() -> list:
+    directory = profile_dir()
+    if not directory.exists():
+        return []
+    profiles = []
+    for path in sorted(directory.glob("*.collapsed")):
+        stat = path.stat()
+        profiles.append(
+            {
+                "endpoint": path.stem,
+                "samples": sum(read_profile(path).values()),
+                "updated_at": time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime(stat.st_mtime)),
+            }
+        )
+    return profiles
@@ -1,9 +1,108 @@
+from django.db.models import Count, Q
 from rest_framework import serializers
 
 from accounts.models import CustomUser, UserStats
 from follow.models import Follow
 from post.models import Like, Post
 
+from . import metrics
+from .services import profile_cache
+from .services.deletion import DELETED_USERNAME_PREFIX
+
+
+def _rank_values(users) -> set:
+    values = set()
+    for user in users:
+        stats = getattr(user, "stats", None)
+        if stats is not None:
+            values.add(stats.total_likes_received)
+    return values
+
+
+def _rank_aggregates(values) -> dict:
+    return {
+        f"gt_{value}": Count("pk", filter=Q(total_likes_received__gt=value)) for value in values
+    }
+
+
+def build_rank_lookup(users) -> dict:
+    """
+    Map ``total_likes_received`` -> rank for the given users in one aggregate query.
+
+    Matches ``CustomUserSerializer.get_rank``: 1 + number of users with strictly
+    more likes received. Users annotated with ``like_rank`` are included too,
+    because the cached profile payload stores this all-time rank.
+    """
+    values = _rank_values(users)
+    if not values:
+        return {}
+    counts = UserStats.objects.aggregate(**_rank_aggregates(values))
+    return {value: counts[f"gt_{value}"] + 1 for value in values}
+
+
+async def abuild_rank_lookup(users) -> dict:
+    """Async ORM version of ``build_rank_lookup``."""
+    values = _rank_values(users)
+    if not values:
+        return {}
+    counts = await UserStats.objects.aaggregate(**_rank_aggregates(values))
+    return {value: counts[f"gt_{value}"] + 1 for value in values}
+
+
+def _follow_edges(viewer, user_ids):
+    return Follow.objects.filter(
+        Q(user=viewer, aim_user_id__in=user_ids) | Q(user_id__in=user_ids, aim_user=viewer)
+    ).values_list("user_id", "aim_user_id")
+
+
+def _split_follow_edges(viewer, edges) -> dict:
+    following, followers = set(), set()
+    for user_id, aim_user_id in edges:
+        if user_id == viewer.pk:
+            following.add(aim_user_id)
+        if aim_user_id == viewer.pk:
+            followers.add(user_id)
+    return {"following_ids": following, "follower_ids": followers}
+
+
+def build_follow_lookup(viewer, users) -> dict:
+    """
+    ``following_ids`` / ``follower_ids`` of ``viewer`` among ``users`` in one query.
+
+    ``follow_lookup_ids`` records which users the sets cover.
+
+    ``CustomUserSerializer.get_is_following`` / ``get_follows_you`` read these
+    instead of querying per user.
+    """
+    user_ids = {user.pk for user in users}
+    lookup = _split_follow_edges(viewer, _follow_edges(viewer, user_ids))
+    return {**lookup, "follow_lookup_ids": user_ids}
+
+
+async def abuild_follow_lookup(viewer, users) -> dict:
+    """Async ORM version of ``build_follow_lookup``."""
+    user_ids = {user.pk for user in users}
+    lookup = _split_follow_edges(viewer, [edge async for edge in _follow_edges(viewer, user_ids)])
+    return {**lookup, "follow_lookup_ids": user_ids}
+
+
+class InstrumentedListSerializer(serializers.ListSerializer):
+    """Time ``.data`` of list responses under the child serializer's name."""
+
+    @property
+    def data(self):
+        with metrics.timer("serializer_duration_seconds", serializer=type(self.child).__name__):
+            return super().data
+
+
+class InstrumentedModelSerializer(serializers.ModelSerializer):
+    """Time ``.data`` of top-level serializers (nested ones are covered by the parent)."""
+
+    @property
+    def data(self):
+        with metrics.timer("serializer_duration_seconds", serializer=type(self).__name__):
+            return super().data
+
 
 class UserStatsSerializer(serializers.ModelSerializer):
     class Meta:
@@ -21,13 +120,37 @@ class UserStatsSerializer(serializers.ModelSerializer):
         read_only_fields = fields
 
 
-class CustomUserSerializer(serializers.ModelSerializer):
+class ProfileSerializer(serializers.ModelSerializer):
+    """Viewer-independent fields of ``CustomUserSerializer`` (cached by ``profile_cache``)."""
+
+    stats = UserStatsSerializer(read_only=True)
+
+    class Meta:
+        model = CustomUser
+        fields = [
+            "user_id",
+            "username",
+            "user_name",
+            "user_rank",
+            "user_level",
+            "user_mail",
+            "user_URL",
+            "user_bio",
+            "stats",
+        ]
+        read_only_fields = fields
+
+
+class CustomUserSerializer(InstrumentedModelSerializer):
     password = serializers.CharField(write_only=True, required=False)
     stats = UserStatsSerializer(read_only=True)
     rank = serializers.SerializerMethodField()
+    is_following = serializers.SerializerMethodField()
+    follows_you = serializers.SerializerMethodField()
 
     class Meta:
         model = CustomUser
+        list_serializer_class = InstrumentedListSerializer
         fields = [
             "user_id",
             "username",
@@ -40,8 +163,19 @@ class CustomUserSerializer(serializers.ModelSerializer):
             "user_bio",
             "stats",
             "rank",
+            "is_following",
+            "follows_you",
         ]
-        read_only_fields = ["user_id", "stats", "rank"]
+        read_only_fields = ["user_id", "stats", "rank", "is_following", "follows_you"]
+
+    def validate_username(self, value):
+        # 退会ユーザのリネーム先（deleted-<id>）と衝突させない
+        unchanged = self.instance is not None and self.instance.username == value
+        if value.startswith(DELETED_USERNAME_PREFIX) and not unchanged:
+            raise serializers.ValidationError(
+                f"Usernames starting with '{DELETED_USERNAME_PREFIX}' are reserved."
+            )
+        return value
 
     def create(self, validated_data):
         password = validated_data.pop("password", None)
@@ -64,18 +198,76 @@ class CustomUserSerializer(serializers.ModelSerializer):
         rank = getattr(obj, "like_rank", None)
         if rank is not None:
             return rank
+        return self._total_likes_rank(obj)
+
+    def _total_likes_rank(self, obj):
         stats = getattr(obj, "stats", None)
         if not stats:
             return None
-        from accounts.models import UserStats  # local import to avoid cycle
-
+        rank_lookup = self.context.get("rank_by_total_likes")
+        if rank_lookup and stats.total_likes_received in rank_lookup:
+            return rank_lookup[stats.total_likes_received]
         better_count = UserStats.objects.filter(
             total_likes_received__gt=stats.total_likes_received
         ).count()
         return better_count + 1
 
+    def build_profile(self, instance) -> dict:
+        payload = dict(ProfileSerializer(instance).data)
+        payload["rank"] = self._total_likes_rank(instance)
+        return payload
+
+    def get_profile(self, instance) -> dict:
+        payloads = self.context.get("profile_payloads")
+        if payloads is None or instance.pk not in payloads:
+            return profile_cache.get_or_build(instance.pk, lambda: self.build_profile(instance))
+        version, payload = payloads[instance.pk]
+        if payload is None:
+            payload = self.build_profile(instance)
+            profile_cache.store(instance.pk, version, payload)
+            payloads[instance.pk] = (version, payload)
+        return payload
+
+    def to_representation(self, instance):
+        payload = self.get_profile(instance)
+        rank = getattr(instance, "like_rank", None)
+        rank_lookup = self.context.get("rank_by_total_likes")
+        if rank is None and rank_lookup:
+            # 一覧ではページ単位で求めた最新の順位を優先する
+            stats = getattr(instance, "stats", None)
+            if stats is not None:
+                rank = rank_lookup.get(stats.total_likes_received)
+        return {
+            **payload,
+            "rank": payload["rank"] if rank is None else rank,
+            "is_following": self.get_is_following(instance),
+            "follows_you": self.get_follows_you(instance),
+        }
+
+    def _follow_state(self, obj, key):
+        request = self.context.get("request")
+        viewer = getattr(request, "user", None)
+        if not getattr(viewer, "is_authenticated", False) or viewer.pk == obj.pk:
+            return False
+        lookup = self.context
+        if obj.pk not in lookup.get("follow_lookup_ids", ()):
+            # 一覧以外（詳細・作成レスポンス）は表示するユーザごとに 1 クエリで両方求める
+            cache = getattr(self, "_follow_cache", None)
+            if cache is None:
+                cache = self._follow_cache = {}
+            if obj.pk not in cache:
+                cache[obj.pk] = build_follow_lookup(viewer, [obj])
+            lookup = cache[obj.pk]
+        return obj.pk in lookup[key]
+
+    def get_is_following(self, obj):
+        return self._follow_state(obj, "following_ids")
 
-class PostSerializer(serializers.ModelSerializer):
+    def get_follows_you(self, obj):
+        return self._follow_state(obj, "follower_ids")
+
+
+class PostSerializer(InstrumentedModelSerializer):
     user = CustomUserSerializer(read_only=True)
     user_id = serializers.PrimaryKeyRelatedField(
         queryset=CustomUser.objects.all(),
@@ -88,6 +280,7 @@ class PostSerializer(serializers.ModelSerializer):
 
     class Meta:
         model = Post
+        list_serializer_class = InstrumentedListSerializer
         fields = [
             "post_id",
             "user",
@@ -110,24 +303,22 @@ class PostSerializer(serializers.ModelSerializer):
         return Like.objects.filter(user=user, post=obj).exists()
 
 
-class FollowSerializer(serializers.ModelSerializer):
+def missing_object_error(field: str, pk) -> serializers.ValidationError:
+    """The error ``PrimaryKeyRelatedField`` would raise for a missing ``pk``."""
+    message = serializers.PrimaryKeyRelatedField.default_error_messages["does_not_exist"]
+    return serializers.ValidationError({field: [message.format(pk_value=pk)]})
+
+
+class FollowSerializer(InstrumentedModelSerializer):
     user = CustomUserSerializer(read_only=True)
-    user_id = serializers.PrimaryKeyRelatedField(
-        queryset=CustomUser.objects.all(),
-        source="user",
-        write_only=True,
-        required=False,
-        allow_null=True,
-    )
+    # 作成時の存在・重複チェックはビューの insert_ignore が 1 往復で行うので、ID のまま受け取る
+    user_id = serializers.IntegerField(write_only=True, required=False, allow_null=True)
     aim_user = CustomUserSerializer(read_only=True)
-    aim_user_id = serializers.PrimaryKeyRelatedField(
-        queryset=CustomUser.objects.all(),
-        source="aim_user",
-        write_only=True,
-    )
+    aim_user_id = serializers.IntegerField(write_only=True)
 
     class Meta:
         model = Follow
+        list_serializer_class = InstrumentedListSerializer
         fields = [
             "id",
             "user",
@@ -142,41 +333,36 @@ class FollowSerializer(serializers.ModelSerializer):
     def validate(self, attrs):
         request = self.context.get("request")
         request_user = getattr(request, "user", None)
-        user = attrs.get("user") or (
-            request_user if getattr(request_user, "is_authenticated", False) else None
-        )
-        aim_user = attrs.get("aim_user") or getattr(self.instance, "aim_user", None)
-        if not user or not aim_user:
+        if self.instance is None and getattr(request_user, "is_authenticated", False):
+            # 作成はビューが request.user で行うので、クライアントの user_id は見ない
+            user_id = request_user.pk
+        else:
+            user_id = attrs.get("user_id") or getattr(self.instance, "user_id", None)
+        aim_user_id = attrs.get("aim_user_id") or getattr(self.instance, "aim_user_id", None)
+        if not user_id or not aim_user_id:
             return attrs
-        if user == aim_user:
+        if user_id == aim_user_id:
             raise serializers.ValidationError("自分自身をフォローすることはできません。")
-        existing = Follow.objects.filter(user=user, aim_user=aim_user)
         if self.instance:
-            existing = existing.exclude(pk=self.instance.pk)
-        if existing.exists():
-            raise serializers.ValidationError("既にフォロー済みです。")
-        attrs["user"] = user
+            if not CustomUser.objects.filter(pk=aim_user_id).exists():
+                raise missing_object_error("aim_user_id", aim_user_id)
+            existing = Follow.objects.filter(user_id=user_id, aim_user_id=aim_user_id)
+            if existing.exclude(pk=self.instance.pk).exists():
+                raise serializers.ValidationError("既にフォロー済みです。")
+        attrs["user_id"] = user_id
         return attrs
 
 
-class LikeSerializer(serializers.ModelSerializer):
+class LikeSerializer(InstrumentedModelSerializer):
     user = CustomUserSerializer(read_only=True)
-    user_id = serializers.PrimaryKeyRelatedField(
-        queryset=CustomUser.objects.all(),
-        source="user",
-        write_only=True,
-        required=False,
-        allow_null=True,
-    )
+    # 存在・重複チェックはビューの insert_ignore が 1 往復で行うので、ID のまま受け取る
+    user_id = serializers.IntegerField(write_only=True, required=False, allow_null=True)
     post = PostSerializer(read_only=True)
-    post_id = serializers.PrimaryKeyRelatedField(
-        queryset=Post.objects.all(),
-        source="post",
-        write_only=True,
-    )
+    post_id = serializers.IntegerField(write_only=True)
 
     class Meta:
         model = Like
+        list_serializer_class = InstrumentedListSerializer
         fields = [
             "id",
             "user",
@@ -187,20 +373,3 @@ class LikeSerializer(serializers.ModelSerializer):
         ]
         read_only_fields = ["id", "created_at", "user", "post"]
         validators = []
-
-    def validate(self, attrs):
-        request = self.context.get("request")
-        request_user = getattr(request, "user", None)
-        user = attrs.get("user") or (
-            request_user if getattr(request_user, "is_authenticated", False) else None
-        )
-        post = attrs.get("post") or getattr(self.instance, "post", None)
-        if not user or not post:
-            return attrs
-        if self.instance:
-            return attrs
-        exists = Like.objects.filter(user=user, post=post).exists()
-        if exists:
-            raise serializers.ValidationError("既にいいね済みです。")
-        attrs["user"] = user
-        return attrs
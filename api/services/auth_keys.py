@@ -0,0 +1,126 @@
+"""
+Apple / Google sign-in public key cache
+
+Sign in with Apple / Google の ID トークン検証に使う公開鍵をプロセス内にキャッシュする。
+期限（Cache-Control の max-age、なければ AUTH_KEYS_CACHE_SECONDS）を過ぎた後も
+古い鍵を返しつつバックグラウンドスレッドで更新するため、外部への取得でリクエストが
+ブロックされるのはプロセス起動直後の 1 回だけになる。
+"""
+
+import json
+import logging
+import re
+import threading
+import time
+
+import requests as http_requests
+from django.conf import settings
+from google.auth import exceptions as google_exceptions
+from google.auth import transport
+
+logger = logging.getLogger(__name__)
+
+APPLE_KEYS_URL = "https://appleid.apple.com/auth/keys"
+GOOGLE_CERTS_URL = "https://www.googleapis.com/oauth2/v1/certs"
+
+# kid が見つからない時の強制更新の最短間隔（鍵ローテーション直後の対策）
+MIN_REFRESH_INTERVAL = 60
+
+_MAX_AGE_RE = re.compile(r"max-age=(\d+)")
+
+
+class KeySetCache:
+    """Stale-while-revalidate cache of a JSON key set served at ``url``."""
+
+    def __init__(self, url: str):
+        self.url = url
+        self._keys = None
+        self._expires_at = 0.0
+        self._fetched_at = 0.0
+        self._refreshing = False
+        self._lock = threading.Lock()
+
+    def get(self) -> dict:
+        if self._keys is None:
+            with self._lock:
+                if self._keys is None:
+                    self._fetch()
+            return self._keys
+        if time.monotonic() >= self._expires_at:
+            self._refresh_in_background()
+        return self._keys
+
+    def refresh(self) -> dict:
+        """Fetch synchronously unless the keys were fetched less than a minute ago."""
+        with self._lock:
+            if self._keys is None or time.monotonic() - self._fetched_at >= MIN_REFRESH_INTERVAL:
+                self._fetch()
+        return self._keys
+
+    def clear(self):
+        with self._lock:
+            self._keys = None
+            self._expires_at = 0.0
+            self._fetched_at = 0.0
+
+    def _fetch(self):
+        response = http_requests.get(self.url, timeout=10)
+        response.raise_for_status()
+        keys = response.json()
+        match = _MAX_AGE_RE.search(response.headers.get("Cache-Control", ""))
+        ttl = int(match.group(1)) if match else getattr(settings, "AUTH_KEYS_CACHE_SECONDS", 3600)
+        now = time.monotonic()
+        self._keys = keys
+        self._fetched_at = now
+        self._expires_at = now + ttl
+
+    def _refresh_in_background(self):
+        with self._lock:
+            if self._refreshing:
+                return
+            self._refreshing = True
+
+        def run():
+            try:
+                with self._lock:
+                    self._fetch()
+            except Exception as e:
+                logger.warning(f"Failed to refresh keys from {self.url}: {e}")
+            finally:
+                self._refreshing = False
+
+        threading.Thread(target=run, name="auth-keys-refresh", daemon=True).start()
+
+
+apple_keys = KeySetCache(APPLE_KEYS_URL)
+google_certs = KeySetCache(GOOGLE_CERTS_URL)
+
+
+class _CachedResponse(transport.Response):
+    def __init__(self, data: bytes):
+        self._data = data
+
+    @property
+    def status(self):
+        return 200
+
+    @property
+    def headers(self):
+        return {}
+
+    @property
+    def data(self):
+        return self._data
+
+
+class CachedCertsRequest(transport.Request):
+    """``google.auth`` transport that answers the certs request from ``google_certs``."""
+
+    def __call__(self, url, method="GET", body=None, headers=None, timeout=None, **kwargs):
+        if url != GOOGLE_CERTS_URL:
+            raise google_exceptions.TransportError(f"Unexpected request to {url}")
+        try:
+            certs = google_certs.get()
+        except Exception as e:
+            raise google_exceptions.TransportError(f"Could not fetch certificates: {e}") from e
+        return _CachedResponse(json.dumps(certs).encode("utf-8"))
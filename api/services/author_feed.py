@@ -0,0 +1,96 @@
+"""
+Per-author recent post ids (profile feeds)
+
+投稿者ごとに最新の投稿の (time, post_id) を最大 `AUTHOR_FEED_CACHE_SIZE` 件、`author-posts:<user_id>` に
+`AUTHOR_FEED_CACHE_SECONDS` の間キャッシュする。`GET /api/posts/?user_id=` の 1 ページ目は
+この ID と `object_cache` の投稿から組み立てるため、キャッシュが温まっていれば `post` を読まない。
+2 ページ目以降は `post_user_time_idx`（user, -time, -post_id）の範囲検索でカーソルページングする。
+
+- 投稿の作成（`post_save`）では (time, post_id) の順位の位置に挿入し、更新・削除・退会では破棄して
+  次の読み込みで作り直す。
+- キャッシュの ID が上限未満なら、その投稿者の全投稿が入っている（`complete`）。
+- get/set の間は排他しないため、同じ投稿者の同時投稿で 1 件落ちることがある（最大でキャッシュ秒数の間）。
+"""
+
+from bisect import insort
+
+from django.conf import settings
+from django.core.cache import cache
+
+from post.models import Post
+
+# post_user_time_idx と一致させる
+ORDERING = ("-time", "-post_id")
+
+
+def cache_key(user_id) -> str:
+    return f"author-posts:{user_id}"
+
+
+def _size() -> int:
+    return getattr(settings, "AUTHOR_FEED_CACHE_SIZE", 50)
+
+
+def _store(user_id, keys: list, complete: bool):
+    # keys は (time, post_id) の昇順。先頭が最も古い
+    cache.set(
+        cache_key(user_id),
+        {"keys": keys, "complete": complete},
+        getattr(settings, "AUTHOR_FEED_CACHE_SECONDS", 600),
+    )
+
+
+def load(user_id) -> dict:
+    """Cached ``{"keys", "complete"}`` of ``user_id``, filled with one index range scan on a miss."""
+    entry = cache.get(cache_key(user_id))
+    if entry is None:
+        size = _size()
+        newest = list(
+            Post.objects.filter(user_id=user_id)
+            .order_by(*ORDERING)
+            .values_list("time", "post_id")[:size]
+        )
+        entry = {"keys": newest[::-1], "complete": len(newest) < size}
+        _store(user_id, entry["keys"], entry["complete"])
+    return entry
+
+
+def recent_ids(user_id, limit: int):
+    """The newest ``limit`` post ids of ``user_id``, or ``None`` if the cache holds too few."""
+    entry = load(user_id)
+    keys = entry["keys"]
+    if len(keys) < limit and not entry["complete"]:
+        return None
+    return [post_id for _, post_id in reversed(keys[-limit:])]
+
+
+def push(post):
+    entry = cache.get(cache_key(post.user_id))
+    if entry is None:
+        return
+    keys = entry["keys"]
+    key = (post.time, post.post_id)
+    if keys and key < keys[0] and not entry["complete"]:
+        # キャッシュしている範囲より古い
+        return
+    insort(keys, key)
+    size = _size()
+    _store(post.user_id, keys[-size:], entry["complete"] and len(keys) <= size)
+
+
+def invalidate(*user_ids):
+    cache.delete_many([cache_key(user_id) for user_id in user_ids])
+
+
+def on_post_saved(sender, instance, created, **kwargs):
+    """``post_save`` receiver for ``Post``."""
+    if created and instance.deleted_at is None:
+        push(instance)
+    else:
+        # 論理削除や time の変更で順序が変わりうる
+        invalidate(instance.user_id)
+
+
+def on_post_deleted(sender, instance, **kwargs):
+    """``post_delete`` receiver for ``Post``."""
+    invalidate(instance.user_id)
@@ -0,0 +1,170 @@
+"""
+Soft delete and background purge of users / posts
+
+削除 API は `deleted_at` を立てるだけで即座に返り（`Post.objects` / `CustomUser.objects` から見えなくなる）、
+関連行の削除とカウンタの補正は `purge_deleted` コマンドが `batch_size` 件ずつの短いトランザクションで行う。
+
+- 投稿: いいねをバッチで消し、いいねしたユーザの `total_likes_given`、投稿者の
+  `total_likes_received` / `post_count` を集計済みの差分で 1 バッチあたり数回の UPDATE で減らす。
+- ユーザ: 退会時に投稿も論理削除し、認証トークンを消してデバイストークンを無効化する。
+  ユーザ名・メール・Apple ID は `deleted-<id>` に置き換え、同じアカウントで再登録できるようにする。
+  衝突しないよう `deleted-` で始まるユーザ名は `CustomUserSerializer` で予約している。
+  purge では投稿、付けたいいね（投稿の `like_count` と投稿者の `total_likes_received`）、
+  フォロー/フォロワー（相手の `follower_count` / `following_count`）を順に消す。
+- 期間付きランキングのバケットは、いいねを消す各バッチのトランザクション内で `like_rollups.remove_likes`
+  により (投稿, 投稿者, 時間) ごとに集計した分だけ減らす。`trending_score` は補正せず、減衰に任せる。
+- purge が終わるまでは、いいね/フォロー一覧に削除済みユーザの行が残り、カウンタも削除前の値になる。
+"""
+
+from collections import Counter, defaultdict
+
+from django.db import transaction
+from django.db.models import F
+from django.db.models.functions import Greatest
+from django.utils import timezone
+from rest_framework.authtoken.models import Token
+
+from accounts.models import CustomUser, DeviceToken, UserStats
+from follow.models import Follow, FollowSuggestion, FollowSuggestionQueue
+from post.models import Like, Post
+
+from . import author_feed, like_rollups, object_cache, profile_cache, suggestions
+
+DELETED_USERNAME_PREFIX = "deleted-"
+
+
+def soft_delete_post(post):
+    post.deleted_at = timezone.now()
+    post.save(update_fields=["deleted_at"])
+
+
+def soft_delete_user(user):
+    """Hide ``user`` and their posts, and revoke their credentials. O(posts) UPDATE, no cascade."""
+    now = timezone.now()
+    with transaction.atomic():
+        user.deleted_at = now
+        user.is_active = False
+        user.username = f"{DELETED_USERNAME_PREFIX}{user.pk}"
+        user.user_mail = f"deleted-{user.pk}@deleted.invalid"
+        user.apple_user_id = None
+        user.save(update_fields=["deleted_at", "is_active", "username", "user_mail", "apple_user_id"])
+        posts = Post.objects.filter(user=user)
+        post_ids = list(posts.values_list("post_id", flat=True))
+        posts.update(deleted_at=now)
+        author_feed.invalidate(user.pk)
+        DeviceToken.objects.filter(user=user).update(is_active=False)
+        Token.objects.filter(user=user).delete()
+        # update() は post_save を通らないので、埋め込んだ投稿者ごとキャッシュを捨てる
+        object_cache.invalidate_after_write(Post, *post_ids)
+
+
+def _subtract(field: str, deltas) -> set:
+    """Decrease ``UserStats.<field>`` by ``{user_id: amount}`` with one UPDATE per distinct amount."""
+    by_amount = defaultdict(list)
+    for user_id, amount in deltas.items():
+        if amount:
+            by_amount[amount].append(user_id)
+    for amount, user_ids in by_amount.items():
+        UserStats.objects.filter(user_id__in=user_ids).update(
+            **{field: Greatest(F(field) - amount, 0)}
+        )
+    return set(deltas)
+
+
+def _touch(user_ids):
+    # update() は save() / シグナルを通らないので、キャッシュは自分で無効化する
+    for user_id in user_ids:
+        profile_cache.bump(user_id)
+    object_cache.invalidate_after_write(CustomUser, *user_ids)
+
+
+def _drain(queryset, fields, batch_size: int, apply=None) -> int:
+    """Delete ``queryset`` in primary-key batches, calling ``apply(rows)`` in each transaction."""
+    deleted = 0
+    while True:
+        touched = set()
+        with transaction.atomic():
+            rows = list(queryset.order_by("pk").values_list("pk", *fields)[:batch_size])
+            if not rows:
+                return deleted
+            queryset.model.objects.filter(pk__in=[row[0] for row in rows]).delete()
+            if apply:
+                touched = apply(rows)
+        _touch(touched)
+        deleted += len(rows)
+
+
+def purge_post(post_id: int, author_id: int, *, batch_size: int = 1000) -> int:
+    """Delete a post and its likes in batches; returns the number of likes removed."""
+
+    def apply(rows):
+        like_rollups.remove_likes((post_id, author_id, created_at) for _, _, created_at in rows)
+        given = _subtract("total_likes_given", Counter(user_id for _, user_id, _ in rows))
+        return given | _subtract("total_likes_received", {author_id: len(rows)})
+
+    removed = _drain(
+        Like.objects.filter(post_id=post_id), ["user_id", "created_at"], batch_size, apply
+    )
+    with transaction.atomic():
+        Post.all_objects.filter(pk=post_id).delete()
+        _subtract("post_count", {author_id: 1})
+    _touch([author_id])
+    object_cache.invalidate_after_write(Post, post_id)
+    return removed
+
+
+def purge_user(user_id: int, *, batch_size: int = 1000) -> Counter:
+    """Delete a user's posts, likes, follows and the user row; returns the removed counts."""
+    counts = Counter()
+    for post_id in Post.all_objects.filter(user_id=user_id).values_list("post_id", flat=True):
+        counts["likes"] += purge_post(post_id, user_id, batch_size=batch_size)
+        counts["posts"] += 1
+
+    def unlike(rows):
+        post_ids = [post_id for _, post_id, _, _ in rows]
+        # (user, post) は一意なので、1 投稿あたり 1 件
+        Post.all_objects.filter(pk__in=post_ids, like_count__gt=0).update(like_count=F("like_count") - 1)
+        object_cache.invalidate_after_write(Post, *post_ids)
+        like_rollups.remove_likes(row[1:] for row in rows)
+        return _subtract("total_likes_received", Counter(author_id for _, _, author_id, _ in rows))
+
+    def unfollow(rows):
+        return _subtract("follower_count", Counter(aim_user_id for _, aim_user_id in rows))
+
+    def drop_follower(rows):
+        followers = [follower_id for _, follower_id in rows]
+        # フォロワーの 2 ホップ先が変わる
+        suggestions.mark_dirty(*followers)
+        return _subtract("following_count", Counter(followers))
+
+    likes = Like.objects.filter(user_id=user_id)
+    counts["likes"] += _drain(
+        likes, ["post_id", "post__user_id", "created_at"], batch_size, unlike
+    )
+    counts["follows"] += _drain(
+        Follow.objects.filter(user_id=user_id), ["aim_user_id"], batch_size, unfollow
+    )
+    counts["follows"] += _drain(
+        Follow.objects.filter(aim_user_id=user_id), ["user_id"], batch_size, drop_follower
+    )
+    _drain(FollowSuggestion.objects.filter(suggested_id=user_id), [], batch_size)
+    _drain(FollowSuggestion.objects.filter(user_id=user_id), [], batch_size)
+    _drain(DeviceToken.objects.filter(user_id=user_id), [], batch_size)
+    FollowSuggestionQueue.objects.filter(user_id=user_id).delete()
+    # 残りは stats などユーザごとに数行のみ
+    CustomUser.all_objects.filter(pk=user_id).delete()
+    counts["users"] += 1
+    return counts
+
+
+def purge(*, batch_size: int = 1000) -> dict:
+    """Purge every soft-deleted post, then every soft-deleted user."""
+    counts = Counter()
+    posts = Post.all_objects.filter(deleted_at__isnull=False, user__deleted_at__isnull=True)
+    for post_id, author_id in posts.order_by("pk").values_list("post_id", "user_id"):
+        counts["likes"] += purge_post(post_id, author_id, batch_size=batch_size)
+        counts["posts"] += 1
+    users = CustomUser.all_objects.filter(deleted_at__isnull=False).order_by("pk")
+    for user_id in users.values_list("user_id", flat=True):
+        counts.update(purge_user(user_id, batch_size=batch_size))
+    return dict(counts)
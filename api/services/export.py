@@ -0,0 +1,125 @@
+"""
+NDJSON bulk export
+
+分析用に `post` / `like` / `follow` / `user_stats` を 1 行 1 JSON（NDJSON）で書き出す。
+`.values().iterator(chunk_size=...)`（PostgreSQL ではサーバーサイドカーソル）で読み、
+行ごとにエンコード（gzip の場合は逐次圧縮）して流すため、テーブルの大きさに関わらずメモリ使用量は一定。
+
+- 行は主キーの昇順。差分取得は前回の最後の行の主キーを `since_id` に渡す
+  （または `since` 以降に作成/更新された行。`user_stats` は `updated_at`）。
+- 論理削除済みの投稿と、そのいいねは含めない。
+- ASGI では `astream()`（`aiterator()` によるチャンク読み込みの非同期ジェネレータ）を使う。
+  同期イテレータを渡すと、Django の ASGI ハンドラは `sync_to_async(list)` で全体を読み込んでしまう。
+"""
+
+import json
+import zlib
+
+from django.core.serializers.json import DjangoJSONEncoder
+
+from accounts.models import UserStats
+from follow.models import Follow
+from post.models import Like, Post
+
+# テーブル名 -> (モデル, 列, 差分取得に使う時刻列)
+TABLES = {
+    "posts": (
+        Post,
+        ("post_id", "user_id", "context", "like_count", "trending_score", "time"),
+        "time",
+    ),
+    "likes": (Like, ("id", "user_id", "post_id", "created_at"), "created_at"),
+    "follows": (Follow, ("id", "user_id", "aim_user_id", "time"), "time"),
+    "user_stats": (
+        UserStats,
+        (
+            "id",
+            "user_id",
+            "experience_points",
+            "total_likes_received",
+            "total_likes_given",
+            "follower_count",
+            "following_count",
+            "post_count",
+            "updated_at",
+        ),
+        "updated_at",
+    ),
+}
+
+# テーブル名 -> 追加の絞り込み（一覧 API と同じく、論理削除済みの投稿のいいねを除く）
+VISIBLE = {"likes": {"post__deleted_at__isnull": True}}
+
+CHUNK_SIZE = 2000
+# 小さな書き込みを束ねる目安（バイト）
+BUFFER_BYTES = 64 * 1024
+
+
+def _queryset(table: str, *, since_id=None, since=None, using=None):
+    model, fields, timestamp_field = TABLES[table]
+    queryset = model.objects.filter(**VISIBLE.get(table, {}))
+    if using:
+        queryset = queryset.using(using)
+    if since_id is not None:
+        queryset = queryset.filter(pk__gt=since_id)
+    if since is not None:
+        queryset = queryset.filter(**{f"{timestamp_field}__gte": since})
+    return queryset.order_by("pk").values(*fields)
+
+
+def rows(table: str, *, chunk_size: int = CHUNK_SIZE, **filters):
+    """Yield the rows of ``table`` as dicts in primary-key order."""
+    return _queryset(table, **filters).iterator(chunk_size=chunk_size)
+
+
+def arows(table: str, *, chunk_size: int = CHUNK_SIZE, **filters):
+    """Async iterator version of ``rows``."""
+    return _queryset(table, **filters).aiterator(chunk_size=chunk_size)
+
+
+class _Encoder:
+    """NDJSON lines buffered into roughly ``BUFFER_BYTES`` pieces, optionally as one gzip member."""
+
+    def __init__(self, gzip: bool):
+        self.buffer = []
+        self.size = 0
+        self.compressor = zlib.compressobj(6, zlib.DEFLATED, zlib.MAX_WBITS | 16) if gzip else None
+
+    def _output(self, data: bytes) -> bytes:
+        return self.compressor.compress(data) if self.compressor else data
+
+    def write(self, record) -> bytes:
+        line = (json.dumps(record, cls=DjangoJSONEncoder, ensure_ascii=False) + "\n").encode()
+        self.buffer.append(line)
+        self.size += len(line)
+        if self.size < BUFFER_BYTES:
+            return b""
+        data = b"".join(self.buffer)
+        self.buffer, self.size = [], 0
+        return self._output(data)
+
+    def close(self) -> bytes:
+        data = self._output(b"".join(self.buffer))
+        if self.compressor:
+            data += self.compressor.flush()
+        return data
+
+
+def stream(table: str, *, gzip: bool = False, **filters):
+    """Bytes of the NDJSON (optionally gzipped) export of ``table``."""
+    encoder = _Encoder(gzip)
+    for record in rows(table, **filters):
+        chunk = encoder.write(record)
+        if chunk:
+            yield chunk
+    yield encoder.close()
+
+
+async def astream(table: str, *, gzip: bool = False, **filters):
+    """Async generator version of ``stream`` for ASGI responses."""
+    encoder = _Encoder(gzip)
+    async for record in arows(table, **filters):
+        chunk = encoder.write(record)
+        if chunk:
+            yield chunk
+    yield encoder.close()
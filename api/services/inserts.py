@@ -0,0 +1,51 @@
+"""
+Conflict-tolerant single-row inserts
+
+いいね/フォローの作成は事前の exists() を使わず、`INSERT ... ON CONFLICT DO NOTHING RETURNING` の
+1 往復で行う。重複（同時リクエストの競合を含む）は行が返らないことで判定でき、
+`IntegrityError` にも、トランザクションを巻き戻す SAVEPOINT にもならない。
+カウンタ行（いいねバケット）は `ON CONFLICT DO UPDATE` で作成と加算を 1 文にする。
+"""
+
+from django.db import connections, router
+
+
+def _prepare(model, values: dict):
+    connection = connections[router.db_for_write(model)]
+    fields = [model._meta.get_field(name) for name in values]
+    params = [
+        field.get_db_prep_save(value, connection) for field, value in zip(fields, values.values())
+    ]
+    return connection, fields, params
+
+
+def insert_ignore(model, **values):
+    """Insert one ``model`` row; return its primary key, or ``None`` if a unique constraint hit."""
+    connection, fields, params = _prepare(model, values)
+    quote = connection.ops.quote_name
+    columns = ", ".join(quote(field.column) for field in fields)
+    placeholders = ", ".join(["%s"] * len(params))
+    sql = (
+        f"INSERT INTO {quote(model._meta.db_table)} ({columns}) VALUES ({placeholders}) "
+        f"ON CONFLICT DO NOTHING RETURNING {quote(model._meta.pk.column)}"
+    )
+    with connection.cursor() as cursor:
+        cursor.execute(sql, params)
+        row = cursor.fetchone()
+    return row[0] if row else None
+
+
+def insert_or_add(model, field: str, amount: int, **key):
+    """Insert a ``model`` row with ``field=amount``, or add ``amount`` to the row matching ``key``."""
+    connection, fields, params = _prepare(model, {**key, field: amount})
+    quote = connection.ops.quote_name
+    columns = [quote(f.column) for f in fields]
+    target = columns[-1]
+    table = quote(model._meta.db_table)
+    sql = (
+        f"INSERT INTO {table} ({', '.join(columns)}) VALUES ({', '.join(['%s'] * len(params))}) "
+        f"ON CONFLICT ({', '.join(columns[:-1])}) "
+        f"DO UPDATE SET {target} = {table}.{target} + EXCLUDED.{target}"
+    )
+    with connection.cursor() as cursor:
+        cursor.execute(sql, params)
@@ -0,0 +1,211 @@
+"""
+Time-bucketed like rollups
+
+いいね/いいね解除のたびに投稿ごと・投稿者ごとの 1 時間バケット
+（`PostLikeBucket` / `AuthorLikeBucket`）を増減し、期間付きランキング
+（`range=24h|7d|30d`）は `like` テーブルではなくバケットの合計から求める。
+
+- `ROLLUP_HOURLY_RETENTION_HOURS` より古い 1 時間バケットは `compact()` で日次バケットにまとめる。
+- `ROLLUP_RETENTION_DAYS` より古いバケットは `prune()` で削除する。
+- 日次バケットは開始時刻（UTC 0 時）が期間内のものだけを数えるため、7d / 30d の端は日単位の精度。
+"""
+
+from collections import Counter, defaultdict
+from datetime import timedelta, timezone as dt_timezone
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import F, Sum
+from django.db.models.functions import Greatest
+from django.utils import timezone
+
+from post.models import AuthorLikeBucket, Like, LikeBucketBase, PostLikeBucket
+
+from . import inserts
+
+RANGES = {
+    "24h": timedelta(hours=24),
+    "7d": timedelta(days=7),
+    "30d": timedelta(days=30),
+}
+
+HOURLY = LikeBucketBase.HOURLY
+DAILY = LikeBucketBase.DAILY
+
+
+def hour_start(moment):
+    return moment.astimezone(dt_timezone.utc).replace(minute=0, second=0, microsecond=0)
+
+
+def day_start(moment):
+    return hour_start(moment).replace(hour=0)
+
+
+def window_start(range_key: str, now=None):
+    """Start of the ``range_key`` window aligned to the hourly buckets."""
+    now = now or timezone.now()
+    return hour_start(now) - RANGES[range_key] + timedelta(hours=1)
+
+
+def parse_range(value) -> str:
+    """Return a supported range key, or ``""`` for the all-time ranking."""
+    value = (value or "").lower()
+    return value if value in RANGES else ""
+
+
+def _bump(model, lookup: dict, delta: int):
+    if delta <= 0:
+        model.objects.filter(**lookup).update(count=F("count") + delta)
+        return
+    # バケットの (owner, granularity, bucket_start) の一意制約で作成と加算を 1 文にする
+    inserts.insert_or_add(model, "count", delta, **lookup)
+
+
+def _decrement(model, owner: dict, liked_at, amount: int = 1):
+    """Remove ``amount`` likes from the hourly bucket, or the daily one it was compacted into."""
+    count = Greatest(F("count") - amount, 0)
+    hourly = model.objects.filter(
+        granularity=HOURLY, bucket_start=hour_start(liked_at), count__gt=0, **owner
+    )
+    if hourly.update(count=count):
+        return
+    model.objects.filter(
+        granularity=DAILY, bucket_start=day_start(liked_at), count__gt=0, **owner
+    ).update(count=count)
+
+
+def record_like(post, liked_at=None):
+    bucket = {"granularity": HOURLY, "bucket_start": hour_start(liked_at or timezone.now())}
+    _bump(PostLikeBucket, {"post_id": post.post_id, **bucket}, 1)
+    _bump(AuthorLikeBucket, {"author_id": post.user_id, **bucket}, 1)
+
+
+def record_unlike(post, liked_at):
+    _decrement(PostLikeBucket, {"post_id": post.post_id}, liked_at)
+    _decrement(AuthorLikeBucket, {"author_id": post.user_id}, liked_at)
+
+
+def remove_likes(likes, now=None):
+    """
+    Subtract deleted likes given as ``(post_id, author_id, liked_at)``.
+
+    1 時間ごとにまとめ、バケットあたり 1 回の UPDATE で減らす（削除と同じトランザクションで呼ぶ）。
+    """
+    now = now or timezone.now()
+    cutoff = day_start(now) - timedelta(days=getattr(settings, "ROLLUP_RETENTION_DAYS", 31))
+    per_post, per_author = Counter(), Counter()
+    for post_id, author_id, liked_at in likes:
+        if liked_at < cutoff:
+            # バケットは prune 済み
+            continue
+        start = hour_start(liked_at)
+        per_post[(post_id, start)] += 1
+        per_author[(author_id, start)] += 1
+    for (post_id, start), amount in per_post.items():
+        _decrement(PostLikeBucket, {"post_id": post_id}, start, amount)
+    for (author_id, start), amount in per_author.items():
+        _decrement(AuthorLikeBucket, {"author_id": author_id}, start, amount)
+
+
+def post_ranking(queryset, range_key: str, now=None):
+    """Annotate ``window_likes`` from post buckets and order by it (most liked first)."""
+    return (
+        queryset.filter(like_buckets__bucket_start__gte=window_start(range_key, now))
+        .annotate(window_likes=Sum("like_buckets__count"))
+        .filter(window_likes__gt=0)
+        .order_by("-window_likes", "-post_id")
+    )
+
+
+def author_ranking(queryset, range_key: str, now=None):
+    """Annotate ``window_likes`` (likes received) from author buckets and order by it."""
+    return (
+        queryset.filter(like_buckets__bucket_start__gte=window_start(range_key, now))
+        .annotate(window_likes=Sum("like_buckets__count"))
+        .filter(window_likes__gt=0)
+        .order_by("-window_likes", "-date_joined")
+    )
+
+
+def _compact_model(model, owner_field: str, cutoff, batch_size: int) -> int:
+    compacted = 0
+    while True:
+        with transaction.atomic():
+            rows = list(
+                model.objects.select_for_update()
+                .filter(granularity=HOURLY, bucket_start__lt=cutoff)
+                .order_by("pk")
+                .values_list("pk", owner_field, "bucket_start", "count")[:batch_size]
+            )
+            if not rows:
+                return compacted
+            daily = defaultdict(int)
+            for _, owner_id, bucket_start, count in rows:
+                daily[(owner_id, day_start(bucket_start))] += count
+            for (owner_id, start), count in daily.items():
+                if count:
+                    _bump(
+                        model,
+                        {owner_field: owner_id, "granularity": DAILY, "bucket_start": start},
+                        count,
+                    )
+            model.objects.filter(pk__in=[row[0] for row in rows]).delete()
+            compacted += len(rows)
+
+
+def compact(now=None, *, batch_size: int = 5000) -> int:
+    """Fold hourly buckets older than ``ROLLUP_HOURLY_RETENTION_HOURS`` into daily ones."""
+    now = now or timezone.now()
+    hours = getattr(settings, "ROLLUP_HOURLY_RETENTION_HOURS", 48)
+    cutoff = hour_start(now) - timedelta(hours=hours)
+    return _compact_model(PostLikeBucket, "post_id", cutoff, batch_size) + _compact_model(
+        AuthorLikeBucket, "author_id", cutoff, batch_size
+    )
+
+
+def prune(now=None) -> int:
+    """Delete buckets that no ranking window can reach any more."""
+    now = now or timezone.now()
+    cutoff = day_start(now) - timedelta(days=getattr(settings, "ROLLUP_RETENTION_DAYS", 31))
+    deleted, _ = PostLikeBucket.objects.filter(bucket_start__lt=cutoff).delete()
+    deleted_authors, _ = AuthorLikeBucket.objects.filter(bucket_start__lt=cutoff).delete()
+    return deleted + deleted_authors
+
+
+def rebuild(now=None, *, author_ids=None, batch_size: int = 5000) -> int:
+    """Recreate hourly buckets from ``like`` rows inside the retention period."""
+    now = now or timezone.now()
+    since = day_start(now) - timedelta(days=getattr(settings, "ROLLUP_RETENTION_DAYS", 31))
+    likes = Like.objects.filter(created_at__gte=since)
+    post_buckets = PostLikeBucket.objects.all()
+    author_buckets = AuthorLikeBucket.objects.all()
+    if author_ids is not None:
+        likes = likes.filter(post__user_id__in=author_ids)
+        post_buckets = post_buckets.filter(post__user_id__in=author_ids)
+        author_buckets = author_buckets.filter(author_id__in=author_ids)
+
+    per_post, per_author = defaultdict(int), defaultdict(int)
+    for post_id, author_id, created_at in likes.values_list(
+        "post_id", "post__user_id", "created_at"
+    ).iterator():
+        per_post[(post_id, hour_start(created_at))] += 1
+        per_author[(author_id, hour_start(created_at))] += 1
+
+    with transaction.atomic():
+        post_buckets.delete()
+        author_buckets.delete()
+        PostLikeBucket.objects.bulk_create(
+            [
+                PostLikeBucket(post_id=post_id, bucket_start=start, count=count)
+                for (post_id, start), count in per_post.items()
+            ],
+            batch_size=batch_size,
+        )
+        AuthorLikeBucket.objects.bulk_create(
+            [
+                AuthorLikeBucket(author_id=author_id, bucket_start=start, count=count)
+                for (author_id, start), count in per_author.items()
+            ],
+            batch_size=batch_size,
+        )
+    return len(per_post) + len(per_author)
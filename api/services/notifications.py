@@ -7,12 +7,23 @@ FCM Push Notification Service
 - level_up: レベルアップ時
 - post_ranking: 投稿がトレンド/人気で10位以内
 - user_ranking: ユーザーがランキングで10位以内
+
+NOTIFICATIONS_ASYNC が有効な場合、FCM への送信はバックグラウンドのスレッドプールで行い、
+いいね/フォローのリクエストは FCM の応答を待たない。
 """
 
 import logging
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
 from typing import Optional
 
 from django.conf import settings
+from django.db import connections
+
+from .. import metrics
+from ..tracing import span, traced
 
 logger = logging.getLogger(__name__)
 
@@ -28,6 +39,9 @@ except ImportError:
     messaging = None
 
 _firebase_app = None
+_executor = None
+_executor_pid = None
+_executor_lock = threading.Lock()
 
 
 def _init_firebase():
@@ -55,6 +69,7 @@ def _init_firebase():
         return False
 
 
+@traced("notifications.send_push_notification")
 def send_push_notification(
     token: str,
     title: str,
@@ -74,8 +89,10 @@ def send_push_notification(
         True if sent successfully, False otherwise
     """
     if not _init_firebase():
+        metrics.inc("notification_sends_total", result="disabled")
         return False
 
+    started = time.perf_counter()
     try:
         message = messaging.Message(
             notification=messaging.Notification(title=title, body=body),
@@ -84,22 +101,61 @@ def send_push_notification(
         )
         response = messaging.send(message)
         logger.info(f"Push notification sent: {response}")
+        metrics.inc("notification_sends_total", result="success")
         return True
     except messaging.UnregisteredError:
         logger.warning(f"Token is unregistered: {token[:20]}...")
+        metrics.inc("notification_sends_total", result="unregistered")
         _deactivate_token(token)
         return False
     except Exception as e:
         logger.error(f"Failed to send push notification: {e}")
+        metrics.inc("notification_sends_total", result="failure")
         return False
+    finally:
+        metrics.observe("fcm_send_duration_seconds", time.perf_counter() - started)
+
+
+def _get_executor() -> ThreadPoolExecutor:
+    global _executor, _executor_pid
+    if _executor_pid != os.getpid():
+        with _executor_lock:
+            if _executor_pid != os.getpid():
+                _executor = ThreadPoolExecutor(
+                    max_workers=getattr(settings, "NOTIFICATIONS_MAX_WORKERS", 4),
+                    thread_name_prefix="fcm-send",
+                )
+                _executor_pid = os.getpid()
+    return _executor
+
+
+def _send_in_background(token: str, title: str, body: str, data: dict):
+    try:
+        send_push_notification(token, title, body, data)
+    except Exception as e:
+        logger.error(f"Background push notification failed: {e}")
+    finally:
+        # トークン無効化で開いた接続をワーカースレッドに残さない
+        connections.close_all()
+
+
+def active_tokens(user_id: int) -> list:
+    """Active FCM tokens of ``user_id``; fetch once and pass as ``tokens=`` to several notify_* calls."""
+    from accounts.models import DeviceToken
+
+    return list(
+        DeviceToken.objects.filter(user_id=user_id, is_active=True).values_list("token", flat=True)
+    )
 
 
+@traced("notifications.send_push_to_user")
 def send_push_to_user(
     user_id: int,
     title: str,
     body: str,
     data: Optional[dict] = None,
     notification_type: Optional[str] = None,
+    tokens: Optional[list] = None,
 ) -> int:
     """
     Send push notification to all active devices of a user.
@@ -110,23 +166,29 @@ def send_push_to_user(
         body: Notification body
         data: Optional data payload
         notification_type: Type of notification (liked, followed, etc.)
+        tokens: The user's active tokens if already fetched
 
     Returns:
-        Number of successfully sent notifications
+        Number of successfully sent notifications (queued ones when NOTIFICATIONS_ASYNC)
     """
-    from accounts.models import DeviceToken
-
-    tokens = DeviceToken.objects.filter(user_id=user_id, is_active=True)
-    if not tokens.exists():
+    if tokens is None:
+        tokens = active_tokens(user_id)
+    if not tokens:
         return 0
 
     payload = data or {}
     if notification_type:
         payload["type"] = notification_type
 
+    if getattr(settings, "NOTIFICATIONS_ASYNC", False):
+        executor = _get_executor()
+        for token in tokens:
+            executor.submit(_send_in_background, token, title, body, payload)
+        return len(tokens)
+
     sent_count = 0
-    for device in tokens:
-        if send_push_notification(device.token, title, body, payload):
+    for token in tokens:
+        if send_push_notification(token, title, body, payload):
             sent_count += 1
 
     return sent_count
@@ -136,36 +198,46 @@ def _deactivate_token(token: str):
     """Mark a token as inactive when it's no longer valid."""
     from accounts.models import DeviceToken
 
-    DeviceToken.objects.filter(token=token).update(is_active=False)
+    deactivated = DeviceToken.objects.filter(token=token).update(is_active=False)
+    metrics.inc("notification_token_deactivations_total", deactivated)
 
 
 # --- Notification Helper Functions ---
 
 
-def notify_liked(post_author_id: int, liker_username: str, post_context: str):
+def notify_liked(post_author_id: int, liker_username: str, post_context: str, tokens=None):
     """Notify when someone likes a post."""
     title = "いいね"
     body = f"{liker_username}さんがあなたの投稿にいいねしました"
     data = {"post_context": post_context[:50]}
-    return send_push_to_user(post_author_id, title, body, data, "liked")
+    return send_push_to_user(post_author_id, title, body, data, "liked", tokens)
 
 
-def notify_followed(target_user_id: int, follower_username: str):
+def notify_followed(target_user_id: int, follower_username: str, tokens=None):
     """Notify when someone follows the user."""
     title = "フォロー"
     body = f"{follower_username}さんがあなたをフォローしました"
-    return send_push_to_user(target_user_id, title, body, None, "followed")
+    return send_push_to_user(target_user_id, title, body, None, "followed", tokens)
 
 
-def notify_level_up(user_id: int, new_level: int):
+def notify_level_up(user_id: int, new_level: int, tokens=None):
     """Notify when user levels up."""
     title = "レベルアップ"
     body = f"レベル{new_level}に上がりました！"
     data = {"new_level": str(new_level)}
-    return send_push_to_user(user_id, title, body, data, "level_up")
+    return send_push_to_user(user_id, title, body, data, "level_up", tokens)
+
 
+def on_user_leveled_up(sender, user_id: int, level: int, **kwargs):
+    """``accounts.signals.user_leveled_up`` receiver."""
+    with span("user_stats.level_up", new_level=level):
+        tokens = active_tokens(user_id)
+        if tokens:
+            notify_level_up(user_id, level, tokens)
+            check_and_notify_user_level_ranking(user_id, tokens)
 
-def notify_post_ranking(user_id: int, post_id: int, rank: int, ranking_type: str):
+
+def notify_post_ranking(user_id: int, post_id: int, rank: int, ranking_type: str, tokens=None):
     """
     Notify when a post enters top 10 in rankings.
 
@@ -176,10 +248,10 @@ def notify_post_ranking(user_id: int, post_id: int, rank: int, ranking_type: str
     title = f"{type_name}ランキング入り"
     body = f"あなたの投稿が{type_name}ランキング{rank}位に入りました！"
     data = {"post_id": str(post_id), "rank": str(rank), "ranking_type": ranking_type}
-    return send_push_to_user(user_id, title, body, data, "post_ranking")
+    return send_push_to_user(user_id, title, body, data, "post_ranking", tokens)
 
 
-def notify_user_ranking(user_id: int, rank: int, ranking_type: str):
+def notify_user_ranking(user_id: int, rank: int, ranking_type: str, tokens=None):
     """
     Notify when user enters top 10 in rankings.
 
@@ -195,7 +267,7 @@ def notify_user_ranking(user_id: int, rank: int, ranking_type: str):
     title = f"{type_name}ランキング入り"
     body = f"{type_name}ランキングで{rank}位に入りました！"
     data = {"rank": str(rank), "ranking_type": ranking_type}
-    return send_push_to_user(user_id, title, body, data, "user_ranking")
+    return send_push_to_user(user_id, title, body, data, "user_ranking", tokens)
 
 
 # --- Ranking Check Functions ---
@@ -203,32 +275,23 @@ def notify_user_ranking(user_id: int, rank: int, ranking_type: str):
 RANKING_TOP_N = 10
 
 
-def check_and_notify_post_ranking(post_id: int, user_id: int):
+@traced("notifications.check_and_notify_post_ranking")
+def check_and_notify_post_ranking(post_id: int, user_id: int, tokens=None):
     """
     Check if a post is in top 10 of like rankings and notify.
     Called after a post receives a like.
     """
-    from datetime import timedelta
-
-    from django.utils import timezone
-
     from post.models import Post
 
-    try:
-        post = Post.objects.get(pk=post_id)
-    except Post.DoesNotExist:
-        return
+    from .trending import trending_posts
 
-    # Check trend ranking (24h)
-    window = timezone.now() - timedelta(hours=24)
+    # Check trend ranking (time-decayed trending score)
     trend_posts = list(
-        Post.objects.filter(time__gte=window)
-        .order_by("-like_count", "-time")
-        .values_list("post_id", flat=True)[:RANKING_TOP_N]
+        trending_posts(Post.objects.all()).values_list("post_id", flat=True)[:RANKING_TOP_N]
     )
     if post_id in trend_posts:
         rank = trend_posts.index(post_id) + 1
-        notify_post_ranking(user_id, post_id, rank, "trend")
+        notify_post_ranking(user_id, post_id, rank, "trend", tokens)
 
     # Check popular ranking (all-time)
     popular_posts = list(
@@ -237,10 +300,11 @@ def check_and_notify_post_ranking(post_id: int, user_id: int):
     )
     if post_id in popular_posts:
         rank = popular_posts.index(post_id) + 1
-        notify_post_ranking(user_id, post_id, rank, "popular")
+        notify_post_ranking(user_id, post_id, rank, "popular", tokens)
 
 
-def check_and_notify_user_likes_ranking(user_id: int):
+@traced("notifications.check_and_notify_user_likes_ranking")
+def check_and_notify_user_likes_ranking(user_id: int, tokens=None):
     """
     Check if user is in top 10 of likes ranking and notify.
     Called after a user receives a like.
@@ -254,10 +318,11 @@ def check_and_notify_user_likes_ranking(user_id: int):
     )
     if user_id in top_users:
         rank = top_users.index(user_id) + 1
-        notify_user_ranking(user_id, rank, "likes")
+        notify_user_ranking(user_id, rank, "likes", tokens)
 
 
-def check_and_notify_user_level_ranking(user_id: int):
+@traced("notifications.check_and_notify_user_level_ranking")
+def check_and_notify_user_level_ranking(user_id: int, tokens=None):
     """
     Check if user is in top 10 of level ranking and notify.
     Called after a user levels up.
@@ -270,10 +335,11 @@ def check_and_notify_user_level_ranking(user_id: int):
     )
     if user_id in top_users:
         rank = top_users.index(user_id) + 1
-        notify_user_ranking(user_id, rank, "level")
+        notify_user_ranking(user_id, rank, "level", tokens)
 
 
-def check_and_notify_user_follower_ranking(user_id: int):
+@traced("notifications.check_and_notify_user_follower_ranking")
+def check_and_notify_user_follower_ranking(user_id: int, tokens=None):
     """
     Check if user is in top 10 of follower ranking and notify.
     Called after a user gains a follower.
@@ -287,4 +353,4 @@ def check_and_notify_user_follower_ranking(user_id: int):
     )
     if user_id in top_users:
         rank = top_users.index(user_id) + 1
-        notify_user_ranking(user_id, rank, "followers")
+        notify_user_ranking(user_id, rank, "followers", tokens)
@@ -0,0 +1,54 @@
+"""
+Shared object cache for multi-get lookups
+
+`?ids=` の一括取得で読んだモデルインスタンス（select_related 済み）を
+`OBJECT_CACHE_SECONDS` の間キャッシュし、同じ ID の再要求では DB を読まない。
+閲覧者ごとの値（is_liked / is_following / rank）はキャッシュせず、取得後にページ単位で求める。
+
+- `post_save` / `post_delete` シグナルと、`update()` でカウンタを増減するいいね処理で該当キーを消す。
+  書き込み中に他のリクエストがコミット前の行をキャッシュし直しうるので、コミット後にもう一度消す。
+- 埋め込み先（投稿の user.stats など）の変更では消さないため、最大 `OBJECT_CACHE_SECONDS` 古い値を返しうる。
+"""
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+
+
+def cache_key(model, pk) -> str:
+    return f"obj:{model._meta.label_lower}:{pk}"
+
+
+def get_many(queryset, ids) -> dict:
+    """Return ``{pk: instance}`` for ``ids`` found, reading the cache first and the DB once."""
+    model = queryset.model
+    keys = {cache_key(model, pk): pk for pk in ids}
+    cached = cache.get_many(list(keys))
+    found = {keys[key]: obj for key, obj in cached.items()}
+    missing = [pk for pk in ids if pk not in found]
+    if missing:
+        fetched = {obj.pk: obj for obj in queryset.filter(pk__in=missing)}
+        cache.set_many(
+            {cache_key(model, pk): obj for pk, obj in fetched.items()},
+            getattr(settings, "OBJECT_CACHE_SECONDS", 30),
+        )
+        found.update(fetched)
+    return found
+
+
+def invalidate(model, *pks):
+    cache.delete_many([cache_key(model, pk) for pk in pks])
+
+
+def invalidate_after_write(model, *pks):
+    """Invalidate now (for reads later in this transaction) and again once the write commits."""
+    invalidate(model, *pks)
+    transaction.on_commit(lambda: invalidate(model, *pks))
+
+
+def invalidate_instance(sender, instance, **kwargs):
+    """``post_save`` / ``post_delete`` receiver."""
+    invalidate_after_write(sender, instance.pk)
+    if sender._meta.label_lower == "accounts.userstats":
+        # ユーザのキャッシュは stats を埋め込んでいる
+        invalidate_after_write(instance._meta.get_field("user").related_model, instance.user_id)
@@ -0,0 +1,207 @@
+"""
+Monthly range partitioning of `post` / `like` (PostgreSQL)
+
+`post` は `time`、`like` は `post_time`（いいね先の投稿の `time` の複製）で月ごとに
+RANGE パーティション化する。いいねは投稿と同じ月のパーティションに入るため、
+(user_id, post_id) の一意性は (user_id, post_id, post_time) の一意制約で保てる。
+
+- `partition_tables --convert` が既存テーブルを `<table>_legacy` に改名し、同名の
+  パーティション親テーブルを作って旧テーブルを「今月末まで」のパーティションとして接続する。
+- `partition_tables` を定期実行すると、`PARTITION_MONTHS_AHEAD` か月先までの空パーティションを作成する。
+  デフォルトパーティションは作らないので、実行が止まると範囲外の INSERT が失敗する。
+- 主キーは (post_id, time) / (id, post_time) になる。`post` を参照する外部キーは
+  `like` のみ (post_id, post_time) の複合キーで張り直し、いいねバケットの外部キーは外す
+  （削除時のカスケードは ORM が行う）。
+"""
+
+import re
+from datetime import datetime, timezone as dt_timezone
+
+from django.conf import settings
+from django.db import connection as default_connection
+from django.utils import timezone
+from django.utils.dateparse import parse_datetime
+
+from post.models import Like, Post
+
+# テーブル -> (モデル, パーティションキー)
+PARTITIONED_TABLES = {
+    "post": (Post, "time"),
+    "like": (Like, "post_time"),
+}
+
+_UPPER_BOUND_RE = re.compile(r"TO \('([^']+)'\)")
+
+
+def month_start(moment) -> datetime:
+    moment = moment.astimezone(dt_timezone.utc)
+    return datetime(moment.year, moment.month, 1, tzinfo=dt_timezone.utc)
+
+
+def add_months(start: datetime, months: int) -> datetime:
+    index = start.year * 12 + start.month - 1 + months
+    return start.replace(year=index // 12, month=index % 12 + 1)
+
+
+def partition_name(table: str, start: datetime) -> str:
+    return f"{table}_p{start:%Y%m}"
+
+
+def create_partition_sql(table: str, start: datetime) -> str:
+    end = add_months(start, 1)
+    return (
+        f'CREATE TABLE IF NOT EXISTS "{partition_name(table, start)}" PARTITION OF "{table}" '
+        f"FOR VALUES FROM ('{start.isoformat()}') TO ('{end.isoformat()}')"
+    )
+
+
+def latest_ordering() -> tuple:
+    """
+    Ordering of the latest/following timelines.
+
+    パーティション化後はパーティションキーの `time` で並べる。LIMIT 付きの順序付き
+    Append で新しいパーティションから読み、カーソルの `time` 条件で後続ページは
+    新しいパーティションを刈り込める。
+    """
+    if getattr(settings, "POST_PARTITIONING", False):
+        return ("-time", "-post_id")
+    return ("-post_id",)
+
+
+def is_partitioned(cursor, table: str) -> bool:
+    cursor.execute("SELECT relkind FROM pg_class WHERE oid = to_regclass(%s)", [f'"{table}"'])
+    row = cursor.fetchone()
+    return bool(row) and row[0] == "p"
+
+
+def partition_upper_bound(cursor, table: str):
+    """Upper bound of the newest partition of ``table`` (``None`` without partitions)."""
+    cursor.execute(
+        """
+        SELECT pg_get_expr(child.relpartbound, child.oid)
+        FROM pg_inherits
+        JOIN pg_class child ON child.oid = pg_inherits.inhrelid
+        WHERE pg_inherits.inhparent = to_regclass(%s)
+        """,
+        [f'"{table}"'],
+    )
+    bounds = []
+    for (expression,) in cursor.fetchall():
+        match = _UPPER_BOUND_RE.search(expression or "")
+        if match:
+            bounds.append(parse_datetime(match.group(1)))
+    return max(bounds) if bounds else None
+
+
+def ensure_partitions(months_ahead=None, *, now=None, connection=None, dry_run=False) -> list:
+    """Create monthly partitions so that ``months_ahead`` months after this one exist."""
+    connection = connection or default_connection
+    if months_ahead is None:
+        months_ahead = getattr(settings, "PARTITION_MONTHS_AHEAD", 3)
+    until = add_months(month_start(now or timezone.now()), months_ahead + 1)
+    statements = []
+    with connection.cursor() as cursor:
+        for table in PARTITIONED_TABLES:
+            if not is_partitioned(cursor, table):
+                continue
+            start = partition_upper_bound(cursor, table) or month_start(now or timezone.now())
+            while start < until:
+                statements.append(create_partition_sql(table, start))
+                start = add_months(start, 1)
+        if not dry_run:
+            for sql in statements:
+                cursor.execute(sql)
+    return statements
+
+
+def _legacy_name(name: str) -> str:
+    # PostgreSQL の識別子は 63 バイトまで
+    return f"{name[:56]}_legacy"
+
+
+def convert_statements(cursor, table: str, *, boundary: datetime, schema_editor) -> list:
+    """SQL turning ``table`` into a partitioned table with the old one as its first partition."""
+    model, key = PARTITIONED_TABLES[table]
+    pk = model._meta.pk.column
+    legacy = f"{table}_legacy"
+    sequence = f"{table}_{pk}_part_seq"
+
+    cursor.execute("SELECT indexname FROM pg_indexes WHERE tablename = %s", [table])
+    index_names = [row[0] for row in cursor.fetchall()]
+    cursor.execute(
+        """
+        SELECT conrelid::regclass::text, conname FROM pg_constraint
+        WHERE contype = 'f' AND confrelid = to_regclass(%s)
+        """,
+        [f'"{table}"'],
+    )
+    referencing = cursor.fetchall()
+    cursor.execute(
+        """
+        SELECT conname, pg_get_constraintdef(oid) FROM pg_constraint
+        WHERE contype = 'f' AND conrelid = to_regclass(%s) AND confrelid <> to_regclass('"post"')
+        """,
+        [f'"{table}"'],
+    )
+    outgoing = cursor.fetchall()
+
+    statements = [f'ALTER TABLE "{table}" RENAME TO "{legacy}"']
+    statements += [f'ALTER INDEX "{name}" RENAME TO "{_legacy_name(name)}"' for name in index_names]
+    # パーティション親を参照できるのはパーティションキーを含む一意制約だけなので、既存の参照は外す
+    statements += [
+        f"ALTER TABLE {referrer} DROP CONSTRAINT \"{name}\"" for referrer, name in referencing
+    ]
+    # IDENTITY 列は親テーブルに移せない（PostgreSQL 16 以前）ため、採番は新しいシーケンスで続ける
+    statements += [
+        f'ALTER TABLE "{legacy}" ALTER COLUMN "{pk}" DROP IDENTITY IF EXISTS',
+        f'ALTER TABLE "{legacy}" ALTER COLUMN "{pk}" DROP DEFAULT',
+        f'CREATE SEQUENCE "{sequence}"',
+        f"SELECT setval('\"{sequence}\"', COALESCE((SELECT max(\"{pk}\") FROM \"{legacy}\"), 0) + 1, false)",
+        f'CREATE TABLE "{table}" (LIKE "{legacy}" INCLUDING DEFAULTS INCLUDING CONSTRAINTS '
+        f'INCLUDING STORAGE) PARTITION BY RANGE ("{key}")',
+        f'ALTER TABLE "{table}" ALTER COLUMN "{pk}" SET DEFAULT nextval(\'"{sequence}"\')',
+        f'ALTER SEQUENCE "{sequence}" OWNED BY "{table}"."{pk}"',
+        f'ALTER TABLE "{table}" ADD CONSTRAINT "{table}_part_pkey" PRIMARY KEY ("{pk}", "{key}")',
+    ]
+    # モデル定義のインデックスは旧テーブルと同じ名前・定義で親に作る（接続時に旧テーブルの索引が流用される）
+    statements += [str(sql) for sql in schema_editor._model_indexes_sql(model)]
+    statements += [
+        f'ALTER TABLE "{table}" ADD CONSTRAINT "{name}_part" {definition}'
+        for name, definition in outgoing
+    ]
+    if table == "like":
+        statements += [
+            'ALTER TABLE "like" ADD CONSTRAINT "like_user_post_part_uniq" '
+            'UNIQUE ("user_id", "post_id", "post_time")',
+            'ALTER TABLE "like" ADD CONSTRAINT "like_post_part_fk" FOREIGN KEY ("post_id", "post_time") '
+            'REFERENCES "post" ("post_id", "time") ON UPDATE CASCADE ON DELETE CASCADE',
+        ]
+    # CHECK 制約を先に検証しておくと ATTACH 時の全件走査を省ける
+    statements += [
+        f'ALTER TABLE "{legacy}" ADD CONSTRAINT "{legacy}_range_check" '
+        f"CHECK (\"{key}\" IS NOT NULL AND \"{key}\" < '{boundary.isoformat()}') NOT VALID",
+        f'ALTER TABLE "{legacy}" VALIDATE CONSTRAINT "{legacy}_range_check"',
+        f'ALTER TABLE "{table}" ATTACH PARTITION "{legacy}" '
+        f"FOR VALUES FROM (MINVALUE) TO ('{boundary.isoformat()}')",
+    ]
+    return statements
+
+
+def convert(*, now=None, connection=None, dry_run=False) -> list:
+    """Convert ``post`` then ``like`` into partitioned tables (skips converted ones)."""
+    connection = connection or default_connection
+    boundary = add_months(month_start(now or timezone.now()), 1)
+    executed = []
+    with connection.schema_editor(atomic=True) as schema_editor:
+        with connection.cursor() as cursor:
+            for table in PARTITIONED_TABLES:
+                if is_partitioned(cursor, table):
+                    continue
+                statements = convert_statements(
+                    cursor, table, boundary=boundary, schema_editor=schema_editor
+                )
+                if not dry_run:
+                    for sql in statements:
+                        cursor.execute(sql)
+                executed += statements
+    return executed
@@ -0,0 +1,115 @@
+"""
+Versioned profile cache
+
+`CustomUserSerializer` の閲覧者に依存しない部分（ユーザ項目・stats・rank）を
+`profile:<user_id>:<version>` に `PROFILE_CACHE_SECONDS` の間キャッシュする。
+プロフィール API・投稿の user 埋め込み・検索結果など、ユーザを返す全てのレスポンスで共有する。
+
+- `UserStats` の保存（各 register_* / update_follow_counts）と `CustomUser` の保存で
+  バージョンを上げるため、古いペイロードは読まれなくなる（削除は不要）。
+  シグナルの接続は `ApiConfig.ready()` で行う。
+- rank は他ユーザのいいね数でも変わるため、キャッシュ値は最大 `PROFILE_CACHE_SECONDS` 古い。
+  一覧では従来どおりページ単位の rank を優先する。
+- 人気プロフィールの期限切れ時は 1 リクエストだけが再生成し（`cache.add` によるロック）、
+  他は短時間待って生成結果を読む。
+"""
+
+import time
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+
+LOCK_SECONDS = 5
+WAIT_SECONDS = 0.2
+WAIT_STEP = 0.02
+
+
+def version_key(user_id) -> str:
+    return f"profile-ver:{user_id}"
+
+
+def payload_key(user_id, version) -> str:
+    return f"profile:{user_id}:{version}"
+
+
+def _new_version() -> int:
+    # バージョンキーが追い出された後に古いペイロードを指さないよう、時刻から始める
+    return time.time_ns() // 1000
+
+
+def get_versions(user_ids) -> dict:
+    keys = {version_key(user_id): user_id for user_id in user_ids}
+    found = cache.get_many(list(keys))
+    versions = {keys[key]: version for key, version in found.items()}
+    for key, user_id in keys.items():
+        if user_id not in versions:
+            cache.add(key, _new_version(), None)
+            versions[user_id] = cache.get(key)
+    return versions
+
+
+def bump(user_id):
+    """Invalidate every cached payload of ``user_id``."""
+    try:
+        cache.incr(version_key(user_id))
+    except ValueError:
+        cache.set(version_key(user_id), _new_version(), None)
+
+
+def bump_after_write(user_id):
+    """Bump now (for reads later in this transaction) and again once the write commits."""
+    bump(user_id)
+    # コミット前に他のリクエストが古い行から再生成したペイロードを捨てる
+    transaction.on_commit(lambda: bump(user_id))
+
+
+def on_user_saved(sender, instance, **kwargs):
+    """``post_save`` receiver for ``CustomUser``."""
+    bump_after_write(instance.pk)
+
+
+def on_stats_saved(sender, instance, **kwargs):
+    """``post_save`` receiver for ``UserStats``."""
+    bump_after_write(instance.user_id)
+
+
+def get_many(user_ids) -> dict:
+    """``{user_id: (version, payload or None)}`` in two cache round trips."""
+    versions = get_versions(user_ids)
+    keys = {payload_key(user_id, version): user_id for user_id, version in versions.items()}
+    payloads = cache.get_many(list(keys))
+    return {
+        user_id: (versions[user_id], payloads.get(payload_key(user_id, versions[user_id])))
+        for user_id in user_ids
+    }
+
+
+def store(user_id, version, payload):
+    cache.set(payload_key(user_id, version), payload, getattr(settings, "PROFILE_CACHE_SECONDS", 60))
+
+
+def get_or_build(user_id, build, *, version=None):
+    """Cached payload of ``user_id``, building it once per version even under concurrency."""
+    if version is None:
+        version = get_versions([user_id])[user_id]
+    key = payload_key(user_id, version)
+    payload = cache.get(key)
+    if payload is not None:
+        return payload
+    lock = f"{key}:lock"
+    if not cache.add(lock, 1, LOCK_SECONDS):
+        # 他のリクエストが生成中
+        deadline = time.monotonic() + WAIT_SECONDS
+        while time.monotonic() < deadline:
+            time.sleep(WAIT_STEP)
+            payload = cache.get(key)
+            if payload is not None:
+                return payload
+        return build()
+    try:
+        payload = build()
+        store(user_id, version, payload)
+    finally:
+        cache.delete(lock)
+    return payload
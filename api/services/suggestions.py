@@ -0,0 +1,167 @@
+"""
+Follow suggestions ("who to follow")
+
+`refresh_follow_suggestions` コマンドがフォローグラフを読み、ユーザごとの候補上位
+`SUGGESTIONS_TOP_K` 件を `follow_suggestion` テーブルに保存する。エンドポイントは保存済みの
+候補を読むだけなので、リクエスト時にグラフを辿らない。
+
+- 候補はフォロー中のユーザがフォローしている人（2 ホップ先）と、フォロワー数上位
+  `SUGGESTIONS_POPULAR_POOL` 人。スコアは「共通フォロー数 + SUGGESTIONS_POPULARITY_WEIGHT × log(1 + フォロワー数)」。
+- フォロー/解除したユーザは `follow_suggestion_queue` に積まれ、差分更新ではそのユーザと
+  そのフォロワー（2 ホップ先が変わる人）だけを再計算する。
+- `--workers` を 2 以上にすると、スコア計算をプロセスプールで並列に行う（DB の読み書きは親プロセスのみ）。
+"""
+
+import heapq
+import math
+from collections import Counter, defaultdict
+from concurrent.futures import ProcessPoolExecutor
+
+from django.conf import settings
+from django.db import connections, transaction
+from django.utils import timezone
+
+from accounts.models import CustomUser, UserStats
+from follow.models import Follow, FollowSuggestion, FollowSuggestionQueue
+
+_graph = None
+
+
+def mark_dirty(*user_ids):
+    """Queue ``user_ids`` for the next incremental refresh (single upsert)."""
+    now = timezone.now()
+    FollowSuggestionQueue.objects.bulk_create(
+        [FollowSuggestionQueue(user_id=user_id, queued_at=now) for user_id in user_ids],
+        update_conflicts=True,
+        unique_fields=["user"],
+        update_fields=["queued_at"],
+    )
+
+
+def _chunks(items, size):
+    items = list(items)
+    for start in range(0, len(items), size):
+        yield items[start : start + size]
+
+
+def _following(user_ids, batch_size) -> dict:
+    following = defaultdict(set)
+    for chunk in _chunks(user_ids, batch_size):
+        edges = Follow.objects.filter(user_id__in=chunk).values_list("user_id", "aim_user_id")
+        for user_id, aim_user_id in edges.iterator():
+            if user_id != aim_user_id:
+                following[user_id].add(aim_user_id)
+    return following
+
+
+def load_graph(targets, *, batch_size: int = 5000) -> dict:
+    """Follow edges and follower counts needed to score ``targets``."""
+    following = _following(targets, batch_size)
+    followees = set().union(*following.values()) - set(targets)
+    following.update(_following(followees, batch_size))
+
+    popular = list(
+        UserStats.objects.order_by("-follower_count", "user_id").values_list(
+            "user_id", "follower_count"
+        )[: getattr(settings, "SUGGESTIONS_POPULAR_POOL", 50)]
+    )
+    candidates = set().union(*following.values()) - {user_id for user_id, _ in popular}
+    follower_counts = dict(popular)
+    for chunk in _chunks(candidates, batch_size):
+        follower_counts.update(
+            UserStats.objects.filter(user_id__in=chunk).values_list("user_id", "follower_count")
+        )
+    return {
+        "following": dict(following),
+        "popular": [user_id for user_id, _ in popular],
+        "follower_counts": follower_counts,
+        "top_k": getattr(settings, "SUGGESTIONS_TOP_K", 20),
+        "popularity_weight": getattr(settings, "SUGGESTIONS_POPULARITY_WEIGHT", 0.5),
+    }
+
+
+def score_user(user_id, graph) -> list:
+    """Top-K ``(suggested_id, score, mutual_count)`` for ``user_id``."""
+    following = graph["following"]
+    followed = following.get(user_id, set())
+    mutual = Counter()
+    for followee in followed:
+        for candidate in following.get(followee, ()):
+            mutual[candidate] += 1
+    for candidate in graph["popular"]:
+        mutual[candidate] += 0
+    weight = graph["popularity_weight"]
+    counts = graph["follower_counts"]
+    scored = (
+        (candidate, common + weight * math.log1p(counts.get(candidate, 0)), common)
+        for candidate, common in mutual.items()
+        if candidate != user_id and candidate not in followed
+    )
+    return heapq.nlargest(graph["top_k"], scored, key=lambda row: (row[1], -row[0]))
+
+
+def _init_worker(graph):
+    global _graph
+    _graph = graph
+
+
+def _score_chunk(user_ids) -> dict:
+    return {user_id: score_user(user_id, _graph) for user_id in user_ids}
+
+
+def _store(results: dict, batch_size: int) -> int:
+    rows = [
+        FollowSuggestion(user_id=user_id, suggested_id=suggested_id, score=score, mutual_count=common)
+        for user_id, suggestions in results.items()
+        for suggested_id, score, common in suggestions
+    ]
+    with transaction.atomic():
+        FollowSuggestion.objects.filter(user_id__in=list(results)).delete()
+        FollowSuggestion.objects.bulk_create(rows, batch_size=batch_size)
+    return len(rows)
+
+
+def refresh(user_ids, *, workers: int = 1, batch_size: int = 5000) -> int:
+    """Recompute and store suggestions for ``user_ids``; returns the number of rows written."""
+    written = 0
+    for targets in _chunks(sorted(set(user_ids)), batch_size):
+        graph = load_graph(targets, batch_size=batch_size)
+        if workers > 1:
+            size = max(len(targets) // (workers * 4), 1)
+            # 子プロセスに DB 接続を引き継がせない
+            connections.close_all()
+            with ProcessPoolExecutor(workers, initializer=_init_worker, initargs=(graph,)) as pool:
+                results = {}
+                for chunk_results in pool.map(_score_chunk, _chunks(targets, size)):
+                    results.update(chunk_results)
+        else:
+            results = {user_id: score_user(user_id, graph) for user_id in targets}
+        written += _store(results, batch_size)
+    return written
+
+
+def refresh_all(*, workers: int = 1, batch_size: int = 5000) -> int:
+    started = timezone.now()
+    user_ids = CustomUser.objects.filter(is_active=True).values_list("user_id", flat=True)
+    written = refresh(user_ids, workers=workers, batch_size=batch_size)
+    FollowSuggestionQueue.objects.filter(queued_at__lte=started).delete()
+    return written
+
+
+def refresh_dirty(*, workers: int = 1, batch_size: int = 5000) -> int:
+    """Refresh users whose follows changed, plus their followers (their 2-hop set changed)."""
+    started = timezone.now()
+    changed = list(
+        FollowSuggestionQueue.objects.filter(queued_at__lte=started).values_list("user_id", flat=True)
+    )
+    if not changed:
+        return 0
+    targets = set(changed)
+    for chunk in _chunks(changed, batch_size):
+        targets.update(
+            Follow.objects.filter(aim_user_id__in=chunk).values_list("user_id", flat=True)
+        )
+    written = refresh(targets, workers=workers, batch_size=batch_size)
+    # 実行中に積まれたものは次回に回す
+    FollowSuggestionQueue.objects.filter(user_id__in=changed, queued_at__lte=started).delete()
+    return written
@@ -0,0 +1,93 @@
+"""
+Time-decayed trending score
+
+`Post.trending_score` は半減期 `TRENDING_HALF_LIFE_HOURS` で減衰するいいね数。
+いいね時に +1、解除時にそのいいねの現在の重み 2^(-経過時間/半減期) を引き、
+`decay_trending_scores` コマンドが `TRENDING_DECAY_INTERVAL_SECONDS` ごとに全体へ減衰率を掛ける。
+`TRENDING_MIN_SCORE` を下回った投稿は 0 に落とし、人気タブ/24h ランキングから外れる。
+24h 境界で一斉に消えるのではなく、古い投稿ほど徐々に順位が下がる。
+"""
+
+import math
+
+from django.conf import settings
+from django.db.models import F, Value
+from django.db.models.functions import Greatest
+from django.utils import timezone
+
+# 人気タブ / 24h ランキングの並び順（post_trending_idx と一致させる）
+TRENDING_ORDERING = ("-trending_score", "-post_id")
+
+
+def half_life_seconds() -> float:
+    return getattr(settings, "TRENDING_HALF_LIFE_HOURS", 6) * 3600
+
+
+def decay_factor(elapsed_seconds: float) -> float:
+    return math.pow(2, -elapsed_seconds / half_life_seconds())
+
+
+def like_weight(liked_at, now=None) -> float:
+    """Current weight of a like given at ``liked_at`` (1.0 when fresh)."""
+    now = now or timezone.now()
+    return decay_factor(max((now - liked_at).total_seconds(), 0))
+
+
+def on_like() -> dict:
+    """``update()`` kwargs adding a fresh like to the score."""
+    return {"trending_score": F("trending_score") + 1.0}
+
+
+def on_unlike(liked_at) -> dict:
+    """``update()`` kwargs removing a like (with its decayed weight) from the score."""
+    return {
+        "trending_score": Greatest(
+            F("trending_score") - Value(like_weight(liked_at)), Value(0.0)
+        )
+    }
+
+
+def trending_posts(queryset):
+    """Posts with a live trending score, ordered over ``post_trending_idx``."""
+    return queryset.filter(trending_score__gt=0).order_by(*TRENDING_ORDERING)
+
+
+def decay(elapsed_seconds: float, *, batch_size: int = 5000) -> int:
+    """Multiply every live score by the decay factor in primary-key batches."""
+    from post.models import Post
+
+    factor = decay_factor(elapsed_seconds)
+    min_score = getattr(settings, "TRENDING_MIN_SCORE", 0.05)
+    live = Post.objects.filter(trending_score__gt=0)
+    updated = 0
+    last_id = 0
+    while True:
+        ids = list(
+            live.filter(post_id__gt=last_id)
+            .order_by("post_id")
+            .values_list("post_id", flat=True)[:batch_size]
+        )
+        if not ids:
+            return updated
+        batch = Post.objects.filter(post_id__gte=ids[0], post_id__lte=ids[-1], trending_score__gt=0)
+        updated += batch.update(trending_score=F("trending_score") * factor)
+        batch.filter(trending_score__lt=min_score).update(trending_score=0)
+        last_id = ids[-1]
+
+
+def recompute(posts) -> list:
+    """Recompute ``trending_score`` of ``posts`` from their likes (backfills/repairs)."""
+    from post.models import Like
+
+    now = timezone.now()
+    min_score = getattr(settings, "TRENDING_MIN_SCORE", 0.05)
+    by_id = {post.post_id: post for post in posts}
+    for post in by_id.values():
+        post.trending_score = 0.0
+    likes = Like.objects.filter(post_id__in=list(by_id)).values_list("post_id", "created_at")
+    for post_id, created_at in likes.iterator():
+        by_id[post_id].trending_score += like_weight(created_at, now)
+    for post in by_id.values():
+        if post.trending_score < min_score:
+            post.trending_score = 0.0
+    return list(by_id.values())
@@ -0,0 +1,143 @@
+"""
+Slow-query log
+
+`QueryInstrumentationMiddleware` の execute_wrapper から、しきい値
+(`SLOW_QUERY_THRESHOLD_MS`) を超えたクエリを受け取り、SQL・パラメータ・呼び出し元ビュー・
+実行計画を `SlowQueryLog` テーブルと `api.slow_query` ロガーに記録する。
+
+- 実行計画は Postgres では `EXPLAIN (ANALYZE, BUFFERS)`（SELECT のみ、それ以外は `EXPLAIN`）、
+  SQLite では `EXPLAIN QUERY PLAN` で取得する。
+- 同じ形（フィンガープリント）のクエリは `SLOW_QUERY_RATE_LIMIT_SECONDS` に 1 回だけ記録する。
+- 取得は既定でバックグラウンドスレッドが行い、リクエストをブロックしない。
+"""
+
+import hashlib
+import json
+import logging
+import queue
+import threading
+import time
+
+from django.conf import settings
+from django.db import connections
+
+from .middleware import normalize_sql
+
+logger = logging.getLogger("api.slow_query")
+
+_last_logged = {}
+_MAX_FINGERPRINTS = 10000
+_queue: "queue.Queue" = queue.Queue(maxsize=100)
+_worker_started = False
+_worker_lock = threading.Lock()
+
+
+def fingerprint(sql: str) -> str:
+    return hashlib.sha1(normalize_sql(sql).encode()).hexdigest()
+
+
+def _should_capture(sql: str, key: str) -> bool:
+    head = sql.lstrip()[:16].upper()
+    if head.startswith("EXPLAIN") or "slow_query_log" in sql:
+        return False
+    interval = getattr(settings, "SLOW_QUERY_RATE_LIMIT_SECONDS", 300)
+    now = time.monotonic()
+    last = _last_logged.get(key)
+    if last is not None and now - last < interval:
+        return False
+    if len(_last_logged) >= _MAX_FINGERPRINTS:
+        _last_logged.clear()
+    _last_logged[key] = now
+    return True
+
+
+def report(sql: str, params, *, duration: float, view: str, using: str):
+    """Called for every query slower than the threshold; rate-limited per fingerprint."""
+    key = fingerprint(sql)
+    if not _should_capture(sql, key):
+        return
+    job = {
+        "fingerprint": key,
+        "sql": sql,
+        "params": params,
+        "view": view or "",
+        "database": using,
+        "duration_ms": duration * 1000,
+    }
+    if not getattr(settings, "SLOW_QUERY_LOG_ASYNC", True):
+        capture(job)
+        return
+    _ensure_worker()
+    try:
+        _queue.put_nowait(job)
+    except queue.Full:
+        pass
+
+
+def explain(sql: str, params, using: str) -> str:
+    connection = connections[using]
+    if connection.vendor == "postgresql":
+        is_select = sql.lstrip()[:6].upper() == "SELECT" and "FOR UPDATE" not in sql.upper()
+        prefix = "EXPLAIN (ANALYZE, BUFFERS) " if is_select else "EXPLAIN "
+    elif connection.vendor == "sqlite":
+        prefix = "EXPLAIN QUERY PLAN "
+    else:
+        prefix = "EXPLAIN "
+    with connection.cursor() as cursor:
+        cursor.execute(prefix + sql, params)
+        rows = cursor.fetchall()
+    return "\n".join(" ".join(str(col) for col in row) for row in rows)
+
+
+def capture(job: dict):
+    from .models import SlowQueryLog
+
+    try:
+        plan = explain(job["sql"], job["params"], job["database"])
+    except Exception as e:
+        plan = f"EXPLAIN failed: {e}"
+    params = json.dumps(job["params"], default=str, ensure_ascii=False)
+    SlowQueryLog.objects.create(
+        fingerprint=job["fingerprint"],
+        sql=job["sql"],
+        params=params,
+        view=job["view"],
+        database=job["database"],
+        duration_ms=job["duration_ms"],
+        plan=plan,
+    )
+    logger.warning(
+        json.dumps(
+            {
+                "event": "slow_query",
+                "fingerprint": job["fingerprint"],
+                "view": job["view"],
+                "duration_ms": round(job["duration_ms"], 2),
+                "sql": job["sql"],
+                "plan": plan,
+            },
+            ensure_ascii=False,
+        )
+    )
+
+
+def _ensure_worker():
+    global _worker_started
+    if _worker_started:
+        return
+    with _worker_lock:
+        if _worker_started:
+            return
+        threading.Thread(target=_worker, name="slow-query-explain", daemon=True).start()
+        _worker_started = True
+
+
+def _worker():
+    while True:
+        job = _queue.get()
+        try:
+            capture(job)
+        except Exception as e:
+            logger.error(f"Failed to record slow query: {e}")
+        finally:
+            connections.close_all()
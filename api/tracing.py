@@ -0,0 +1,259 @@
+"""
+Lightweight request tracing
+
+`span()` コンテキストマネージャで処理フェーズを計測し、親子関係は contextvars で伝播する。
+トレースが開始されていないスレッド/コンテキストでは `span()` は何もしないため、
+モデルやサービス層に埋め込んでもオーバーヘッドはほぼない。
+
+テールベースサンプリング: ルートスパンの終了時に全体の所要時間が
+`TRACING_SLOW_THRESHOLD_MS` 以上だったトレースだけをエクスポートする。
+エクスポートはバックグラウンドスレッドで行い、出力先は JSON Lines ファイル
+または OTLP/HTTP (JSON) コレクタ。
+"""
+
+import functools
+import json
+import logging
+import os
+import queue
+import threading
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Optional
+
+from django.conf import settings
+
+logger = logging.getLogger(__name__)
+
+_current_span: ContextVar[Optional["Span"]] = ContextVar("current_span", default=None)
+
+
+class Span:
+    __slots__ = (
+        "trace",
+        "span_id",
+        "parent_id",
+        "name",
+        "attributes",
+        "start_ns",
+        "end_ns",
+        "error",
+    )
+
+    def __init__(self, trace, name: str, parent_id: Optional[str], attributes: dict):
+        self.trace = trace
+        self.span_id = os.urandom(8).hex()
+        self.parent_id = parent_id
+        self.name = name
+        self.attributes = attributes
+        self.start_ns = time.time_ns()
+        self.end_ns = None
+        self.error = None
+        trace.spans.append(self)
+
+    @property
+    def duration_ms(self) -> float:
+        end = self.end_ns if self.end_ns is not None else time.time_ns()
+        return (end - self.start_ns) / 1e6
+
+    def set_attribute(self, key: str, value):
+        self.attributes[key] = value
+
+    def to_dict(self) -> dict:
+        return {
+            "trace_id": self.trace.trace_id,
+            "span_id": self.span_id,
+            "parent_id": self.parent_id,
+            "name": self.name,
+            "start_ns": self.start_ns,
+            "end_ns": self.end_ns,
+            "duration_ms": round(self.duration_ms, 3),
+            "attributes": self.attributes,
+            "error": self.error,
+        }
+
+
+class Trace:
+    __slots__ = ("trace_id", "spans")
+
+    def __init__(self):
+        self.trace_id = os.urandom(16).hex()
+        self.spans = []
+
+
+def current_span() -> Optional[Span]:
+    return _current_span.get()
+
+
+@contextmanager
+def span(name: str, **attributes):
+    """Record a child span of the active span; a no-op outside a trace."""
+    parent = _current_span.get()
+    if parent is None:
+        yield None
+        return
+    child = Span(parent.trace, name, parent.span_id, attributes)
+    token = _current_span.set(child)
+    try:
+        yield child
+    except Exception as exc:
+        child.error = repr(exc)
+        raise
+    finally:
+        child.end_ns = time.time_ns()
+        _current_span.reset(token)
+
+
+def traced(name: str):
+    """Decorator form of ``span``."""
+
+    def decorator(func):
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            if _current_span.get() is None:
+                return func(*args, **kwargs)
+            with span(name):
+                return func(*args, **kwargs)
+
+        return wrapper
+
+    return decorator
+
+
+def trace_methods(cls, names: dict):
+    """Wrap ``{method: span name}`` of ``cls`` in ``traced`` (for models outside ``api``)."""
+    for attr, name in names.items():
+        method = cls.__dict__[attr]
+        if isinstance(method, classmethod):
+            setattr(cls, attr, classmethod(traced(name)(method.__func__)))
+        else:
+            setattr(cls, attr, traced(name)(method))
+
+
+def is_enabled() -> bool:
+    return bool(getattr(settings, "TRACING_EXPORTER", ""))
+
+
+@contextmanager
+def start_trace(name: str, **attributes):
+    """Open a root span; the finished trace is exported only if it was slow."""
+    root = Span(Trace(), name, None, attributes)
+    token = _current_span.set(root)
+    try:
+        yield root
+    except Exception as exc:
+        root.error = repr(exc)
+        raise
+    finally:
+        root.end_ns = time.time_ns()
+        _current_span.reset(token)
+        threshold = getattr(settings, "TRACING_SLOW_THRESHOLD_MS", 500)
+        if root.duration_ms >= threshold:
+            _enqueue(root.trace)
+
+
+# --- Export ---
+
+_queue: "queue.Queue" = queue.Queue(maxsize=1000)
+_worker_pid = None
+
+
+def _enqueue(trace: Trace):
+    global _worker_pid
+    if _worker_pid != os.getpid():
+        _worker_pid = os.getpid()
+        threading.Thread(target=_worker, name="trace-exporter", daemon=True).start()
+    try:
+        _queue.put_nowait(trace)
+    except queue.Full:
+        logger.warning("Trace export queue is full; dropping trace.")
+
+
+def flush(timeout: float = 5.0):
+    """Block until queued traces are exported (used by tests and shutdown hooks)."""
+    deadline = time.monotonic() + timeout
+    while _queue.unfinished_tasks and time.monotonic() < deadline:
+        time.sleep(0.01)
+
+
+def _worker():
+    while True:
+        trace = _queue.get()
+        try:
+            export(trace)
+        except Exception as e:
+            logger.error(f"Failed to export trace: {e}")
+        finally:
+            _queue.task_done()
+
+
+def export(trace: Trace):
+    exporter = getattr(settings, "TRACING_EXPORTER", "")
+    if exporter == "file":
+        _export_file(trace)
+    elif exporter == "otlp":
+        _export_otlp(trace)
+
+
+def _export_file(trace: Trace):
+    path = getattr(settings, "TRACING_FILE_PATH", "/tmp/short_app_traces.jsonl")
+    line = json.dumps(
+        {"trace_id": trace.trace_id, "spans": [s.to_dict() for s in trace.spans]},
+        ensure_ascii=False,
+        default=str,
+    )
+    with open(path, "a") as fp:
+        fp.write(line + "\n")
+
+
+def _otlp_value(value) -> dict:
+    if isinstance(value, bool):
+        return {"boolValue": value}
+    if isinstance(value, int):
+        return {"intValue": str(value)}
+    if isinstance(value, float):
+        return {"doubleValue": value}
+    return {"stringValue": str(value)}
+
+
+def to_otlp(trace: Trace) -> dict:
+    """Build an OTLP/HTTP JSON ``ExportTraceServiceRequest`` body."""
+    spans = []
+    for s in trace.spans:
+        body = {
+            "traceId": trace.trace_id,
+            "spanId": s.span_id,
+            "name": s.name,
+            "kind": 2 if s.parent_id is None else 1,
+            "startTimeUnixNano": str(s.start_ns),
+            "endTimeUnixNano": str(s.end_ns or s.start_ns),
+            "attributes": [
+                {"key": key, "value": _otlp_value(value)} for key, value in s.attributes.items()
+            ],
+            "status": {"code": 2, "message": s.error} if s.error else {"code": 1},
+        }
+        if s.parent_id:
+            body["parentSpanId"] = s.parent_id
+        spans.append(body)
+    service_name = getattr(settings, "TRACING_SERVICE_NAME", "short-app")
+    return {
+        "resourceSpans": [
+            {
+                "resource": {
+                    "attributes": [
+                        {"key": "service.name", "value": {"stringValue": service_name}}
+                    ]
+                },
+                "scopeSpans": [{"scope": {"name": "api.tracing"}, "spans": spans}],
+            }
+        ]
+    }
+
+
+def _export_otlp(trace: Trace):
+    import requests
+
+    endpoint = getattr(settings, "TRACING_OTLP_ENDPOINT", "http://localhost:4318/v1/traces")
+    response = requests.post(endpoint, json=to_otlp(trace), timeout=5)
+    response.raise_for_status()
@@ -1,9 +1,20 @@
+from django.conf import settings
 from django.urls import include, path
 from rest_framework.routers import DefaultRouter
 
 from .views import (
+    AsyncPostLikeRankingView,
+    AsyncPostSearchView,
+    AsyncTimelineView,
+    AsyncUserFollowerRankingView,
+    AsyncUserLevelRankingView,
+    AsyncUserSearchView,
+    AsyncUserTotalLikesRankingView,
     CustomUserViewSet,
     DeviceTokenView,
+    ExportView,
+    FollowStatusView,
+    FollowSuggestionView,
     FollowViewSet,
     LikeViewSet,
     LikedPostsView,
@@ -11,6 +22,8 @@ from .views import (
     PostLikedStatusView,
     PostSearchView,
     PostViewSet,
+    ProfileDownloadView,
+    ProfileListView,
     TimelineView,
     UserFollowerRankingView,
     UserLevelRankingView,
@@ -19,6 +32,12 @@ from .views import (
 )
 from .views.auth import AppleAuthView, GoogleAuthView
 
+
+def read_view(view, async_view):
+    """Use the coroutine variant of a read-heavy list view when ``ASYNC_VIEWS`` is on (ASGI)."""
+    return (async_view if settings.ASYNC_VIEWS else view).as_view()
+
+
 router = DefaultRouter()
 router.register("users", CustomUserViewSet, basename="user")
 router.register("posts", PostViewSet, basename="post")
@@ -29,26 +48,35 @@ urlpatterns = [
     path("auth/google/", GoogleAuthView.as_view(), name="google-auth"),
     path("auth/apple/", AppleAuthView.as_view(), name="apple-auth"),
     path("device-token/", DeviceTokenView.as_view(), name="device-token"),
+    path("follows/status/", FollowStatusView.as_view(), name="follow-status"),
     path("posts/liked-status/", PostLikedStatusView.as_view(), name="post-liked-status"),
     path("users/<int:user_id>/liked-posts/", LikedPostsView.as_view(), name="liked-posts"),
-    path("rankings/posts/likes/", PostLikeRankingView.as_view(), name="post-like-ranking"),
+    path("users/suggestions/", FollowSuggestionView.as_view(), name="follow-suggestions"),
+    path(
+        "rankings/posts/likes/",
+        read_view(PostLikeRankingView, AsyncPostLikeRankingView),
+        name="post-like-ranking",
+    ),
     path(
         "rankings/users/total-likes/",
-        UserTotalLikesRankingView.as_view(),
+        read_view(UserTotalLikesRankingView, AsyncUserTotalLikesRankingView),
         name="user-total-likes-ranking",
     ),
     path(
         "rankings/users/level/",
-        UserLevelRankingView.as_view(),
+        read_view(UserLevelRankingView, AsyncUserLevelRankingView),
         name="user-level-ranking",
     ),
     path(
         "rankings/users/followers/",
-        UserFollowerRankingView.as_view(),
+        read_view(UserFollowerRankingView, AsyncUserFollowerRankingView),
         name="user-follower-ranking",
     ),
-    path("timeline/", TimelineView.as_view(), name="timeline"),
-    path("search/users/", UserSearchView.as_view(), name="search-users"),
-    path("search/posts/", PostSearchView.as_view(), name="search-posts"),
+    path("timeline/", read_view(TimelineView, AsyncTimelineView), name="timeline"),
+    path("search/users/", read_view(UserSearchView, AsyncUserSearchView), name="search-users"),
+    path("search/posts/", read_view(PostSearchView, AsyncPostSearchView), name="search-posts"),
+    path("profiles/", ProfileListView.as_view(), name="profile-list"),
+    path("profiles/<str:endpoint>/", ProfileDownloadView.as_view(), name="profile-download"),
+    path("export/<str:table>/", ExportView.as_view(), name="export"),
     path("", include(router.urls)),
 ]
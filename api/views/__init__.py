@@ -1,21 +1,29 @@
 from .user import CustomUserViewSet
 from .post import PostViewSet
-from .follow import FollowViewSet
+from .follow import FollowStatusView, FollowSuggestionView, FollowViewSet
 from .like import LikeViewSet, LikedPostsView, PostLikedStatusView
-from .timeline import TimelineView
-from .search import PostSearchView, UserSearchView
+from .timeline import AsyncTimelineView, TimelineView
+from .search import AsyncPostSearchView, AsyncUserSearchView, PostSearchView, UserSearchView
 from .ranking import (
+    AsyncPostLikeRankingView,
+    AsyncUserFollowerRankingView,
+    AsyncUserLevelRankingView,
+    AsyncUserTotalLikesRankingView,
     PostLikeRankingView,
     UserFollowerRankingView,
     UserLevelRankingView,
     UserTotalLikesRankingView,
 )
 from .device_token import DeviceTokenView
+from .profiling import ProfileDownloadView, ProfileListView
+from .export import ExportView
 
 __all__ = [
     "CustomUserViewSet",
     "PostViewSet",
     "FollowViewSet",
+    "FollowSuggestionView",
+    "FollowStatusView",
     "LikeViewSet",
     "LikedPostsView",
     "PostLikedStatusView",
@@ -27,4 +35,14 @@ __all__ = [
     "UserLevelRankingView",
     "UserFollowerRankingView",
     "DeviceTokenView",
+    "ProfileListView",
+    "ProfileDownloadView",
+    "ExportView",
+    "AsyncTimelineView",
+    "AsyncUserSearchView",
+    "AsyncPostSearchView",
+    "AsyncPostLikeRankingView",
+    "AsyncUserTotalLikesRankingView",
+    "AsyncUserLevelRankingView",
+    "AsyncUserFollowerRankingView",
 ]
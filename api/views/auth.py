@@ -1,9 +1,7 @@
 import json
 
 import jwt
-import requests as http_requests
 from django.conf import settings
-from google.auth.transport import requests
 from google.oauth2 import id_token
 from rest_framework import permissions, status
 from rest_framework.authtoken.models import Token
@@ -12,11 +10,14 @@ from rest_framework.views import APIView
 
 from accounts.models import CustomUser
 
+from ..services.auth_keys import CachedCertsRequest, apple_keys
+
 
 class GoogleAuthView(APIView):
     """Google ID Tokenを検証してAPIトークンを発行するビュー"""
 
     permission_classes = [permissions.AllowAny]
+    throttle_scope = "auth"
 
     def post(self, request):
         token = request.data.get("id_token")
@@ -36,7 +37,7 @@ class GoogleAuthView(APIView):
             try:
                 idinfo = id_token.verify_oauth2_token(
                     token,
-                    requests.Request(),
+                    CachedCertsRequest(),
                     client_id,
                 )
                 break  # 検証成功
@@ -76,6 +77,14 @@ class AppleAuthView(APIView):
     """Apple ID Tokenを検証してAPIトークンを発行するビュー"""
 
     permission_classes = [permissions.AllowAny]
+    throttle_scope = "auth"
+
+    @staticmethod
+    def _find_public_key(public_keys: dict, kid: str):
+        for key in public_keys.get("keys", []):
+            if key.get("kid") == kid:
+                return jwt.algorithms.RSAAlgorithm.from_jwk(json.dumps(key))
+        return None
 
     def _verify_apple_token(self, identity_token: str) -> dict:
         """
@@ -90,12 +99,9 @@ class AppleAuthView(APIView):
         Raises:
             ValueError: トークンの検証に失敗した場合
         """
-        # Appleの公開鍵を取得
-        apple_public_keys_url = "https://appleid.apple.com/auth/keys"
+        # Appleの公開鍵を取得（プロセス内キャッシュ、期限切れ後はバックグラウンド更新）
         try:
-            response = http_requests.get(apple_public_keys_url, timeout=10)
-            response.raise_for_status()
-            apple_public_keys = response.json()
+            apple_public_keys = apple_keys.get()
         except Exception as e:
             raise ValueError(f"Failed to fetch Apple public keys: {e}")
 
@@ -108,12 +114,13 @@ class AppleAuthView(APIView):
         except Exception as e:
             raise ValueError(f"Failed to decode token header: {e}")
 
-        # 対応する公開鍵を探す
-        public_key = None
-        for key in apple_public_keys.get("keys", []):
-            if key.get("kid") == kid:
-                public_key = jwt.algorithms.RSAAlgorithm.from_jwk(json.dumps(key))
-                break
+        # 対応する公開鍵を探す（見つからなければ鍵のローテーションとみなして一度だけ再取得）
+        public_key = self._find_public_key(apple_public_keys, kid)
+        if not public_key:
+            try:
+                public_key = self._find_public_key(apple_keys.refresh(), kid)
+            except Exception as e:
+                raise ValueError(f"Failed to fetch Apple public keys: {e}")
 
         if not public_key:
             raise ValueError("Public key not found for the given kid")
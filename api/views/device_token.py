@@ -4,6 +4,8 @@ from rest_framework.views import APIView
 
 from accounts.models import DeviceToken
 
+from ..idempotency import idempotent
+
 
 class DeviceTokenView(APIView):
     """
@@ -13,6 +15,7 @@ class DeviceTokenView(APIView):
 
     permission_classes = [permissions.IsAuthenticated]
 
+    @idempotent
     def post(self, request):
         """Register or update FCM device token."""
         token = request.data.get("token")
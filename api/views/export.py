@@ -0,0 +1,49 @@
+from django.core.handlers.asgi import ASGIRequest
+from django.db import router
+from django.http import Http404, StreamingHttpResponse
+from django.utils.dateparse import parse_datetime
+from rest_framework import permissions
+from rest_framework.exceptions import ValidationError
+from rest_framework.views import APIView
+
+from ..services import export
+
+
+class ExportView(APIView):
+    """Stream one table as NDJSON (``?gzip=1`` for a .ndjson.gz download). Staff only."""
+
+    permission_classes = [permissions.IsAdminUser]
+    use_read_replica = True
+
+    def get(self, request, table):
+        if table not in export.TABLES:
+            raise Http404("Unknown table")
+        params = request.query_params
+        filters = {}
+        if params.get("since_id"):
+            try:
+                filters["since_id"] = int(params["since_id"])
+            except ValueError:
+                raise ValidationError({"since_id": "整数で指定してください。"})
+        if params.get("since"):
+            filters["since"] = parse_datetime(params["since"])
+            if filters["since"] is None:
+                raise ValidationError({"since": "ISO 8601 の日時で指定してください。"})
+        if params.get("chunk_size"):
+            try:
+                filters["chunk_size"] = min(max(int(params["chunk_size"]), 1), 10000)
+            except ValueError:
+                raise ValidationError({"chunk_size": "整数で指定してください。"})
+        gzip = params.get("gzip") in ("1", "true")
+        # 本文はビューが返った後（リクエストのルーティングが外れた後）に読まれるので、読み取り先をここで固定する
+        filters["using"] = router.db_for_read(export.TABLES[table][0])
+
+        # ASGI には非同期イテレータを渡す（同期イテレータは全体をメモリに読み込まれる）
+        stream = export.astream if isinstance(request._request, ASGIRequest) else export.stream
+        response = StreamingHttpResponse(
+            stream(table, gzip=gzip, **filters),
+            content_type="application/gzip" if gzip else "application/x-ndjson",
+        )
+        filename = f"{table}.ndjson" + (".gz" if gzip else "")
+        response["Content-Disposition"] = f'attachment; filename="{filename}"'
+        return response
@@ -1,18 +1,38 @@
+from django.conf import settings
 from django.db.models import F
+from django.utils import timezone
 from rest_framework import permissions, viewsets
-from rest_framework.exceptions import PermissionDenied
+from rest_framework.exceptions import PermissionDenied, ValidationError
+from rest_framework.generics import ListAPIView
+from rest_framework.response import Response
+from rest_framework.settings import api_settings
+from rest_framework.views import APIView
 
+from accounts.models import CustomUser
 from follow.models import Follow
 
-from ..serializers import FollowSerializer
+from .. import tracing
+from ..idempotency import idempotent
+from ..pagination import FollowCursorPagination
+from ..serializers import (
+    CustomUserSerializer,
+    FollowSerializer,
+    build_follow_lookup,
+    missing_object_error,
+)
+from ..services import inserts, suggestions
+from .mixins import BatchSerializerContextMixin, UserListContextMixin
 
 
-class FollowViewSet(viewsets.ModelViewSet):
+class FollowViewSet(BatchSerializerContextMixin, viewsets.ModelViewSet):
     serializer_class = FollowSerializer
     permission_classes = [permissions.IsAuthenticatedOrReadOnly]
+    pagination_class = FollowCursorPagination
+    throttle_scopes = {"create": "follow", "destroy": "unfollow"}
+    read_replica_actions = ("list",)
 
     def get_queryset(self):
-        queryset = Follow.objects.select_related("user", "aim_user").all()
+        queryset = Follow.objects.select_related("user__stats", "aim_user__stats").all()
         # 自分自身をフォローしているレコードを除外
         queryset = queryset.exclude(user_id=F("aim_user_id"))
         user_id = self.request.query_params.get("user_id")
@@ -23,27 +43,63 @@ class FollowViewSet(viewsets.ModelViewSet):
             queryset = queryset.filter(aim_user_id=aim_user_id)
         return queryset
 
+    def get_pagination_ordering(self):
+        params = self.request.query_params
+        if params.get("user_id") or params.get("aim_user_id"):
+            # follow_user_time_idx / follow_aim_user_time_idx
+            return ("-time", "-id")
+        return ("-id",)
+
+    def get_context_users(self, objects):
+        return [follow.user for follow in objects] + [follow.aim_user for follow in objects]
+
+    @idempotent
+    def create(self, request, *args, **kwargs):
+        return super().create(request, *args, **kwargs)
+
     def perform_create(self, serializer):
-        follow = serializer.save(user=self.request.user)
-        follower_stats = getattr(self.request.user, "stats", None)
-        target_stats = getattr(follow.aim_user, "stats", None)
-        if follower_stats:
-            follower_stats.update_follow_counts(following_delta=1)
-        if target_stats:
-            target_stats.update_follow_counts(followers_delta=1)
+        aim_user_id = serializer.validated_data["aim_user_id"]
+        aim_user = CustomUser.objects.select_related("stats").filter(pk=aim_user_id).first()
+        if aim_user is None:
+            raise missing_object_error("aim_user_id", aim_user_id)
+        now = timezone.now()
+        follow_id = inserts.insert_ignore(
+            Follow, user_id=self.request.user.pk, aim_user_id=aim_user.pk, time=now
+        )
+        if follow_id is None:
+            # 同時に届いた重複リクエストもここに来る（副作用は実行しない）
+            raise ValidationError({api_settings.NON_FIELD_ERRORS_KEY: ["既にフォロー済みです。"]})
+        follow = Follow(id=follow_id, user=self.request.user, aim_user=aim_user, time=now)
+        serializer.instance = follow
+        suggestions.mark_dirty(follow.user_id)
+        with tracing.span("follow.stats"):
+            follower_stats = getattr(self.request.user, "stats", None)
+            target_stats = getattr(follow.aim_user, "stats", None)
+            if follower_stats:
+                follower_stats.update_follow_counts(following_delta=1)
+            if target_stats:
+                target_stats.update_follow_counts(followers_delta=1)
 
         # Send push notification
         from ..services.notifications import (
+            active_tokens,
             check_and_notify_user_follower_ranking,
             notify_followed,
         )
 
-        notify_followed(
-            target_user_id=follow.aim_user.user_id,
-            follower_username=self.request.user.username,
-        )
+        # 端末がなければ通知もランキング判定も不要
+        tokens = active_tokens(follow.aim_user.user_id)
+        if not tokens:
+            return
+        with tracing.span("follow.notify"):
+            notify_followed(
+                target_user_id=follow.aim_user.user_id,
+                follower_username=self.request.user.username,
+                tokens=tokens,
+            )
         # Check follower ranking notification
-        check_and_notify_user_follower_ranking(follow.aim_user.user_id)
+        with tracing.span("follow.ranking_checks"):
+            check_and_notify_user_follower_ranking(follow.aim_user.user_id, tokens)
 
     def perform_destroy(self, instance):
         if instance.user != self.request.user and not self.request.user.is_staff:
@@ -51,7 +107,65 @@ class FollowViewSet(viewsets.ModelViewSet):
         follower_stats = getattr(instance.user, "stats", None)
         target_stats = getattr(instance.aim_user, "stats", None)
         instance.delete()
+        suggestions.mark_dirty(instance.user_id)
         if follower_stats:
             follower_stats.update_follow_counts(following_delta=-1)
         if target_stats:
             target_stats.update_follow_counts(followers_delta=-1)
+
+
+class FollowStatusView(APIView):
+    """Return which of ``?ids=`` the authenticated user follows and is followed by."""
+
+    permission_classes = [permissions.IsAuthenticated]
+
+    def get(self, request):
+        ids_param = (request.query_params.get("ids") or "").strip()
+        if not ids_param:
+            return Response({"following_ids": [], "follower_ids": []})
+        try:
+            user_ids = [int(uid) for uid in ids_param.split(",") if uid]
+        except ValueError:
+            raise ValidationError("無効なユーザーIDが含まれています。")
+        lookup = build_follow_lookup(
+            request.user, [CustomUser(pk=user_id) for user_id in user_ids]
+        )
+        return Response(
+            {
+                "following_ids": sorted(lookup["following_ids"]),
+                "follower_ids": sorted(lookup["follower_ids"]),
+            }
+        )
+
+
+class FollowSuggestionView(UserListContextMixin, ListAPIView):
+    """Stored "who to follow" candidates for the current user (popular users until computed)."""
+
+    serializer_class = CustomUserSerializer
+    permission_classes = [permissions.IsAuthenticated]
+    use_read_replica = True
+
+    def get_queryset(self):
+        user = self.request.user
+        # 保存後にフォローした相手は読み出し時に除く
+        return (
+            CustomUser.objects.select_related("stats")
+            .filter(suggested_to__user=user)
+            .exclude(followers__user=user)
+            .order_by("-suggested_to__score", "user_id")
+        )
+
+    def get_fallback_queryset(self):
+        user = self.request.user
+        return (
+            CustomUser.objects.select_related("stats")
+            .filter(is_active=True)
+            .exclude(pk=user.pk)
+            .exclude(followers__user=user)
+            .order_by("-stats__follower_count", "user_id")
+        )
+
+    def list(self, request, *args, **kwargs):
+        top_k = settings.SUGGESTIONS_TOP_K
+        users = list(self.get_queryset()[:top_k]) or list(self.get_fallback_queryset()[:top_k])
+        return Response(self.get_serializer(users, many=True).data)
@@ -1,18 +1,26 @@
 from django.db import transaction
 from django.db.models import F
+from django.utils import timezone
 from rest_framework import mixins, permissions, viewsets
 from rest_framework.exceptions import PermissionDenied, ValidationError
 from rest_framework.response import Response
+from rest_framework.settings import api_settings
 from rest_framework.views import APIView
 from rest_framework.generics import ListAPIView
-from rest_framework.pagination import PageNumberPagination
 
+from accounts.models import UserStats
 from post.models import Like, Post
 
-from ..serializers import LikeSerializer, PostSerializer
+from .. import tracing
+from ..idempotency import idempotent
+from ..pagination import KeysetCursorPagination, OptInKeysetCursorPagination
+from ..serializers import LikeSerializer, PostSerializer, build_rank_lookup, missing_object_error
+from ..services import inserts, like_rollups, object_cache, profile_cache, trending
+from .mixins import BatchSerializerContextMixin, PostListContextMixin
 
 
 class LikeViewSet(
+    BatchSerializerContextMixin,
     mixins.CreateModelMixin,
     mixins.DestroyModelMixin,
     mixins.ListModelMixin,
@@ -20,9 +28,15 @@ class LikeViewSet(
 ):
     serializer_class = LikeSerializer
     permission_classes = [permissions.IsAuthenticatedOrReadOnly]
+    pagination_class = OptInKeysetCursorPagination
+    throttle_scopes = {"create": "like", "destroy": "unlike"}
+    read_replica_actions = ("list",)
 
     def get_queryset(self):
-        queryset = Like.objects.select_related("user", "post", "post__user")
+        # 論理削除した投稿のいいねは purge まで残るので、ここで除く
+        queryset = Like.objects.select_related("user__stats", "post__user__stats").filter(
+            post__deleted_at__isnull=True
+        )
         user_id = self.request.query_params.get("user_id")
         post_id = self.request.query_params.get("post_id")
         if user_id:
@@ -31,47 +45,104 @@ class LikeViewSet(
             queryset = queryset.filter(post_id=post_id)
         return queryset
 
+    def get_pagination_ordering(self):
+        params = self.request.query_params
+        if params.get("user_id") or params.get("post_id"):
+            # like_user_created_idx / like_post_created_idx
+            return ("-created_at", "-id")
+        return ("-id",)
+
+    def get_context_posts(self, objects):
+        return [like.post for like in objects]
+
+    def get_context_users(self, objects):
+        return [like.user for like in objects] + [like.post.user for like in objects]
+
+    @idempotent
+    def create(self, request, *args, **kwargs):
+        return super().create(request, *args, **kwargs)
+
     def perform_create(self, serializer):
         if not self.request.user.is_authenticated:
             raise PermissionDenied("ログインしてください。")
-        with transaction.atomic():
-            like = serializer.save(user=self.request.user)
-            Post.objects.filter(pk=like.post_id).update(like_count=F("like_count") + 1)
-            author_stats = getattr(like.post.user, "stats", None)
-            if author_stats:
-                author_stats.register_like_received(value=1)
-            liker_stats = getattr(self.request.user, "stats", None)
-            if liker_stats:
-                liker_stats.register_like_given(value=1)
+        post_id = serializer.validated_data["post_id"]
+        post = Post.objects.select_related("user__stats").filter(pk=post_id).first()
+        if post is None:
+            raise missing_object_error("post_id", post_id)
+        with tracing.span("like.transaction"), transaction.atomic():
+            created_at = timezone.now()
+            like_id = inserts.insert_ignore(
+                Like,
+                user_id=self.request.user.pk,
+                post_id=post.pk,
+                created_at=created_at,
+                post_time=post.time,
+            )
+            if like_id is None:
+                # 同時に届いた重複リクエストもここに来る（副作用は実行しない）
+                raise ValidationError({api_settings.NON_FIELD_ERRORS_KEY: ["既にいいね済みです。"]})
+            like = Like(
+                id=like_id,
+                user=self.request.user,
+                post=post,
+                created_at=created_at,
+                post_time=post.time,
+            )
+            serializer.instance = like
+            serializer.context["liked_post_ids"] = {post.pk}
+            Post.objects.filter(pk=like.post_id).update(
+                like_count=F("like_count") + 1, **trending.on_like()
+            )
+            # 応答に更新後の件数を返す
+            post.like_count += 1
+            like_rollups.record_like(like.post, like.created_at)
+            object_cache.invalidate_after_write(Post, like.post_id)
+            with tracing.span("like.stats"):
+                author_stats = getattr(post.user, "stats", None)
+                liker_stats = getattr(self.request.user, "stats", None)
+                UserStats.register_like(author_stats, liker_stats)
+                for user_id in {post.user_id, self.request.user.pk}:
+                    profile_cache.bump_after_write(user_id)
+        serializer.context["rank_by_total_likes"] = build_rank_lookup([self.request.user, post.user])
 
         # Send push notification (outside transaction)
         post_author = like.post.user
         if post_author.user_id != self.request.user.user_id:
             from ..services.notifications import (
+                active_tokens,
                 check_and_notify_post_ranking,
                 check_and_notify_user_likes_ranking,
                 notify_liked,
             )
 
-            notify_liked(
-                post_author_id=post_author.user_id,
-                liker_username=self.request.user.username,
-                post_context=like.post.context or "",
-            )
+            # 端末がなければ通知もランキング判定も不要
+            tokens = active_tokens(post_author.user_id)
+            if not tokens:
+                return
+            with tracing.span("like.notify"):
+                notify_liked(
+                    post_author_id=post_author.user_id,
+                    liker_username=self.request.user.username,
+                    post_context=like.post.context or "",
+                    tokens=tokens,
+                )
             # Check ranking notifications
-            check_and_notify_post_ranking(like.post.post_id, post_author.user_id)
-            check_and_notify_user_likes_ranking(post_author.user_id)
+            with tracing.span("like.ranking_checks"):
+                check_and_notify_post_ranking(like.post.post_id, post_author.user_id, tokens)
+                check_and_notify_user_likes_ranking(post_author.user_id, tokens)
 
     def perform_destroy(self, instance):
         user = self.request.user
         if instance.user != user and not user.is_staff:
             raise PermissionDenied("自分のいいねのみ解除できます。")
-        with transaction.atomic():
+        with tracing.span("like.destroy"), transaction.atomic():
             post = instance.post
             instance.delete()
             Post.objects.filter(pk=post.pk, like_count__gt=0).update(
-                like_count=F("like_count") - 1
+                like_count=F("like_count") - 1, **trending.on_unlike(instance.created_at)
             )
+            like_rollups.record_unlike(post, instance.created_at)
+            object_cache.invalidate_after_write(Post, post.pk)
             author_stats = getattr(post.user, "stats", None)
             if author_stats and author_stats.total_likes_received > 0:
                 author_stats.total_likes_received -= 1
@@ -82,45 +153,25 @@ class LikeViewSet(
                 liker_stats.save(update_fields=["total_likes_given"])
 
 
-class LikedPostsPagination(PageNumberPagination):
-    page_size = 20
-    page_size_query_param = "page_size"
-    max_page_size = 100
-
-
-class LikedPostsView(ListAPIView):
-    """List posts liked by a specific user."""
+class LikedPostsView(PostListContextMixin, ListAPIView):
+    """List posts liked by a specific user, most recently liked first."""
 
     serializer_class = PostSerializer
     permission_classes = [permissions.AllowAny]
-    pagination_class = LikedPostsPagination
-    _page_post_ids = None
+    pagination_class = KeysetCursorPagination
+    use_read_replica = True
 
     def get_queryset(self):
-        user_id = self.kwargs["user_id"]
-        return (
-            Post.objects.select_related("user")
-            .filter(likes__user_id=user_id)
-            .order_by("-likes__created_at", "-time")
+        # like を (user_id, created_at, id) の索引でページングし、投稿は JOIN で取得する
+        return Like.objects.select_related("post__user__stats").filter(
+            user_id=self.kwargs["user_id"], post__deleted_at__isnull=True
         )
 
     def paginate_queryset(self, queryset):
-        page = super().paginate_queryset(queryset)
-        if page is not None:
-            self._page_post_ids = [post.post_id for post in page]
-        return page
-
-    def get_serializer_context(self):
-        context = super().get_serializer_context()
-        user = self.request.user
-        if getattr(user, "is_authenticated", False) and self._page_post_ids:
-            liked_ids = set(
-                Like.objects.filter(user=user, post_id__in=self._page_post_ids).values_list(
-                    "post_id", flat=True
-                )
-            )
-            context["liked_post_ids"] = liked_ids
-        return context
+        likes = super().paginate_queryset(queryset)
+        if likes is None:
+            return None
+        return [like.post for like in likes]
 
 
 class PostLikedStatusView(APIView):
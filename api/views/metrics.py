@@ -0,0 +1,15 @@
+from django.conf import settings
+from django.http import HttpResponse
+
+from .. import metrics
+
+
+def metrics_view(request):
+    """Prometheus text exposition of ``api.metrics`` (optionally bearer-token protected)."""
+    token = getattr(settings, "METRICS_TOKEN", None)
+    if token and request.headers.get("Authorization") != f"Bearer {token}":
+        return HttpResponse(status=401)
+    return HttpResponse(
+        metrics.render(metrics.collect()),
+        content_type="text/plain; version=0.0.4; charset=utf-8",
+    )
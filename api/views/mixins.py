@@ -0,0 +1,178 @@
+import inspect
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from rest_framework.decorators import action
+from rest_framework.exceptions import ValidationError
+from rest_framework.response import Response
+
+from post.models import Like
+
+from ..services import object_cache, profile_cache
+from ..serializers import (
+    abuild_follow_lookup,
+    abuild_rank_lookup,
+    build_follow_lookup,
+    build_rank_lookup,
+)
+
+
+class BatchSerializerContextMixin:
+    """
+    Precompute per-row serializer values for a whole page in batched queries.
+
+    ``PostSerializer.get_is_liked``, ``CustomUserSerializer.get_rank`` and the
+    follow flags fall back to one query per object; list views fill
+    ``liked_post_ids``, ``rank_by_total_likes`` and ``following_ids`` /
+    ``follower_ids`` once per page instead.
+    """
+
+    def get_context_posts(self, objects):
+        return []
+
+    def get_context_users(self, objects):
+        return []
+
+    def get_serializer(self, *args, **kwargs):
+        if kwargs.get("many") and args:
+            objects = list(args[0])
+            context = self.get_serializer_context()
+            context.update(self.get_batch_context(objects))
+            kwargs["context"] = context
+            args = (objects, *args[1:])
+        return super().get_serializer(*args, **kwargs)
+
+    def get_batch_context(self, objects):
+        context = {}
+        user = self.request.user
+        posts = self.get_context_posts(objects)
+        if posts and getattr(user, "is_authenticated", False):
+            context["liked_post_ids"] = set(
+                Like.objects.filter(
+                    user=user, post_id__in=[post.post_id for post in posts]
+                ).values_list("post_id", flat=True)
+            )
+        users = self.get_context_users(objects)
+        if users:
+            context["rank_by_total_likes"] = build_rank_lookup(users)
+            context["profile_payloads"] = profile_cache.get_many([u.pk for u in users])
+            if getattr(user, "is_authenticated", False):
+                context.update(build_follow_lookup(user, users))
+        return context
+
+    async def aget_batch_context(self, objects):
+        """Async ORM version of ``get_batch_context`` for ``AsyncListMixin``."""
+        context = {}
+        user = self.request.user
+        posts = self.get_context_posts(objects)
+        if posts and getattr(user, "is_authenticated", False):
+            context["liked_post_ids"] = {
+                post_id
+                async for post_id in Like.objects.filter(
+                    user=user, post_id__in=[post.post_id for post in posts]
+                ).values_list("post_id", flat=True)
+            }
+        users = self.get_context_users(objects)
+        if users:
+            context["rank_by_total_likes"] = await abuild_rank_lookup(users)
+            context["profile_payloads"] = await sync_to_async(profile_cache.get_many)(
+                [u.pk for u in users]
+            )
+            if getattr(user, "is_authenticated", False):
+                context.update(await abuild_follow_lookup(user, users))
+        return context
+
+
+class PostListContextMixin(BatchSerializerContextMixin):
+    """Batch context for views listing ``Post`` objects."""
+
+    def get_context_posts(self, objects):
+        return objects
+
+    def get_context_users(self, objects):
+        return [post.user for post in objects]
+
+
+class UserListContextMixin(BatchSerializerContextMixin):
+    """Batch context for views listing ``CustomUser`` objects."""
+
+    def get_context_users(self, objects):
+        return objects
+
+
+class MultiGetMixin:
+    """
+    ``GET <prefix>/batch/?ids=1,2,3`` on a ``BatchSerializerContextMixin`` viewset.
+
+    Objects come from ``object_cache`` (one query for the cache misses), in the
+    requested order; IDs that do not exist are listed in ``missing_ids``.
+    """
+
+    def get_multi_get_queryset(self):
+        return self.get_queryset()
+
+    @action(detail=False, methods=["get"], url_path="batch")
+    def batch(self, request, *args, **kwargs):
+        ids_param = (request.query_params.get("ids") or "").strip()
+        try:
+            ids = list(dict.fromkeys(int(pk) for pk in ids_param.split(",") if pk))
+        except ValueError:
+            raise ValidationError("無効なIDが含まれています。")
+        max_ids = settings.MULTI_GET_MAX_IDS
+        if len(ids) > max_ids:
+            raise ValidationError(f"ids は {max_ids} 件までです。")
+        found = object_cache.get_many(self.get_multi_get_queryset(), ids) if ids else {}
+        objects = [found[pk] for pk in ids if pk in found]
+        serializer = self.get_serializer(objects, many=True)
+        return Response(
+            {"results": serializer.data, "missing_ids": [pk for pk in ids if pk not in found]}
+        )
+
+
+class AsyncListMixin:
+    """
+    Serve a ``ListAPIView`` as a coroutine so it runs natively under ASGI.
+
+    DRF's authentication, permission and pagination hooks are synchronous, so
+    ``initial()`` and the page fetch go through ``sync_to_async``; the per-page
+    batch context uses the async ORM. Serializers must not touch the database,
+    which ``BatchSerializerContextMixin`` already guarantees for list views.
+    """
+
+    async def dispatch(self, request, *args, **kwargs):
+        self.args = args
+        self.kwargs = kwargs
+        request = self.initialize_request(request, *args, **kwargs)
+        self.request = request
+        self.headers = self.default_response_headers
+
+        try:
+            await sync_to_async(self.initial)(request, *args, **kwargs)
+            if request.method.lower() in self.http_method_names:
+                handler = getattr(self, request.method.lower(), self.http_method_not_allowed)
+            else:
+                handler = self.http_method_not_allowed
+            response = handler(request, *args, **kwargs)
+            if inspect.isawaitable(response):
+                response = await response
+        except Exception as exc:
+            response = self.handle_exception(exc)
+
+        self.response = self.finalize_response(request, response, *args, **kwargs)
+        return self.response
+
+    async def get(self, request, *args, **kwargs):
+        queryset = self.filter_queryset(self.get_queryset())
+        page = None
+        if self.paginator is not None:
+            page = await sync_to_async(self.paginator.paginate_queryset)(
+                queryset, request, view=self
+            )
+        objects = page if page is not None else [obj async for obj in queryset]
+
+        context = self.get_serializer_context()
+        context.update(await self.aget_batch_context(objects))
+        data = self.get_serializer_class()(objects, many=True, context=context).data
+        if page is not None:
+            return self.get_paginated_response(data)
+        return Response(data)
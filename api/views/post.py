@@ -3,25 +3,73 @@ from rest_framework.exceptions import PermissionDenied
 
 from post.models import Post
 
+from .. import tracing
+from ..idempotency import idempotent
+from ..pagination import PostCursorPagination
 from ..serializers import PostSerializer
+from ..services import author_feed, deletion, object_cache, partitioning
+from .mixins import MultiGetMixin, PostListContextMixin
 
 
-class PostViewSet(viewsets.ModelViewSet):
+class PostViewSet(MultiGetMixin, PostListContextMixin, viewsets.ModelViewSet):
     serializer_class = PostSerializer
     permission_classes = [permissions.IsAuthenticatedOrReadOnly]
+    pagination_class = PostCursorPagination
+    read_replica_actions = ("list", "batch")
 
     def get_queryset(self):
-        queryset = Post.objects.select_related("user").all()
+        queryset = Post.objects.select_related("user__stats").all()
         user_id = self.request.query_params.get("user_id")
         if user_id:
-            queryset = queryset.filter(user_id=user_id)
+            # post_user_time_idx の順
+            queryset = queryset.filter(user_id=user_id).order_by(*author_feed.ORDERING)
         return queryset
 
+    def get_pagination_ordering(self):
+        if self.request.query_params.get("user_id"):
+            return author_feed.ORDERING
+        # 絞り込みなしは最新タイムラインと同じ索引の順
+        return partitioning.latest_ordering()
+
+    def list(self, request, *args, **kwargs):
+        page = self.cached_author_page()
+        if page is not None:
+            serializer = self.get_serializer(page, many=True)
+            return self.get_paginated_response(serializer.data)
+        return super().list(request, *args, **kwargs)
+
+    def cached_author_page(self):
+        """First page of a profile feed from ``author_feed`` and ``object_cache`` (``None`` to use the DB)."""
+        params = self.request.query_params
+        paginator = self.paginator
+        if not paginator.is_requested(self.request) or paginator.cursor_query_param in params:
+            return None
+        try:
+            author_id = int(params.get("user_id", ""))
+        except ValueError:
+            return None
+        ids = author_feed.recent_ids(author_id, paginator.get_page_size(self.request) + 1)
+        if ids is None:
+            return None
+        posts = object_cache.get_many(self.get_multi_get_queryset(), ids)
+        if len(posts) < len(ids):
+            # 削除直後などでキャッシュが古い
+            return None
+        return paginator.paginate_first_page([posts[pk] for pk in ids], self.request, self)
+
+    def get_multi_get_queryset(self):
+        return Post.objects.select_related("user__stats")
+
+    @idempotent
+    def create(self, request, *args, **kwargs):
+        return super().create(request, *args, **kwargs)
+
     def perform_create(self, serializer):
         post = serializer.save(user=self.request.user)
         stats = getattr(self.request.user, "stats", None)
         if stats:
-            stats.register_post_created()
+            with tracing.span("post.stats"):
+                stats.register_post_created()
 
     def perform_update(self, serializer):
         instance = self.get_object()
@@ -32,4 +80,5 @@ class PostViewSet(viewsets.ModelViewSet):
     def perform_destroy(self, instance):
         if instance.user != self.request.user and not self.request.user.is_staff:
             raise PermissionDenied("自分の投稿のみ削除できます。")
-        instance.delete()
+        # いいねの削除とカウンタの補正は purge_deleted コマンドが後から行う
+        deletion.soft_delete_post(instance)
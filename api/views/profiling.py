@@ -0,0 +1,29 @@
+from django.http import Http404, HttpResponse
+from rest_framework import permissions
+from rest_framework.response import Response
+from rest_framework.views import APIView
+
+from ..profiling import list_profiles, profile_path
+
+
+class ProfileListView(APIView):
+    """List endpoints with stored collapsed-stack profiles (staff only)."""
+
+    permission_classes = [permissions.IsAdminUser]
+
+    def get(self, request):
+        return Response({"profiles": list_profiles()})
+
+
+class ProfileDownloadView(APIView):
+    """Download one endpoint's profile in collapsed-stack format (staff only)."""
+
+    permission_classes = [permissions.IsAdminUser]
+
+    def get(self, request, endpoint):
+        path = profile_path(endpoint)
+        if not path.exists():
+            raise Http404("Profile not found")
+        response = HttpResponse(path.read_text(), content_type="text/plain; charset=utf-8")
+        response["Content-Disposition"] = f'attachment; filename="{path.name}"'
+        return response
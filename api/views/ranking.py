@@ -1,25 +1,29 @@
-from datetime import timedelta
-
 from django.db.models import F, Window
 from django.db.models.functions import Rank
-from django.utils import timezone
 from rest_framework import permissions
 from rest_framework.generics import ListAPIView
 from rest_framework.pagination import CursorPagination, PageNumberPagination
 
 from accounts.models import CustomUser
-from post.models import Like, Post
+from post.models import Post
 
 from ..serializers import CustomUserSerializer, PostSerializer
+from ..services import like_rollups
+from .mixins import AsyncListMixin, PostListContextMixin, UserListContextMixin
 
 
 class RankingCursorPagination(CursorPagination):
-    """Cursor-based pagination for post rankings."""
+    """Cursor-based pagination for post rankings (all-time, or likes within ?range=24h|7d|30d)."""
 
     page_size = 20
     ordering = ("-like_count", "-post_id")
     cursor_query_param = "cursor"
 
+    def get_ordering(self, request, queryset, view):
+        if like_rollups.parse_range(request.query_params.get("range")):
+            return ("-window_likes", "-post_id")
+        return self.ordering
+
 
 class UserRankingPagination(PageNumberPagination):
     """Page-based pagination for user rankings (Window関数との互換性のため)."""
@@ -29,50 +33,42 @@ class UserRankingPagination(PageNumberPagination):
     max_page_size = 100
 
 
-class PostLikeRankingView(ListAPIView):
-    """Top posts by like_count. Optional ?range=24h"""
+class PostLikeRankingView(PostListContextMixin, ListAPIView):
+    """Top posts by like_count. ?range=24h|7d|30d ranks by likes received within the window."""
 
     serializer_class = PostSerializer
     permission_classes = [permissions.AllowAny]
+    use_read_replica = True
     pagination_class = RankingCursorPagination
-    _page_post_ids = None
 
     def get_queryset(self):
-        qs = Post.objects.select_related("user")
-        range_param = (self.request.query_params.get("range") or "").lower()
-        if range_param == "24h":
-            window = timezone.now() - timedelta(hours=24)
-            qs = qs.filter(time__gte=window)
+        qs = Post.objects.select_related("user__stats")
+        range_key = like_rollups.parse_range(self.request.query_params.get("range"))
+        if range_key:
+            return like_rollups.post_ranking(qs, range_key)
         return qs.order_by("-like_count", "-post_id")
 
-    def paginate_queryset(self, queryset):
-        page = super().paginate_queryset(queryset)
-        if page is not None:
-            self._page_post_ids = [post.post_id for post in page]
-        return page
-
-    def get_serializer_context(self):
-        context = super().get_serializer_context()
-        user = self.request.user
-        if getattr(user, "is_authenticated", False) and self._page_post_ids:
-            liked_ids = set(
-                Like.objects.filter(user=user, post_id__in=self._page_post_ids).values_list(
-                    "post_id", flat=True
-                )
-            )
-            context["liked_post_ids"] = liked_ids
-        return context
 
+class UserTotalLikesRankingView(UserListContextMixin, ListAPIView):
+    """Users by likes received. ?range=24h|7d|30d counts only likes within the window."""
 
-class UserTotalLikesRankingView(ListAPIView):
     serializer_class = CustomUserSerializer
     permission_classes = [permissions.AllowAny]
+    use_read_replica = True
     pagination_class = UserRankingPagination
 
     def get_queryset(self):
+        qs = CustomUser.objects.select_related("stats")
+        range_key = like_rollups.parse_range(self.request.query_params.get("range"))
+        if range_key:
+            return like_rollups.author_ranking(qs, range_key).annotate(
+                like_rank=Window(
+                    expression=Rank(),
+                    order_by=[F("window_likes").desc(), F("date_joined").asc()],
+                )
+            )
         return (
-            CustomUser.objects.select_related("stats")
-            .annotate(
+            qs.annotate(
                 like_rank=Window(
                     expression=Rank(),
                     order_by=[
@@ -85,9 +81,10 @@ class UserTotalLikesRankingView(ListAPIView):
         )
 
 
-class UserLevelRankingView(ListAPIView):
+class UserLevelRankingView(UserListContextMixin, ListAPIView):
     serializer_class = CustomUserSerializer
     permission_classes = [permissions.AllowAny]
+    use_read_replica = True
     pagination_class = UserRankingPagination
 
     def get_queryset(self):
@@ -96,9 +93,10 @@ class UserLevelRankingView(ListAPIView):
         )
 
 
-class UserFollowerRankingView(ListAPIView):
+class UserFollowerRankingView(UserListContextMixin, ListAPIView):
     serializer_class = CustomUserSerializer
     permission_classes = [permissions.AllowAny]
+    use_read_replica = True
     pagination_class = UserRankingPagination
 
     def get_queryset(self):
@@ -106,3 +104,19 @@ class UserFollowerRankingView(ListAPIView):
             CustomUser.objects.select_related("stats")
             .order_by("-stats__follower_count", "-date_joined")
         )
+
+
+class AsyncPostLikeRankingView(AsyncListMixin, PostLikeRankingView):
+    pass
+
+
+class AsyncUserTotalLikesRankingView(AsyncListMixin, UserTotalLikesRankingView):
+    pass
+
+
+class AsyncUserLevelRankingView(AsyncListMixin, UserLevelRankingView):
+    pass
+
+
+class AsyncUserFollowerRankingView(AsyncListMixin, UserFollowerRankingView):
+    pass
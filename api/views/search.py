@@ -6,6 +6,7 @@ from accounts.models import CustomUser
 from post.models import Post
 
 from ..serializers import CustomUserSerializer, PostSerializer
+from .mixins import AsyncListMixin, PostListContextMixin, UserListContextMixin
 
 
 class SearchPagination(PageNumberPagination):
@@ -14,9 +15,10 @@ class SearchPagination(PageNumberPagination):
     max_page_size = 100
 
 
-class UserSearchView(ListAPIView):
+class UserSearchView(UserListContextMixin, ListAPIView):
     serializer_class = CustomUserSerializer
     pagination_class = SearchPagination
+    use_read_replica = True
 
     def get_queryset(self):
         query = (self.request.query_params.get("q") or "").strip()
@@ -29,16 +31,25 @@ class UserSearchView(ListAPIView):
         )
 
 
-class PostSearchView(ListAPIView):
+class PostSearchView(PostListContextMixin, ListAPIView):
     serializer_class = PostSerializer
     pagination_class = SearchPagination
+    use_read_replica = True
 
     def get_queryset(self):
         query = (self.request.query_params.get("q") or "").strip()
         if not query:
             return Post.objects.none()
         return (
-            Post.objects.select_related("user")
+            Post.objects.select_related("user__stats")
             .filter(context__icontains=query)
             .order_by("-like_count", "-time")
         )
+
+
+class AsyncUserSearchView(AsyncListMixin, UserSearchView):
+    pass
+
+
+class AsyncPostSearchView(AsyncListMixin, PostSearchView):
+    pass
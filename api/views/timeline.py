@@ -1,15 +1,19 @@
-from datetime import timedelta
+from base64 import b64decode, b64encode
+from urllib import parse
 
 from django.db.models import Subquery
-from django.utils import timezone
 from rest_framework import permissions
 from rest_framework.generics import ListAPIView
-from rest_framework.pagination import CursorPagination
+from rest_framework.pagination import Cursor, CursorPagination
+from rest_framework.utils.urls import replace_query_param
 
 from follow.models import Follow
-from post.models import Like, Post
+from post.models import Post
 
 from ..serializers import PostSerializer
+from ..services.partitioning import latest_ordering
+from ..services.trending import TRENDING_ORDERING, trending_posts
+from .mixins import AsyncListMixin, PostListContextMixin
 
 
 class TimelineCursorPagination(CursorPagination):
@@ -19,21 +23,68 @@ class TimelineCursorPagination(CursorPagination):
     ordering = "-post_id"  # 一意のフィールドでソート（timeより高速）
     cursor_query_param = "cursor"
 
+    def get_ordering(self, request, queryset, view):
+        return latest_ordering()
+
 
 class PopularCursorPagination(CursorPagination):
-    """Cursor pagination for popular tab (like_count, then post_id)."""
+    """
+    Cursor pagination for popular tab over ``post_trending_idx``.
+
+    ``decay_trending_scores`` は全投稿のスコアに同じ減衰率を掛けるので順位は変わらないが、
+    カーソルに入れたスコアの値は古くなる。そこでカーソルには位置の投稿 ID（``a``）も入れ、
+    次のページではその投稿の現在のスコアを位置として使う（減衰をまたいでも重複・欠落しない）。
+    """
 
     page_size = 20
-    ordering = ("-like_count", "-post_id")
+    ordering = TRENDING_ORDERING
     cursor_query_param = "cursor"
 
-
-class TimelineView(ListAPIView):
+    def decode_cursor(self, request):
+        # 位置の文字列 -> その値を持つ投稿 ID（同じスコアの投稿は同じように減衰する）
+        self._anchors = {}
+        cursor = super().decode_cursor(request)
+        if cursor is None or cursor.position is None:
+            return cursor
+        tokens = parse.parse_qs(
+            b64decode(request.query_params[self.cursor_query_param].encode("ascii")).decode("ascii")
+        )
+        anchor = tokens.get("a", [None])[0]
+        score = None
+        if anchor and anchor.isdigit():
+            # 論理削除された投稿もスコアは残る
+            score = Post.all_objects.filter(pk=anchor).values_list("trending_score", flat=True).first()
+        if score is None:
+            return cursor
+        position = str(score)
+        self._anchors[position] = int(anchor)
+        return Cursor(offset=cursor.offset, reverse=cursor.reverse, position=position)
+
+    def encode_cursor(self, cursor):
+        tokens = {}
+        if cursor.offset != 0:
+            tokens["o"] = str(cursor.offset)
+        if cursor.reverse:
+            tokens["r"] = "1"
+        if cursor.position is not None:
+            tokens["p"] = cursor.position
+            if cursor.position in self._anchors:
+                tokens["a"] = str(self._anchors[cursor.position])
+        encoded = b64encode(parse.urlencode(tokens, doseq=True).encode("ascii")).decode("ascii")
+        return replace_query_param(self.base_url, self.cursor_query_param, encoded)
+
+    def _get_position_from_instance(self, instance, ordering):
+        position = super()._get_position_from_instance(instance, ordering)
+        self._anchors.setdefault(position, instance.pk)
+        return position
+
+
+class TimelineView(PostListContextMixin, ListAPIView):
     """Provide latest/popular/following timeline feeds."""
 
     serializer_class = PostSerializer
     permission_classes = [permissions.IsAuthenticatedOrReadOnly]
-    _page_post_ids = None
+    use_read_replica = True
 
     def get_pagination_class(self):
         tab = self.request.query_params.get("tab", "latest")
@@ -47,34 +98,21 @@ class TimelineView(ListAPIView):
 
     def get_queryset(self):
         tab = self.request.query_params.get("tab", "latest")
-        base_qs = Post.objects.select_related("user")
+        base_qs = Post.objects.select_related("user__stats")
         if tab == "popular":
-            window = timezone.now() - timedelta(hours=24)
-            return base_qs.filter(time__gte=window).order_by("-like_count", "-post_id")
+            return trending_posts(base_qs)
         if tab == "following":
             user = self.request.user
             if not user.is_authenticated:
                 return Post.objects.none()
             # サブクエリを使用してDB内で処理（メモリ効率向上）
             following_subquery = Follow.objects.filter(user=user).values("aim_user_id")
-            return base_qs.filter(user_id__in=Subquery(following_subquery)).order_by("-post_id")
-        # default latest
-        return base_qs.order_by("-post_id")
-
-    def paginate_queryset(self, queryset):
-        page = super().paginate_queryset(queryset)
-        if page is not None:
-            self._page_post_ids = [post.post_id for post in page]
-        return page
-
-    def get_serializer_context(self):
-        context = super().get_serializer_context()
-        user = self.request.user
-        if getattr(user, "is_authenticated", False) and self._page_post_ids:
-            liked_ids = set(
-                Like.objects.filter(user=user, post_id__in=self._page_post_ids).values_list(
-                    "post_id", flat=True
-                )
+            return base_qs.filter(user_id__in=Subquery(following_subquery)).order_by(
+                *latest_ordering()
             )
-            context["liked_post_ids"] = liked_ids
-        return context
+        # default latest
+        return base_qs.order_by(*latest_ordering())
+
+
+class AsyncTimelineView(AsyncListMixin, TimelineView):
+    """``TimelineView`` served as a coroutine (selected when ``ASYNC_VIEWS`` is on)."""
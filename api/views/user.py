@@ -1,5 +1,5 @@
-from django.db.models import F, Window
-from django.db.models.functions import DenseRank
+from django.db.models import F
+from django.http import Http404
 from rest_framework import permissions, viewsets
 from rest_framework.decorators import action
 from rest_framework.exceptions import PermissionDenied
@@ -7,22 +7,25 @@ from rest_framework.response import Response
 
 from accounts.models import CustomUser
 
+from ..pagination import UserCursorPagination
 from ..serializers import CustomUserSerializer
+from ..services import deletion, profile_cache
+from .mixins import MultiGetMixin, UserListContextMixin
 
 
-class CustomUserViewSet(viewsets.ModelViewSet):
+class CustomUserViewSet(MultiGetMixin, UserListContextMixin, viewsets.ModelViewSet):
     serializer_class = CustomUserSerializer
+    pagination_class = UserCursorPagination
+    read_replica_actions = ("list", "batch")
 
     def get_queryset(self):
-        base_qs = CustomUser.objects.select_related("stats")
-        return base_qs.annotate(
-            like_rank=Window(
-                expression=DenseRank(),
-                order_by=[
-                    F("stats__total_likes_received").desc(nulls_last=True),
-                ],
-            )
-        ).order_by("-stats__total_likes_received", "-date_joined")
+        # 順位はページ単位の rank_by_total_likes で求める（全件の DenseRank は使わない）
+        return CustomUser.objects.select_related("stats").annotate(
+            total_likes=F("stats__total_likes_received")
+        )
+
+    def get_multi_get_queryset(self):
+        return CustomUser.objects.select_related("stats")
 
     def get_permissions(self):
         if self.action == "create":
@@ -44,7 +47,26 @@ class CustomUserViewSet(viewsets.ModelViewSet):
         user = self.request.user
         if user != instance and not user.is_staff:
             raise PermissionDenied("自分のアカウントのみ削除できます。")
-        instance.delete()
+        # 投稿・いいね・フォローの削除とカウンタの補正は purge_deleted コマンドが後から行う
+        deletion.soft_delete_user(instance)
+
+    def retrieve(self, request, *args, **kwargs):
+        # DB より先にプロフィールキャッシュを見る（ミスした時だけ get_object() で読む）
+        try:
+            pk = int(kwargs[self.lookup_url_kwarg or self.lookup_field])
+        except ValueError:
+            raise Http404
+        loaded = []
+
+        def load():
+            loaded.append(self.get_object())
+            return self.get_serializer(loaded[0]).build_profile(loaded[0])
+
+        payload = profile_cache.get_or_build(pk, load)
+        # キャッシュヒット時は閲覧者ごとの項目（フォロー状態）に ID だけを使う
+        user = loaded[0] if loaded else CustomUser(pk=pk)
+        context = {**self.get_serializer_context(), "profile_payloads": {pk: (None, payload)}}
+        return Response(self.get_serializer(user, context=context).data)
 
     @action(detail=False, methods=["get"], url_path="me")
     def me(self, request, *args, **kwargs):
@@ -0,0 +1,23 @@
+# Generated by Django 5.2.18 on 2026-10-19 15:01
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('follow', '0001_initial'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='follow',
+            index=models.Index(fields=['user', '-time', '-id'], name='follow_user_time_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='follow',
+            index=models.Index(fields=['aim_user', '-time', '-id'], name='follow_aim_user_time_idx'),
+        ),
+    ]
@@ -14,3 +14,46 @@ class Follow(models.Model):
     class Meta:
         db_table = "follow"
         unique_together = ("user", "aim_user")
+        indexes = [
+            # フォロー中 / フォロワー一覧のキーセットページング用
+            models.Index(fields=["user", "-time", "-id"], name="follow_user_time_idx"),
+            models.Index(fields=["aim_user", "-time", "-id"], name="follow_aim_user_time_idx"),
+        ]
+
+
+class FollowSuggestion(models.Model):
+    """Precomputed "who to follow" candidate (top-K per user, see api.services.suggestions)."""
+
+    user = models.ForeignKey(
+        settings.AUTH_USER_MODEL, related_name="follow_suggestions", on_delete=models.CASCADE
+    )
+    suggested = models.ForeignKey(
+        settings.AUTH_USER_MODEL, related_name="suggested_to", on_delete=models.CASCADE
+    )
+    score = models.FloatField()
+    # フォロー中のユーザのうち suggested をフォローしている人数
+    mutual_count = models.PositiveIntegerField(default=0)
+
+    class Meta:
+        db_table = "follow_suggestion"
+        constraints = [
+            models.UniqueConstraint(fields=["user", "suggested"], name="follow_suggestion_uniq"),
+        ]
+        indexes = [
+            models.Index(fields=["user", "-score"], name="follow_suggestion_score_idx"),
+        ]
+
+
+class FollowSuggestionQueue(models.Model):
+    """Users whose follow edges changed since the last suggestion refresh."""
+
+    user = models.OneToOneField(
+        settings.AUTH_USER_MODEL,
+        primary_key=True,
+        related_name="+",
+        on_delete=models.CASCADE,
+    )
+    queued_at = models.DateTimeField()
+
+    class Meta:
+        db_table = "follow_suggestion_queue"
@@ -0,0 +1,43 @@
+# Generated by Django 5.2.18 on 2026-10-19 14:54
+
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import migrations, models
+from django.utils import timezone
+
+
+def backfill_trending_score(apps, schema_editor):
+    """Seed scores from likes given within the last ten half-lives."""
+    Like = apps.get_model("post", "Like")
+    Post = apps.get_model("post", "Post")
+    half_life = getattr(settings, "TRENDING_HALF_LIFE_HOURS", 6) * 3600
+    now = timezone.now()
+    scores = {}
+    recent = Like.objects.filter(created_at__gte=now - timedelta(seconds=half_life * 10))
+    for post_id, created_at in recent.values_list("post_id", "created_at").iterator():
+        age = max((now - created_at).total_seconds(), 0)
+        scores[post_id] = scores.get(post_id, 0.0) + 2 ** (-age / half_life)
+    for post_id, score in scores.items():
+        Post.objects.filter(pk=post_id).update(trending_score=score)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('post', '0005_like_like_user_post_idx_post_post_latest_idx_and_more'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='post',
+            name='trending_score',
+            field=models.FloatField(default=0),
+        ),
+        migrations.RunPython(backfill_trending_score, migrations.RunPython.noop),
+        migrations.AddIndex(
+            model_name='post',
+            index=models.Index(fields=['-trending_score', '-post_id'], name='post_trending_idx'),
+        ),
+    ]
@@ -0,0 +1,46 @@
+# Generated by Django 5.2.18 on 2026-10-19 14:55
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('post', '0006_post_trending_score'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='AuthorLikeBucket',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('granularity', models.CharField(choices=[('h', 'Hourly'), ('d', 'Daily')], default='h', max_length=1)),
+                ('bucket_start', models.DateTimeField()),
+                ('count', models.IntegerField(default=0)),
+                ('author', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='like_buckets', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'db_table': 'author_like_bucket',
+                'indexes': [models.Index(fields=['bucket_start', 'author'], name='author_like_bucket_start_idx')],
+                'constraints': [models.UniqueConstraint(fields=('author', 'granularity', 'bucket_start'), name='author_like_bucket_uniq')],
+            },
+        ),
+        migrations.CreateModel(
+            name='PostLikeBucket',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('granularity', models.CharField(choices=[('h', 'Hourly'), ('d', 'Daily')], default='h', max_length=1)),
+                ('bucket_start', models.DateTimeField()),
+                ('count', models.IntegerField(default=0)),
+                ('post', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='like_buckets', to='post.post')),
+            ],
+            options={
+                'db_table': 'post_like_bucket',
+                'indexes': [models.Index(fields=['bucket_start', 'post'], name='post_like_bucket_start_idx')],
+                'constraints': [models.UniqueConstraint(fields=('post', 'granularity', 'bucket_start'), name='post_like_bucket_uniq')],
+            },
+        ),
+    ]
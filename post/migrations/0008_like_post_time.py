@@ -0,0 +1,31 @@
+from django.db import migrations, models
+from django.db.models import OuterRef, Subquery
+
+
+def backfill_post_time(apps, schema_editor):
+    Like = apps.get_model("post", "Like")
+    Post = apps.get_model("post", "Post")
+    Like.objects.filter(post_time__isnull=True).update(
+        post_time=Subquery(Post.objects.filter(pk=OuterRef("post_id")).values("time")[:1])
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('post', '0007_like_buckets'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='like',
+            name='post_time',
+            field=models.DateTimeField(editable=False, null=True),
+        ),
+        migrations.RunPython(backfill_post_time, migrations.RunPython.noop),
+        migrations.AlterField(
+            model_name='like',
+            name='post_time',
+            field=models.DateTimeField(editable=False),
+        ),
+    ]
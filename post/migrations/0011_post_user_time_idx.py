@@ -0,0 +1,19 @@
+# Generated by Django 5.2.18 on 2026-10-19 15:19
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('post', '0010_post_deleted_at'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='post',
+            index=models.Index(fields=['user', '-time', '-post_id'], name='post_user_time_idx'),
+        ),
+    ]
@@ -3,6 +3,13 @@ from django.db import models
 from django.utils import timezone
 
 
+class PostManager(models.Manager):
+    """Hide soft-deleted posts (``Post.all_objects`` still returns them for the purge)."""
+
+    def get_queryset(self):
+        return super().get_queryset().filter(deleted_at__isnull=True)
+
+
 # Create your models here.
 class Post(models.Model):
     post_id = models.AutoField(
@@ -13,7 +20,14 @@ class Post(models.Model):
     )
     context = models.TextField()
     like_count = models.PositiveIntegerField(default=0)
+    # 半減期付きのいいね数（api.services.trending で更新）
+    trending_score = models.FloatField(default=0)
     time = models.DateTimeField(default=timezone.now)
+    # 論理削除の時刻。いいね等の関連行とカウンタは purge_deleted コマンドが後から処理する（api.services.deletion）
+    deleted_at = models.DateTimeField(null=True, blank=True)
+
+    objects = PostManager()
+    all_objects = models.Manager()
 
     class Meta:
         db_table = "post"
@@ -22,6 +36,14 @@ class Post(models.Model):
             models.Index(fields=["-post_id"], name="post_latest_idx"),
             models.Index(fields=["-like_count", "-post_id"], name="post_ranking_idx"),
             models.Index(fields=["-time"], name="post_time_idx"),
+            models.Index(fields=["-trending_score", "-post_id"], name="post_trending_idx"),
+            # プロフィールの投稿一覧（api.services.author_feed）のカーソルページング用
+            models.Index(fields=["user", "-time", "-post_id"], name="post_user_time_idx"),
+            models.Index(
+                fields=["deleted_at"],
+                name="post_deleted_idx",
+                condition=models.Q(deleted_at__isnull=False),
+            ),
         ]
 
     def __str__(self):
@@ -42,6 +64,8 @@ class Like(models.Model):
         related_name="likes",
     )
     created_at = models.DateTimeField(auto_now_add=True)
+    # post.time の複製。パーティション化した like のパーティションキー（api.services.partitioning）
+    post_time = models.DateTimeField(editable=False)
 
     class Meta:
         db_table = "like"
@@ -49,7 +73,73 @@ class Like(models.Model):
         ordering = ["-created_at"]
         indexes = [
             models.Index(fields=["user", "post"], name="like_user_post_idx"),
+            # いいねした投稿一覧 / 投稿にいいねしたユーザ一覧のキーセットページング用
+            models.Index(fields=["user", "-created_at", "-id"], name="like_user_created_idx"),
+            models.Index(fields=["post", "-created_at", "-id"], name="like_post_created_idx"),
         ]
 
     def __str__(self):
         return f"Like<{self.user_id}:{self.post_id}>"
+
+    def save(self, *args, **kwargs):
+        if self.post_time is None:
+            self.post_time = self.post.time
+        super().save(*args, **kwargs)
+
+
+class LikeBucketBase(models.Model):
+    """Like count of one hour (or one day after compaction) for ranking windows."""
+
+    HOURLY = "h"
+    DAILY = "d"
+    GRANULARITY_CHOICES = [
+        (HOURLY, "Hourly"),
+        (DAILY, "Daily"),
+    ]
+
+    granularity = models.CharField(max_length=1, choices=GRANULARITY_CHOICES, default=HOURLY)
+    bucket_start = models.DateTimeField()
+    count = models.IntegerField(default=0)
+
+    class Meta:
+        abstract = True
+
+
+class PostLikeBucket(LikeBucketBase):
+    post = models.ForeignKey(Post, on_delete=models.CASCADE, related_name="like_buckets")
+
+    class Meta:
+        db_table = "post_like_bucket"
+        constraints = [
+            models.UniqueConstraint(
+                fields=["post", "granularity", "bucket_start"], name="post_like_bucket_uniq"
+            ),
+        ]
+        indexes = [
+            models.Index(fields=["bucket_start", "post"], name="post_like_bucket_start_idx"),
+        ]
+
+    def __str__(self):
+        return f"PostLikeBucket<{self.post_id}:{self.granularity}:{self.bucket_start}={self.count}>"
+
+
+class AuthorLikeBucket(LikeBucketBase):
+    """Likes received by an author, bucketed like ``PostLikeBucket``."""
+
+    author = models.ForeignKey(
+        settings.AUTH_USER_MODEL, on_delete=models.CASCADE, related_name="like_buckets"
+    )
+
+    class Meta:
+        db_table = "author_like_bucket"
+        constraints = [
+            models.UniqueConstraint(
+                fields=["author", "granularity", "bucket_start"], name="author_like_bucket_uniq"
+            ),
+        ]
+        indexes = [
+            models.Index(fields=["bucket_start", "author"], name="author_like_bucket_start_idx"),
+        ]
+
+    def __str__(self):
+        return f"AuthorLikeBucket<{self.author_id}:{self.granularity}:{self.bucket_start}={self.count}>"
@@ -12,6 +12,8 @@ https://docs.djangoproject.com/en/5.2/ref/settings/
 
 import os
 import dj_database_url
+from corsheaders.defaults import default_headers
+from django.core.exceptions import ImproperlyConfigured
 from pathlib import Path
 
 # Build paths inside the project like this: BASE_DIR / 'subdir'.
@@ -32,6 +34,8 @@ ALLOWED_HOSTS = ['*']
 
 # CORS設定：フロントエンドからのアクセスを許可（開発用）
 CORS_ALLOW_ALL_ORIGINS = True
+# 書き込みの再送判定（api.idempotency）に使うヘッダを許可
+CORS_ALLOW_HEADERS = (*default_headers, "idempotency-key")
 
 
 # Application definition
@@ -54,6 +58,11 @@ INSTALLED_APPS = [
 AUTH_USER_MODEL = "accounts.CustomUser"
 MIDDLEWARE = [
     "django.middleware.security.SecurityMiddleware",
+    "api.middleware.MetricsMiddleware",
+    "api.middleware.TracingMiddleware",
+    "api.middleware.QueryInstrumentationMiddleware",
+    "api.middleware.ProfilingMiddleware",
+    "api.middleware.ReadReplicaMiddleware",
     "django.contrib.sessions.middleware.SessionMiddleware",
     "corsheaders.middleware.CorsMiddleware",
     "django.middleware.common.CommonMiddleware",
@@ -86,6 +95,21 @@ WSGI_APPLICATION = "short_app.wsgi.application"
 # Database
 # https://docs.djangoproject.com/en/5.2/ref/settings/#databases
 
+# gunicorn のワーカーあたりスレッド数（Dockerfile の --threads と揃える）
+WEB_THREADS = int(os.getenv("WEB_THREADS", "8"))
+# "wsgi"（gunicorn スレッド）または "asgi"（gunicorn + uvicorn ワーカー）
+SERVER_INTERFACE = os.getenv("SERVER_INTERFACE", "wsgi")
+# タイムライン・ランキング・検索を async ビューで提供する（ASGI では既定で有効）
+ASYNC_VIEWS = os.getenv("ASYNC_VIEWS", "1" if SERVER_INTERFACE == "asgi" else "0") == "1"
+try:
+    from psycopg_pool import ConnectionPool
+except ImportError:  # psycopg[pool]（psycopg3）未インストール時はプールを既定で無効にする
+    ConnectionPool = None
+
+DB_POOL_ENABLED = os.getenv("DB_POOL_ENABLED", "1" if ConnectionPool is not None else "0") == "1"
+
+REPLICA_DATABASES = []
+
 # ローカル開発用：USE_SQLITE=1 で SQLite を使用
 if os.getenv("USE_SQLITE"):
     DATABASES = {
@@ -115,6 +139,86 @@ else:
             ssl_require=True,
         )
 
+    # 読み取りレプリカ（カンマ区切りの接続 URL）。エイリアスは replica1, replica2, ...
+    for index, replica_url in enumerate(
+        url for url in os.getenv("DATABASE_REPLICA_URLS", "").split(",") if url.strip()
+    ):
+        alias = f"replica{index + 1}"
+        DATABASES[alias] = dj_database_url.parse(replica_url.strip(), ssl_require=True)
+        # テストでは default をそのまま使う
+        DATABASES[alias]["TEST"] = {"MIRROR": "default"}
+        REPLICA_DATABASES.append(alias)
+
+    # コネクションプール（psycopg3 の psycopg_pool）: どちらのブランチでも有効
+    # Cloud Run の 1 インスタンスあたりの接続数を gunicorn のスレッド数に揃え、
+    # Supabase の接続上限を使い切らないようにする
+    for database in DATABASES.values():
+        database["CONN_HEALTH_CHECKS"] = True
+        if DB_POOL_ENABLED:
+            if ConnectionPool is None:
+                raise ImproperlyConfigured(
+                    "DB_POOL_ENABLED=1 requires psycopg[pool] (psycopg 3); see requirements.txt."
+                )
+            pool_options = {
+                "min_size": int(os.getenv("DB_POOL_MIN_SIZE", "1")),
+                "max_size": int(os.getenv("DB_POOL_MAX_SIZE", str(WEB_THREADS))),
+                "timeout": float(os.getenv("DB_POOL_TIMEOUT", "10")),
+                "max_idle": float(os.getenv("DB_POOL_MAX_IDLE", "300")),
+                "max_lifetime": float(os.getenv("DB_POOL_MAX_LIFETIME", "1800")),
+                # プールから払い出す前に接続の生存確認を行う
+                "check": ConnectionPool.check_connection,
+            }
+            # プールと永続接続 (CONN_MAX_AGE) は併用できない
+            database["CONN_MAX_AGE"] = 0
+            database.setdefault("OPTIONS", {})["pool"] = pool_options
+        else:
+            database["CONN_MAX_AGE"] = int(os.getenv("DB_CONN_MAX_AGE", "600"))
+
+# 読み取り専用ビュー（タイムライン・ランキング・検索・一覧）をレプリカへ振り分ける
+DATABASE_ROUTERS = ["api.db_router.ReadReplicaRouter"]
+# 書き込み（いいね・フォロー・投稿など）をしたクライアントは、この秒数だけプライマリから読む
+READ_YOUR_WRITES_SECONDS = float(os.getenv("READ_YOUR_WRITES_SECONDS", "10"))
+# レプリカの遅延がこの秒数を超えたら（または確認に失敗したら）プライマリへフェイルオーバー
+REPLICA_MAX_LAG_SECONDS = float(os.getenv("REPLICA_MAX_LAG_SECONDS", "5"))
+REPLICA_LAG_CHECK_INTERVAL = float(os.getenv("REPLICA_LAG_CHECK_INTERVAL", "5"))
+
+# キャッシュ（レプリカのスティッキー判定などで使用）。複数インスタンスで共有するには REDIS_URL を設定する
+REDIS_URL = os.getenv("REDIS_URL")
+if REDIS_URL:
+    CACHES = {
+        "default": {
+            "BACKEND": "django.core.cache.backends.redis.RedisCache",
+            "LOCATION": REDIS_URL,
+        }
+    }
+else:
+    CACHES = {
+        "default": {
+            "BACKEND": "django.core.cache.backends.locmem.LocMemCache",
+        }
+    }
+
+# レート制限（api.throttling.TokenBucketThrottle）のトークンバケット置き場。
+# 既定は default キャッシュ（REDIS_URL 設定時は全インスタンスで共有）。THROTTLE_STORE=local でプロセス内に置く
+CACHES["throttle"] = (
+    {"BACKEND": "django.core.cache.backends.locmem.LocMemCache", "LOCATION": "throttle"}
+    if os.getenv("THROTTLE_STORE") == "local" or not REDIS_URL
+    else {**CACHES["default"], "KEY_PREFIX": "throttle"}
+)
+THROTTLE_CACHE = "throttle"
+THROTTLE_ENABLED = os.getenv("THROTTLE_ENABLED", "1") == "1"
+# スコープごとのレート（"<容量>/<s|min|hour|day>"）。容量ぶんのバーストを許し、期間で満タンに戻る
+THROTTLE_RATES = {
+    "like": os.getenv("THROTTLE_RATE_LIKE", "60/min"),
+    "unlike": os.getenv("THROTTLE_RATE_UNLIKE", "60/min"),
+    "follow": os.getenv("THROTTLE_RATE_FOLLOW", "30/min"),
+    "unfollow": os.getenv("THROTTLE_RATE_UNFOLLOW", "30/min"),
+    "auth": os.getenv("THROTTLE_RATE_AUTH", "10/min"),
+}
+
+# Idempotency-Key 付き書き込みのレスポンスを保持する秒数（同じキーの再送にはこれを返す）
+IDEMPOTENCY_KEY_SECONDS = int(os.getenv("IDEMPOTENCY_KEY_SECONDS", "86400"))
+
 
 # Password validation
 # https://docs.djangoproject.com/en/5.2/ref/settings/#auth-password-validators
@@ -165,6 +269,9 @@ REST_FRAMEWORK = {
         "rest_framework.authentication.TokenAuthentication",
         "rest_framework.authentication.BasicAuthentication",
     ],
+    "DEFAULT_THROTTLE_CLASSES": [
+        "api.throttling.TokenBucketThrottle",
+    ],
     "TEST_REQUEST_DEFAULT_FORMAT": "json",
 }
 
@@ -188,3 +295,98 @@ APPLE_CLIENT_IDS = [cid for cid in APPLE_CLIENT_IDS if cid]
 # Firebase Cloud Messaging設定
 # サービスアカウントJSONファイルへのパス
 FIREBASE_CREDENTIALS_PATH = os.getenv("FIREBASE_CREDENTIALS_PATH")
+# FCM への送信をバックグラウンドのスレッドプールで行い、リクエストをブロックしない
+NOTIFICATIONS_ASYNC = os.getenv("NOTIFICATIONS_ASYNC", "1") == "1"
+NOTIFICATIONS_MAX_WORKERS = int(os.getenv("NOTIFICATIONS_MAX_WORKERS", "4"))
+
+# Apple / Google の公開鍵キャッシュ（秒）。期限切れ後は古い鍵を返しつつバックグラウンドで更新する
+AUTH_KEYS_CACHE_SECONDS = int(os.getenv("AUTH_KEYS_CACHE_SECONDS", "3600"))
+
+# 人気タブ / 24h ランキングのトレンドスコア（api.services.trending）
+# 半減期（時間）、decay_trending_scores の実行間隔（秒）、これ未満のスコアは 0 に落とす
+TRENDING_HALF_LIFE_HOURS = float(os.getenv("TRENDING_HALF_LIFE_HOURS", "6"))
+TRENDING_DECAY_INTERVAL_SECONDS = float(os.getenv("TRENDING_DECAY_INTERVAL_SECONDS", "600"))
+TRENDING_MIN_SCORE = float(os.getenv("TRENDING_MIN_SCORE", "0.05"))
+
+# 期間付きランキング（range=24h|7d|30d）のいいねバケット（api.services.like_rollups）
+# 1 時間バケットを日次にまとめるまでの時間、バケットを保持する日数
+ROLLUP_HOURLY_RETENTION_HOURS = int(os.getenv("ROLLUP_HOURLY_RETENTION_HOURS", "48"))
+ROLLUP_RETENTION_DAYS = int(os.getenv("ROLLUP_RETENTION_DAYS", "31"))
+
+# post / like の月次パーティション（api.services.partitioning、PostgreSQL のみ）
+# partition_tables --convert 実行後に POST_PARTITIONING=1 にすると最新/フォロー中タイムラインを time 順にする
+POST_PARTITIONING = os.getenv("POST_PARTITIONING") == "1"
+PARTITION_MONTHS_AHEAD = int(os.getenv("PARTITION_MONTHS_AHEAD", "3"))
+
+# おすすめユーザ（api.services.suggestions、refresh_follow_suggestions コマンドで更新）
+# 保存する候補数、フォロワー数上位から混ぜる人数、フォロワー数の重み、スコア計算のプロセス数
+SUGGESTIONS_TOP_K = int(os.getenv("SUGGESTIONS_TOP_K", "20"))
+SUGGESTIONS_POPULAR_POOL = int(os.getenv("SUGGESTIONS_POPULAR_POOL", "50"))
+SUGGESTIONS_POPULARITY_WEIGHT = float(os.getenv("SUGGESTIONS_POPULARITY_WEIGHT", "0.5"))
+SUGGESTIONS_WORKERS = int(os.getenv("SUGGESTIONS_WORKERS", "1"))
+
+# ?ids= の一括取得（/api/users/batch/, /api/posts/batch/）の上限件数とオブジェクトキャッシュの秒数
+MULTI_GET_MAX_IDS = int(os.getenv("MULTI_GET_MAX_IDS", "100"))
+OBJECT_CACHE_SECONDS = int(os.getenv("OBJECT_CACHE_SECONDS", "30"))
+
+# プロフィール（ユーザ + stats + rank）のキャッシュ秒数（api.services.profile_cache）
+PROFILE_CACHE_SECONDS = int(os.getenv("PROFILE_CACHE_SECONDS", "60"))
+
+# プロフィールの投稿一覧用に、投稿者ごとに保持する最新投稿 ID の件数と秒数（api.services.author_feed）
+AUTHOR_FEED_CACHE_SIZE = int(os.getenv("AUTHOR_FEED_CACHE_SIZE", "50"))
+AUTHOR_FEED_CACHE_SECONDS = int(os.getenv("AUTHOR_FEED_CACHE_SECONDS", "600"))
+
+# 一覧 API（投稿/いいね/フォロー/ユーザ）で cursor / page_size を指定しない既存クライアントに、
+# エンベロープなしの配列（先頭 100 件 + Link ヘッダ）を返す互換モード（api.pagination）
+LIST_PAGINATION_COMPAT = os.getenv("LIST_PAGINATION_COMPAT", "1") == "1"
+
+# リクエスト単位の SQL 計測（api.middleware.QueryInstrumentationMiddleware）
+# 全リクエストにクエリ数/DB時間の Server-Timing ヘッダを付与し、
+# サンプリングしたリクエストのみ SQL の形を記録して N+1 候補を構造化ログに出力する
+QUERY_INSTRUMENTATION_ENABLED = os.getenv("QUERY_INSTRUMENTATION_ENABLED", "1") == "1"
+QUERY_INSTRUMENTATION_SAMPLE_RATE = float(os.getenv("QUERY_INSTRUMENTATION_SAMPLE_RATE", "0.01"))
+QUERY_INSTRUMENTATION_N_PLUS_ONE_THRESHOLD = int(
+    os.getenv("QUERY_INSTRUMENTATION_N_PLUS_ONE_THRESHOLD", "5")
+)
+
+# スロークエリログ（api.slow_queries）: しきい値超過のクエリを EXPLAIN 付きで slow_query_log に記録
+SLOW_QUERY_THRESHOLD_MS = float(os.getenv("SLOW_QUERY_THRESHOLD_MS", "200"))
+SLOW_QUERY_RATE_LIMIT_SECONDS = float(os.getenv("SLOW_QUERY_RATE_LIMIT_SECONDS", "300"))
+SLOW_QUERY_LOG_ASYNC = os.getenv("SLOW_QUERY_LOG_ASYNC", "1") == "1"
+
+# オンデマンド・サンプリングプロファイラ（api.middleware.ProfilingMiddleware）
+# スタッフユーザの `X-Profile: 1` ヘッダ、または PROFILING_SAMPLE_RATE の割合で有効化し、
+# エンドポイントごとの collapsed stacks を PROFILING_OUTPUT_DIR に保存する
+PROFILING_SAMPLE_RATE = float(os.getenv("PROFILING_SAMPLE_RATE", "0"))
+PROFILING_INTERVAL = float(os.getenv("PROFILING_INTERVAL", "0.005"))
+PROFILING_MAX_CONCURRENT = int(os.getenv("PROFILING_MAX_CONCURRENT", "2"))
+PROFILING_OUTPUT_DIR = os.getenv("PROFILING_OUTPUT_DIR", "/tmp/short_app_profiles")
+
+# Prometheus メトリクス（GET /metrics）
+# gunicorn の複数ワーカーで集計する場合は METRICS_MULTIPROC_DIR に共有ディレクトリを指定する
+METRICS_MULTIPROC_DIR = os.getenv("METRICS_MULTIPROC_DIR")
+METRICS_FLUSH_INTERVAL = float(os.getenv("METRICS_FLUSH_INTERVAL", "10"))
+METRICS_TOKEN = os.getenv("METRICS_TOKEN")
+
+# リクエストトレーシング（api.tracing）
+# TRACING_EXPORTER: "" (無効) / "file" (JSON Lines) / "otlp" (OTLP/HTTP JSON)
+# 所要時間が TRACING_SLOW_THRESHOLD_MS 以上のトレースのみ出力する（テールベースサンプリング）
+TRACING_EXPORTER = os.getenv("TRACING_EXPORTER", "")
+TRACING_SLOW_THRESHOLD_MS = float(os.getenv("TRACING_SLOW_THRESHOLD_MS", "500"))
+TRACING_FILE_PATH = os.getenv("TRACING_FILE_PATH", "/tmp/short_app_traces.jsonl")
+TRACING_OTLP_ENDPOINT = os.getenv("TRACING_OTLP_ENDPOINT", "http://localhost:4318/v1/traces")
+TRACING_SERVICE_NAME = os.getenv("TRACING_SERVICE_NAME", "short-app")
+
+LOGGING = {
+    "version": 1,
+    "disable_existing_loggers": False,
+    "handlers": {
+        "console": {"class": "logging.StreamHandler"},
+    },
+    "loggers": {
+        "api": {
+            "handlers": ["console"],
+            "level": os.getenv("API_LOG_LEVEL", "INFO"),
+        },
+    },
+}
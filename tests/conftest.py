@@ -1,7 +1,22 @@
 import pytest
+from django.core.cache import caches
 from rest_framework.test import APIClient
 
-from .factories import UserFactory
+from api.services import like_rollups
+
+from .factories import FollowFactory, LikeFactory, PostFactory, UserFactory
+
+
+@pytest.fixture(autouse=True)
+def fast_password_hasher(settings):
+    settings.PASSWORD_HASHERS = ["django.contrib.auth.hashers.MD5PasswordHasher"]
+
+
+@pytest.fixture(autouse=True)
+def clear_cache():
+    # オブジェクトキャッシュやレート制限のバケットはテスト間で ID が再利用されるため毎回空にする
+    for store in caches.all():
+        store.clear()
 
 
 @pytest.fixture
@@ -17,3 +32,25 @@ def another_user(db):
 @pytest.fixture
 def api_client():
     return APIClient()
+
+
+@pytest.fixture
+def query_dataset(db, user):
+    """
+    A dataset large enough to expose per-row queries: a full page of posts by
+    distinct authors with distinct like counts, part of them liked/followed by ``user``.
+    """
+    authors = [
+        UserFactory(username=f"author{i}", stats={"total_likes_received": i}) for i in range(25)
+    ]
+    posts = [
+        PostFactory(user=author, context=f"hello {i}", like_count=i, trending_score=float(i))
+        for i, author in enumerate(authors)
+    ]
+    for post in posts[::2]:
+        LikeFactory(user=user, post=post)
+    for author in authors[::3]:
+        FollowFactory(user=user, aim_user=author)
+        FollowFactory(user=author, aim_user=user)
+    like_rollups.rebuild()
+    return {"authors": authors, "posts": posts}
@@ -0,0 +1,20 @@
+"""Query-budget assertions for API endpoints."""
+
+from contextlib import contextmanager
+
+import pytest
+from django.db import connections
+from django.test.utils import CaptureQueriesContext
+
+
+@contextmanager
+def assert_max_queries(budget: int, *, using: str = "default"):
+    """Fail when the block executes more than ``budget`` SQL queries."""
+    with CaptureQueriesContext(connections[using]) as captured:
+        yield captured
+    executed = len(captured.captured_queries)
+    if executed > budget:
+        statements = "\n".join(
+            f"{index}. {query['sql']}" for index, query in enumerate(captured.captured_queries, 1)
+        )
+        pytest.fail(f"Executed {executed} queries, budget is {budget}:\n{statements}")
@@ -3,10 +3,13 @@ from datetime import timedelta
 import pytest
 from django.utils import timezone
 
+from api.pagination import KeysetCursorPagination
+from api.services import inserts
 from follow.models import Follow
-from post.models import Post
+from post.models import Like, Post
 
 from .factories import PostFactory, UserFactory
+from .query_budget import assert_max_queries
 
 
 @pytest.mark.django_db
@@ -49,6 +52,62 @@ def test_follow_create_blocks_self_follow(api_client, user):
     assert not Follow.objects.exists()
 
 
+@pytest.mark.django_db
+def test_follow_create_ignores_client_user_id_for_self_check(api_client, user, another_user):
+    api_client.force_authenticate(user=user)
+
+    response = api_client.post(
+        "/api/follows/", {"user_id": another_user.pk, "aim_user_id": user.pk}
+    )
+
+    assert response.status_code == 400
+    assert not Follow.objects.exists()
+
+
+@pytest.mark.django_db
+def test_duplicate_like_and_follow_skip_side_effects(api_client, user, another_user):
+    post = PostFactory(user=another_user)
+    api_client.force_authenticate(user=user)
+    assert api_client.post("/api/likes/", {"post_id": post.post_id}).status_code == 201
+    assert api_client.post("/api/follows/", {"aim_user_id": another_user.pk}).status_code == 201
+
+    response = api_client.post("/api/likes/", {"post_id": post.post_id})
+    assert response.status_code == 400
+    assert response.data["non_field_errors"] == ["既にいいね済みです。"]
+    response = api_client.post("/api/follows/", {"aim_user_id": another_user.pk})
+    assert response.status_code == 400
+
+    post.refresh_from_db()
+    another_user.stats.refresh_from_db()
+    assert post.like_count == 1
+    assert another_user.stats.total_likes_received == 1
+    assert another_user.stats.follower_count == 1
+
+
+@pytest.mark.django_db
+def test_like_and_follow_reject_missing_targets(api_client, user):
+    api_client.force_authenticate(user=user)
+
+    response = api_client.post("/api/likes/", {"post_id": 999})
+    assert response.status_code == 400
+    assert "post_id" in response.data
+    response = api_client.post("/api/follows/", {"aim_user_id": 999})
+    assert response.status_code == 400
+    assert "aim_user_id" in response.data
+
+
+@pytest.mark.django_db
+def test_insert_ignore_returns_none_on_conflict(user, another_user):
+    post = PostFactory(user=another_user)
+    values = {"user_id": user.pk, "post_id": post.pk, "created_at": timezone.now(), "post_time": post.time}
+
+    like_id = inserts.insert_ignore(Like, **values)
+
+    assert Like.objects.get(pk=like_id).post_id == post.pk
+    assert inserts.insert_ignore(Like, **values) is None
+    assert Like.objects.count() == 1
+
+
 @pytest.mark.django_db
 def test_timeline_latest_returns_posts_in_order(api_client, user, another_user):
     old = PostFactory(user=user, context="old")
@@ -62,13 +121,15 @@ def test_timeline_latest_returns_posts_in_order(api_client, user, another_user):
 
 
 @pytest.mark.django_db
-def test_timeline_popular_filters_recent_posts_and_orders(api_client, user):
-    within_window_high = PostFactory(user=user, context="win high", like_count=10)
-    within_window_low = PostFactory(user=user, context="win low", like_count=2)
-    outside_window = PostFactory(
+def test_timeline_popular_orders_by_trending_score(api_client, user):
+    PostFactory(user=user, context="win high", like_count=10, trending_score=8.5)
+    PostFactory(user=user, context="win low", like_count=2, trending_score=1.5)
+    # いいね数は多いがスコアが減衰しきった古い投稿は出ない
+    PostFactory(
         user=user,
         context="old popular",
         like_count=100,
+        trending_score=0,
         time=timezone.now() - timedelta(hours=30),
     )
 
@@ -155,3 +216,146 @@ def test_users_me_requires_authentication(api_client):
     response = api_client.get("/api/users/me/")
 
     assert response.status_code == 401
+
+
+@pytest.mark.django_db
+def test_followers_list_keyset_pagination(api_client, user):
+    followers = [UserFactory(username=f"follower{i}") for i in range(3)]
+    for follower in followers:
+        Follow.objects.create(user=follower, aim_user=user)
+
+    response = api_client.get("/api/follows/", {"aim_user_id": user.pk, "page_size": 2})
+
+    assert response.status_code == 200
+    names = [item["user"]["username"] for item in response.data["results"]]
+    response = api_client.get(response.data["next"])
+    names += [item["user"]["username"] for item in response.data["results"]]
+    assert names == ["follower2", "follower1", "follower0"]
+
+
+@pytest.mark.django_db
+def test_unpaginated_list_is_capped_with_next_link(api_client, user, monkeypatch):
+    monkeypatch.setattr(KeysetCursorPagination, "max_page_size", 2)
+    for i in range(3):
+        PostFactory(user=user, context=f"post {i}")
+
+    response = api_client.get("/api/posts/")
+
+    assert [post["context"] for post in response.data] == ["post 2", "post 1"]
+    next_url = response["Link"].split(";")[0].strip("<>")
+    response = api_client.get(next_url)
+    assert [post["context"] for post in response.data["results"]] == ["post 0"]
+
+
+@pytest.mark.django_db
+def test_list_without_compat_mode_is_always_paginated(api_client, user, another_user, settings):
+    settings.LIST_PAGINATION_COMPAT = False
+    Follow.objects.create(user=user, aim_user=another_user)
+
+    response = api_client.get("/api/follows/")
+
+    assert [item["aim_user"]["username"] for item in response.data["results"]] == [another_user.username]
+    assert response.data["next"] is None
+    assert "Link" not in response
+
+
+@pytest.mark.django_db
+def test_user_list_pages_by_likes_received(api_client, user, another_user):
+    third = UserFactory(username="user3")
+    for member, likes in ((user, 10), (another_user, 15), (third, 10)):
+        member.stats.total_likes_received = likes
+        member.stats.save()
+
+    response = api_client.get("/api/users/", {"page_size": 2})
+    rows = [(item["username"], item["rank"]) for item in response.data["results"]]
+    response = api_client.get(response.data["next"])
+    rows += [(item["username"], item["rank"]) for item in response.data["results"]]
+
+    assert rows == [(another_user.username, 1), ("user3", 2), (user.username, 2)]
+
+
+@pytest.mark.django_db
+def test_user_lists_include_follow_flags(api_client, user, another_user):
+    stranger = UserFactory(username="stranger")
+    Follow.objects.create(user=user, aim_user=another_user)
+    Follow.objects.create(user=stranger, aim_user=user)
+    api_client.force_authenticate(user=user)
+
+    response = api_client.get("/api/rankings/users/followers/")
+
+    flags = {
+        row["user_id"]: (row["is_following"], row["follows_you"]) for row in response.data["results"]
+    }
+    assert flags[another_user.user_id] == (True, False)
+    assert flags[stranger.user_id] == (False, True)
+    assert flags[user.user_id] == (False, False)
+
+    detail = api_client.get(f"/api/users/{another_user.user_id}/")
+    assert detail.data["is_following"] is True
+
+
+@pytest.mark.django_db
+def test_follow_status_api(api_client, user, another_user):
+    stranger = UserFactory(username="stranger")
+    Follow.objects.create(user=user, aim_user=another_user)
+    Follow.objects.create(user=stranger, aim_user=user)
+    api_client.force_authenticate(user=user)
+
+    response = api_client.get(
+        "/api/follows/status/", {"ids": f"{another_user.user_id},{stranger.user_id}"}
+    )
+
+    assert response.status_code == 200
+    assert response.data == {
+        "following_ids": [another_user.user_id],
+        "follower_ids": [stranger.user_id],
+    }
+    assert api_client.get("/api/follows/status/", {"ids": "x"}).status_code == 400
+
+
+@pytest.mark.django_db
+def test_post_multi_get_preserves_order_and_reports_missing(api_client, user):
+    first = PostFactory(user=user, context="first")
+    second = PostFactory(user=user, context="second")
+
+    response = api_client.get(
+        "/api/posts/batch/", {"ids": f"{second.post_id},999999,{first.post_id},{second.post_id}"}
+    )
+
+    assert response.status_code == 200
+    assert [row["context"] for row in response.data["results"]] == ["second", "first"]
+    assert response.data["missing_ids"] == [999999]
+
+
+@pytest.mark.django_db
+def test_user_multi_get_reads_repeated_ids_from_cache(api_client, user, another_user):
+    ids = {"ids": f"{another_user.user_id},{user.user_id}"}
+    api_client.get("/api/users/batch/", ids)
+
+    with assert_max_queries(1):  # rank_by_total_likes のみ
+        response = api_client.get("/api/users/batch/", ids)
+
+    assert [row["user_id"] for row in response.data["results"]] == [
+        another_user.user_id,
+        user.user_id,
+    ]
+    assert response.data["results"][0]["rank"] == 1
+
+
+@pytest.mark.django_db
+def test_multi_get_cache_is_invalidated_on_save(api_client, user):
+    api_client.get("/api/users/batch/", {"ids": user.user_id})
+    user.user_bio = "updated"
+    user.save()
+
+    response = api_client.get("/api/users/batch/", {"ids": user.user_id})
+
+    assert response.data["results"][0]["user_bio"] == "updated"
+
+
+@pytest.mark.django_db
+def test_multi_get_rejects_invalid_and_too_many_ids(api_client, settings):
+    settings.MULTI_GET_MAX_IDS = 2
+
+    assert api_client.get("/api/posts/batch/", {"ids": "1,x"}).status_code == 400
+    assert api_client.get("/api/posts/batch/", {"ids": "1,2,3"}).status_code == 400
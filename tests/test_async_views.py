@@ -0,0 +1,141 @@
+import threading
+
+import pytest
+from asgiref.sync import async_to_sync, sync_to_async
+from django.http import HttpResponse
+from rest_framework.test import APIRequestFactory, force_authenticate
+
+from accounts.models import DeviceToken
+from api.middleware import QueryInstrumentationMiddleware
+from api.services import auth_keys, notifications
+from api.views import (
+    AsyncPostLikeRankingView,
+    AsyncPostSearchView,
+    AsyncTimelineView,
+    AsyncUserFollowerRankingView,
+    AsyncUserLevelRankingView,
+    AsyncUserSearchView,
+    AsyncUserTotalLikesRankingView,
+    PostLikeRankingView,
+    PostSearchView,
+    TimelineView,
+    UserFollowerRankingView,
+    UserLevelRankingView,
+    UserSearchView,
+    UserTotalLikesRankingView,
+)
+from post.models import Post
+
+VIEW_PAIRS = [
+    (TimelineView, AsyncTimelineView, {"tab": "latest"}),
+    (TimelineView, AsyncTimelineView, {"tab": "popular"}),
+    (TimelineView, AsyncTimelineView, {"tab": "following"}),
+    (PostLikeRankingView, AsyncPostLikeRankingView, {"range": "24h"}),
+    (UserTotalLikesRankingView, AsyncUserTotalLikesRankingView, {}),
+    (UserLevelRankingView, AsyncUserLevelRankingView, {}),
+    (UserFollowerRankingView, AsyncUserFollowerRankingView, {}),
+    (UserSearchView, AsyncUserSearchView, {"q": "author"}),
+    (PostSearchView, AsyncPostSearchView, {"q": "hello"}),
+]
+
+
+def _get(view_class, params, user):
+    request = APIRequestFactory().get("/", params)
+    force_authenticate(request, user=user)
+    view = view_class.as_view()
+    if view_class.view_is_async:
+        return async_to_sync(view)(request)
+    return view(request)
+
+
+@pytest.mark.django_db
+@pytest.mark.parametrize("sync_view,async_view,params", VIEW_PAIRS)
+def test_async_views_match_sync_views(query_dataset, user, sync_view, async_view, params):
+    assert async_view.view_is_async
+
+    expected = _get(sync_view, params, user)
+    response = _get(async_view, params, user)
+
+    assert response.status_code == 200
+    assert response.data == expected.data
+
+
+@pytest.mark.django_db
+def test_async_view_enforces_permissions(query_dataset):
+    request = APIRequestFactory().post("/", {})
+
+    response = async_to_sync(AsyncTimelineView.as_view())(request)
+
+    assert response.status_code in (401, 403)
+
+
+@pytest.mark.django_db
+def test_query_instrumentation_follows_async_requests():
+    async def get_response(request):
+        await sync_to_async(Post.objects.count)()
+        return HttpResponse()
+
+    middleware = QueryInstrumentationMiddleware(get_response)
+    request = APIRequestFactory().get("/")
+
+    response = async_to_sync(middleware)(request)
+
+    assert request.query_stats.count == 1
+    assert 'desc="1 queries"' in response["Server-Timing"]
+
+
+@pytest.mark.django_db
+def test_push_notifications_are_sent_off_the_request_thread(user, settings, monkeypatch):
+    settings.NOTIFICATIONS_ASYNC = True
+    DeviceToken.objects.create(user=user, token="token-1", platform="ios")
+    sent = []
+    done = threading.Event()
+
+    def fake_send(token, title, body, data):
+        sent.append((token, threading.current_thread().name))
+        done.set()
+        return True
+
+    monkeypatch.setattr(notifications, "send_push_notification", fake_send)
+
+    assert notifications.notify_followed(user.user_id, "someone") == 1
+    assert done.wait(5)
+    assert sent[0][0] == "token-1"
+    assert sent[0][1].startswith("fcm-send")
+
+
+class FakeKeysResponse:
+    headers = {"Cache-Control": "public, max-age=100"}
+
+    def __init__(self, keys):
+        self._keys = keys
+
+    def raise_for_status(self):
+        pass
+
+    def json(self):
+        return self._keys
+
+
+def test_key_cache_serves_stale_keys_while_refreshing(monkeypatch):
+    calls = []
+    release = threading.Event()
+
+    def fake_get(url, timeout):
+        calls.append(url)
+        if len(calls) > 1:
+            release.wait(5)
+        return FakeKeysResponse({"keys": [{"kid": str(len(calls))}]})
+
+    monkeypatch.setattr(auth_keys.http_requests, "get", fake_get)
+    cache = auth_keys.KeySetCache("https://keys.example/")
+
+    assert cache.get() == {"keys": [{"kid": "1"}]}
+    assert cache.get() == {"keys": [{"kid": "1"}]}
+    assert len(calls) == 1
+
+    cache._expires_at = 0
+    assert cache.get() == {"keys": [{"kid": "1"}]}
+    release.set()
+    assert cache.refresh() == {"keys": [{"kid": "2"}]}
+    assert len(calls) == 2
@@ -0,0 +1,87 @@
+from datetime import timedelta
+
+import pytest
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+
+from api.services import author_feed, deletion
+
+from .factories import PostFactory
+
+
+def _author_posts(user, count):
+    now = timezone.now()
+    return [
+        PostFactory(user=user, context=f"post {i}", time=now - timedelta(minutes=count - i))
+        for i in range(count)
+    ]
+
+
+def _contexts(response):
+    return [post["context"] for post in response.data["results"]]
+
+
+@pytest.mark.django_db
+def test_profile_feed_pages_newest_first(api_client, user, settings):
+    settings.AUTHOR_FEED_CACHE_SIZE = 3
+    _author_posts(user, 5)
+
+    response = api_client.get("/api/posts/", {"user_id": user.user_id, "page_size": 2})
+    assert _contexts(response) == ["post 4", "post 3"]
+
+    response = api_client.get(response.data["next"])
+    assert _contexts(response) == ["post 2", "post 1"]
+    response = api_client.get(response.data["next"])
+    assert _contexts(response) == ["post 0"]
+    assert response.data["next"] is None
+
+
+@pytest.mark.django_db
+def test_first_page_is_served_without_reading_posts(api_client, user):
+    _author_posts(user, 4)
+    params = {"user_id": user.user_id, "page_size": 3}
+    first = api_client.get("/api/posts/", params)
+
+    with CaptureQueriesContext(connection) as captured:
+        second = api_client.get("/api/posts/", params)
+
+    assert second.data == first.data
+    assert not [query for query in captured.captured_queries if 'FROM "post"' in query["sql"]]
+
+
+@pytest.mark.django_db
+def test_cache_follows_creates_and_deletes(api_client, user):
+    posts = _author_posts(user, 2)
+    params = {"user_id": user.user_id, "page_size": 5}
+    api_client.get("/api/posts/", params)
+
+    api_client.force_authenticate(user=user)
+    assert api_client.post("/api/posts/", {"context": "newest"}).status_code == 201
+    assert _contexts(api_client.get("/api/posts/", params)) == ["newest", "post 1", "post 0"]
+
+    deletion.soft_delete_post(posts[1])
+    assert _contexts(api_client.get("/api/posts/", params)) == ["newest", "post 0"]
+
+
+@pytest.mark.django_db
+def test_push_keeps_time_order_and_bound(user, settings):
+    settings.AUTHOR_FEED_CACHE_SIZE = 3
+    posts = _author_posts(user, 2)
+    assert author_feed.recent_ids(user.user_id, 3) == [posts[1].post_id, posts[0].post_id]
+
+    middle = PostFactory(user=user, time=posts[1].time - timedelta(seconds=1))
+    newest = PostFactory(user=user)
+
+    assert author_feed.recent_ids(user.user_id, 3) == [newest.post_id, posts[1].post_id, middle.post_id]
+    # 上限を超えたので、キャッシュにない 4 件目は DB から読む必要がある
+    assert author_feed.recent_ids(user.user_id, 4) is None
+
+
+@pytest.mark.django_db
+def test_profile_feed_without_page_size_returns_all_posts(api_client, user):
+    _author_posts(user, 3)
+
+    response = api_client.get("/api/posts/", {"user_id": user.user_id})
+
+    assert [post["context"] for post in response.data] == ["post 2", "post 1", "post 0"]
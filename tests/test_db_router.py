@@ -0,0 +1,76 @@
+import pytest
+from django.core.cache import cache
+from django.test import RequestFactory
+from django.urls import resolve
+from rest_framework.authtoken.models import Token
+
+from api import db_router
+from post.models import Post
+
+from .factories import PostFactory
+
+
+@pytest.fixture(autouse=True)
+def replicas(settings):
+    settings.REPLICA_DATABASES = ["replica1"]
+    cache.clear()
+    db_router._health.clear()
+    yield
+    db_router._health.clear()
+
+
+def _choose(method, path, **extra):
+    request = getattr(RequestFactory(), method)(path, **extra)
+    return db_router.choose_database(request, resolve(path).func)
+
+
+def test_router_reads_from_request_route_and_writes_to_primary():
+    router = db_router.ReadReplicaRouter()
+
+    assert router.db_for_read(Post) == "default"
+    with db_router.request_route() as route:
+        route.alias = "replica1"
+        assert router.db_for_read(Post) == "replica1"
+        assert router.db_for_read(Token) == "default"
+        assert router.db_for_write(Post) == "default"
+    assert router.db_for_read(Post) == "default"
+    assert router.allow_migrate("replica1", "post") is False
+
+
+def test_read_views_go_to_a_healthy_replica(monkeypatch):
+    monkeypatch.setattr(db_router, "replica_is_healthy", lambda alias: True)
+
+    assert _choose("get", "/api/timeline/") == "replica1"
+    assert _choose("get", "/api/rankings/posts/likes/") == "replica1"
+    assert _choose("get", "/api/posts/") == "replica1"
+    assert _choose("get", "/api/posts/1/") == "default"
+    assert _choose("post", "/api/likes/") == "default"
+
+
+def test_recent_writer_is_pinned_to_primary(monkeypatch):
+    monkeypatch.setattr(db_router, "replica_is_healthy", lambda alias: True)
+    auth = {"HTTP_AUTHORIZATION": "Token abc"}
+
+    db_router.mark_recent_write(RequestFactory().post("/api/likes/", **auth))
+
+    assert _choose("get", "/api/timeline/", **auth) == "default"
+    assert _choose("get", "/api/timeline/", HTTP_AUTHORIZATION="Token other") == "replica1"
+
+
+def test_lagging_replica_fails_over_to_primary(monkeypatch):
+    monkeypatch.setattr(db_router, "replica_lag", lambda alias: 30.0)
+
+    assert db_router.replica_is_healthy("replica1") is False
+    assert _choose("get", "/api/timeline/") == "default"
+
+
+@pytest.mark.django_db
+def test_unreachable_replica_still_serves_reads(api_client, user):
+    PostFactory(user=user)
+    api_client.force_authenticate(user)
+
+    response = api_client.get("/api/timeline/")
+
+    assert response.status_code == 200
+    assert len(response.data["results"]) == 1
+    assert db_router._health["replica1"][1] is False
@@ -0,0 +1,172 @@
+from datetime import timedelta
+
+import pytest
+from django.core.management import call_command
+from django.utils import timezone
+from rest_framework.authtoken.models import Token
+
+from accounts.models import CustomUser, UserStats
+from api.services import deletion, like_rollups
+from follow.models import Follow
+from post.models import AuthorLikeBucket, Like, LikeBucketBase, Post, PostLikeBucket
+
+from .factories import LikeFactory, PostFactory, UserFactory
+
+
+def _stats(user):
+    return UserStats.objects.get(user=user)
+
+
+def _like(api_client, liker, post):
+    api_client.force_authenticate(user=liker)
+    assert api_client.post("/api/likes/", {"post_id": post.post_id}).status_code == 201
+
+
+@pytest.mark.django_db
+def test_post_delete_is_soft_until_purged(api_client, user, another_user):
+    post = PostFactory(user=user)
+    likers = [another_user] + [UserFactory(username=f"liker{i}") for i in range(2)]
+    for liker in likers:
+        _like(api_client, liker, post)
+    user.stats.register_post_created()
+
+    api_client.force_authenticate(user=user)
+    assert api_client.delete(f"/api/posts/{post.post_id}/").status_code == 204
+    assert api_client.get(f"/api/posts/{post.post_id}/").status_code == 404
+    # いいねとカウンタは purge まで残る
+    assert Like.objects.filter(post_id=post.post_id).count() == 3
+    assert _stats(user).total_likes_received == 3
+
+    counts = deletion.purge(batch_size=2)
+
+    assert counts == {"posts": 1, "likes": 3}
+    assert not Post.all_objects.filter(pk=post.post_id).exists()
+    assert not Like.objects.filter(post_id=post.post_id).exists()
+    assert _stats(user).total_likes_received == 0
+    assert _stats(user).post_count == 0
+    assert [_stats(liker).total_likes_given for liker in likers] == [0, 0, 0]
+    assert not AuthorLikeBucket.objects.filter(author=user, count__gt=0).exists()
+
+
+@pytest.mark.django_db
+def test_soft_deleted_post_leaves_like_lists(api_client, user, another_user):
+    kept = PostFactory(user=user, context="kept")
+    gone = PostFactory(user=user, context="gone")
+    for post in (kept, gone):
+        _like(api_client, another_user, post)
+
+    deletion.soft_delete_post(gone)
+
+    liked = api_client.get(f"/api/users/{another_user.user_id}/liked-posts/")
+    assert [post["context"] for post in liked.data["results"]] == ["kept"]
+    likes = api_client.get("/api/likes/", {"user_id": another_user.user_id})
+    assert [like["post"]["context"] for like in likes.data] == ["kept"]
+
+@pytest.mark.django_db
+def test_user_delete_hides_account_and_revokes_credentials(api_client, user):
+    post = PostFactory(user=user)
+    token = Token.objects.create(user=user)
+
+    api_client.force_authenticate(user=user)
+    assert api_client.delete(f"/api/users/{user.user_id}/").status_code == 204
+
+    api_client.force_authenticate(user=None)
+    assert api_client.get(f"/api/users/{user.user_id}/").status_code == 404
+    assert api_client.get(f"/api/posts/{post.post_id}/").status_code == 404
+    assert not Token.objects.filter(key=token.key).exists()
+    deleted = CustomUser.all_objects.get(pk=user.user_id)
+    assert deleted.is_active is False
+    # 同じユーザ名・メールで再登録できる
+    UserFactory(username="user1")
+
+
+@pytest.mark.django_db
+def test_deleted_username_prefix_is_reserved(api_client, user, another_user):
+    response = api_client.post(
+        "/api/users/",
+        {"username": f"deleted-{another_user.user_id}", "user_mail": "new@example.com", "password": "pw"},
+    )
+    assert response.status_code == 400
+    assert "username" in response.data
+
+    api_client.force_authenticate(user=user)
+    response = api_client.patch(f"/api/users/{user.user_id}/", {"username": "deleted-999"})
+    assert response.status_code == 400
+
+    deletion.soft_delete_user(another_user)
+    assert CustomUser.all_objects.get(pk=another_user.user_id).username == f"deleted-{another_user.user_id}"
+
+
+@pytest.mark.django_db
+def test_user_delete_drops_cached_posts(api_client, user, django_capture_on_commit_callbacks):
+    post = PostFactory(user=user)
+    url = f"/api/posts/batch/?ids={post.post_id}"
+    assert api_client.get(url).data["results"][0]["user"]["username"] == user.username
+
+    with django_capture_on_commit_callbacks(execute=True):
+        deletion.soft_delete_user(user)
+
+    assert api_client.get(url).data["missing_ids"] == [post.post_id]
+
+@pytest.mark.django_db
+def test_user_purge_adjusts_everyone_affected(api_client, user, another_user):
+    own_post = PostFactory(user=user)
+    other_post = PostFactory(user=another_user)
+    fan = UserFactory(username="fan")
+    _like(api_client, fan, own_post)
+    _like(api_client, user, other_post)
+    api_client.force_authenticate(user=user)
+    api_client.post("/api/follows/", {"aim_user_id": another_user.user_id})
+    api_client.force_authenticate(user=fan)
+    api_client.post("/api/follows/", {"aim_user_id": user.user_id})
+
+    deletion.soft_delete_user(user)
+    call_command("purge_deleted", "--batch-size", "1")
+
+    assert not CustomUser.all_objects.filter(pk=user.user_id).exists()
+    assert not Post.all_objects.filter(user_id=user.user_id).exists()
+    assert not Follow.objects.filter(user_id=user.user_id).exists()
+    other_post.refresh_from_db()
+    assert other_post.like_count == 0
+    assert _stats(another_user).total_likes_received == 0
+    assert _stats(another_user).follower_count == 0
+    assert _stats(fan).total_likes_given == 0
+    assert _stats(fan).following_count == 0
+
+
+@pytest.mark.django_db
+def test_purged_counters_are_visible_through_profile_cache(api_client, user, another_user):
+    post = PostFactory(user=user)
+    _like(api_client, another_user, post)
+    url = f"/api/users/{another_user.user_id}/"
+    assert api_client.get(url).data["stats"]["total_likes_given"] == 1
+
+    deletion.soft_delete_post(post)
+    deletion.purge()
+
+    assert api_client.get(url).data["stats"]["total_likes_given"] == 0
+
+
+@pytest.mark.django_db
+def test_purge_subtracts_likes_from_compacted_buckets(user, another_user):
+    kept = PostFactory(user=user)
+    gone = PostFactory(user=user)
+    fan = UserFactory(username="fan")
+    liked_at = timezone.now() - timedelta(days=3)
+    for post, liker in ((gone, another_user), (gone, fan), (kept, another_user)):
+        like = LikeFactory(user=liker, post=post)
+        Like.objects.filter(pk=like.pk).update(created_at=liked_at)
+        like_rollups.record_like(post, liked_at)
+    like_rollups.compact()
+
+    deletion.soft_delete_post(gone)
+    deletion.purge(batch_size=1)
+
+    daily = [(LikeBucketBase.DAILY, like_rollups.day_start(liked_at), 1)]
+    # 日次にまとめたバケットはそのまま減らし、1 時間バケットに戻さない
+    assert sorted(
+        AuthorLikeBucket.objects.filter(author=user).values_list("granularity", "bucket_start", "count")
+    ) == daily
+    assert sorted(
+        PostLikeBucket.objects.filter(post=kept).values_list("granularity", "bucket_start", "count")
+    ) == daily
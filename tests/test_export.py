@@ -0,0 +1,148 @@
+import asyncio
+import gzip
+import json
+from datetime import timedelta
+
+import pytest
+from asgiref.sync import async_to_sync
+from django.core.handlers.asgi import ASGIHandler
+from django.core.management import call_command
+from django.utils import timezone
+from rest_framework.authtoken.models import Token
+
+from api.services import deletion, export
+
+from .factories import LikeFactory, PostFactory, UserFactory
+
+
+def _lines(content: bytes) -> list:
+    return [json.loads(line) for line in content.decode().splitlines()]
+
+
+@pytest.fixture
+def staff(db):
+    return UserFactory(username="staff", is_staff=True)
+
+
+@pytest.mark.django_db
+def test_export_is_staff_only(api_client, user):
+    assert api_client.get("/api/export/posts/").status_code == 401
+    api_client.force_authenticate(user=user)
+    assert api_client.get("/api/export/posts/").status_code == 403
+
+
+@pytest.mark.django_db
+def test_export_streams_ndjson_since_id(api_client, staff, user, another_user):
+    posts = PostFactory.create_batch(3, user=another_user)
+    likes = [LikeFactory(user=user, post=post) for post in posts]
+    api_client.force_authenticate(user=staff)
+
+    response = api_client.get("/api/export/likes/")
+    assert response.streaming
+    assert response["Content-Type"] == "application/x-ndjson"
+    rows = _lines(b"".join(response.streaming_content))
+    assert [row["id"] for row in rows] == [like.id for like in likes]
+    assert rows[0]["post_id"] == posts[0].post_id
+
+    response = api_client.get("/api/export/likes/", {"since_id": likes[0].id})
+    assert [row["id"] for row in _lines(b"".join(response.streaming_content))] == [
+        like.id for like in likes[1:]
+    ]
+
+
+@pytest.mark.django_db
+def test_export_gzip_and_since_timestamp(api_client, staff, user):
+    now = timezone.now()
+    PostFactory(user=user, context="old", time=now - timedelta(days=2))
+    PostFactory(user=user, context="new", time=now)
+    api_client.force_authenticate(user=staff)
+
+    response = api_client.get(
+        "/api/export/posts/", {"gzip": "1", "since": (now - timedelta(days=1)).isoformat()}
+    )
+
+    assert response["Content-Disposition"] == 'attachment; filename="posts.ndjson.gz"'
+    rows = _lines(gzip.decompress(b"".join(response.streaming_content)))
+    assert [row["context"] for row in rows] == ["new"]
+
+
+@pytest.mark.django_db
+def test_export_rejects_unknown_table_and_bad_filters(api_client, staff):
+    api_client.force_authenticate(user=staff)
+    assert api_client.get("/api/export/sessions/").status_code == 404
+    assert api_client.get("/api/export/posts/", {"since": "yesterday"}).status_code == 400
+
+
+@pytest.mark.django_db
+def test_export_command_writes_gzipped_file(tmp_path, user, another_user):
+    path = tmp_path / "user_stats.ndjson.gz"
+
+    call_command("export_data", "user_stats", "--gzip", "--output", str(path))
+
+    rows = _lines(gzip.decompress(path.read_bytes()))
+    by_user = {row["user_id"]: row for row in rows}
+    assert set(by_user) == {user.user_id, another_user.user_id}
+    assert "updated_at" in by_user[user.user_id]
+
+
+def _asgi_get(path, headers):
+    """Run one GET through Django's ASGI handler; returns (status, body chunks)."""
+    scope = {
+        "type": "http",
+        "asgi": {"version": "3.0"},
+        "http_version": "1.1",
+        "method": "GET",
+        "scheme": "http",
+        "path": path,
+        "raw_path": path.encode(),
+        "query_string": b"",
+        "root_path": "",
+        "headers": [(b"host", b"testserver"), *headers],
+        "server": ("testserver", 80),
+        "client": ("127.0.0.1", 12345),
+    }
+    messages = []
+    requests = [{"type": "http.request", "body": b"", "more_body": False}]
+
+    async def receive():
+        if requests:
+            return requests.pop()
+        # 切断は送らない（ハンドラがレスポンス送信後にキャンセルする）
+        await asyncio.Event().wait()
+
+    async def send(message):
+        messages.append(message)
+
+    async_to_sync(ASGIHandler())(scope, receive, send)
+    status = messages[0]["status"]
+    return status, [m["body"] for m in messages[1:] if m.get("body")]
+
+
+@pytest.mark.django_db
+def test_export_streams_async_under_asgi(staff, user, monkeypatch):
+    monkeypatch.setattr(export, "BUFFER_BYTES", 1)
+    posts = PostFactory.create_batch(3, user=user)
+    token = Token.objects.create(user=staff)
+
+    def unexpected(*args, **kwargs):
+        raise AssertionError("ASGI では同期ストリームを使わない")
+
+    monkeypatch.setattr(export, "stream", unexpected)
+    status, chunks = _asgi_get("/api/export/posts/", [(b"authorization", f"Token {token.key}".encode())])
+
+    assert status == 200
+    # 行ごとに別のチャンクとして送られる（全体をまとめて読み込んでいない）
+    assert len(chunks) >= 3
+    assert [row["post_id"] for row in _lines(b"".join(chunks))] == [post.post_id for post in posts]
+
+
+@pytest.mark.django_db
+def test_export_skips_likes_of_soft_deleted_posts(user, another_user):
+    kept, gone = PostFactory.create_batch(2, user=another_user)
+    LikeFactory(user=user, post=kept)
+    LikeFactory(user=user, post=gone)
+
+    deletion.soft_delete_post(gone)
+
+    rows = _lines(b"".join(export.stream("likes")))
+    assert [row["post_id"] for row in rows] == [kept.post_id]
@@ -0,0 +1,76 @@
+import pytest
+
+from accounts.models import DeviceToken
+from post.models import Like, Post
+
+from .factories import PostFactory, UserFactory
+
+
+@pytest.mark.django_db
+def test_retried_post_create_is_replayed(api_client, user):
+    api_client.force_authenticate(user=user)
+    headers = {"HTTP_IDEMPOTENCY_KEY": "post-1"}
+    first = api_client.post("/api/posts/", {"context": "hello"}, **headers)
+    assert first.status_code == 201
+
+    second = api_client.post("/api/posts/", {"context": "hello"}, **headers)
+    assert second.status_code == 201
+    assert second["Idempotent-Replayed"] == "true"
+    assert second.data == first.data
+    assert Post.objects.filter(user=user).count() == 1
+    user.stats.refresh_from_db()
+    assert user.stats.post_count == 1
+
+
+@pytest.mark.django_db
+def test_replay_costs_no_queries(api_client, user, another_user, django_assert_num_queries):
+    post = PostFactory(user=another_user)
+    api_client.force_authenticate(user=user)
+    headers = {"HTTP_IDEMPOTENCY_KEY": "like-1"}
+    assert api_client.post("/api/likes/", {"post_id": post.post_id}, **headers).status_code == 201
+
+    with django_assert_num_queries(0):
+        response = api_client.post("/api/likes/", {"post_id": post.post_id}, **headers)
+    assert response.status_code == 201
+    assert Like.objects.filter(post=post).count() == 1
+
+
+@pytest.mark.django_db
+def test_keys_are_scoped_per_user_and_checked_against_the_body(api_client, user, another_user):
+    target = UserFactory(username="idem-target")
+    api_client.force_authenticate(user=user)
+    headers = {"HTTP_IDEMPOTENCY_KEY": "follow-1"}
+    assert api_client.post("/api/follows/", {"aim_user_id": target.user_id}, **headers).status_code == 201
+
+    response = api_client.post("/api/follows/", {"aim_user_id": another_user.user_id}, **headers)
+    assert response.status_code == 422
+
+    api_client.force_authenticate(user=another_user)
+    response = api_client.post("/api/follows/", {"aim_user_id": target.user_id}, **headers)
+    assert response.status_code == 201
+    assert "Idempotent-Replayed" not in response
+
+
+@pytest.mark.django_db
+def test_error_responses_are_replayed_but_not_server_errors(api_client, user):
+    api_client.force_authenticate(user=user)
+    headers = {"HTTP_IDEMPOTENCY_KEY": "device-1"}
+    body = {"token": "fcm-token", "platform": "web"}
+    assert api_client.post("/api/device-token/", body, **headers).status_code == 400
+    response = api_client.post("/api/device-token/", body, **headers)
+    assert response.status_code == 400
+    assert response["Idempotent-Replayed"] == "true"
+
+    headers = {"HTTP_IDEMPOTENCY_KEY": "device-2"}
+    body = {"token": "fcm-token", "platform": "ios"}
+    assert api_client.post("/api/device-token/", body, **headers).status_code == 201
+    assert api_client.post("/api/device-token/", body, **headers).status_code == 201
+    assert DeviceToken.objects.filter(token="fcm-token").count() == 1
+
+
+@pytest.mark.django_db
+def test_requests_without_key_are_processed_every_time(api_client, user):
+    api_client.force_authenticate(user=user)
+    api_client.post("/api/posts/", {"context": "a"})
+    api_client.post("/api/posts/", {"context": "a"})
+    assert Post.objects.filter(user=user).count() == 2
@@ -1,4 +1,8 @@
 import pytest
+from django.core.cache import cache
+
+from api.services import object_cache
+from post.models import Post
 
 from .factories import LikeFactory, PostFactory, UserFactory
 
@@ -101,3 +105,61 @@ def test_timeline_includes_is_liked(api_client, user):
     results = response.data["results"]
     liked_entry = next(item for item in results if item["post_id"] == liked_post.post_id)
     assert liked_entry["is_liked"] is True
+
+
+@pytest.mark.django_db
+def test_liked_posts_keyset_pagination(api_client, user):
+    posts = [PostFactory(context=f"liked {i}") for i in range(5)]
+    for post in posts:
+        LikeFactory(user=user, post=post)
+
+    response = api_client.get(f"/api/users/{user.user_id}/liked-posts/", {"page_size": 2})
+    contexts = [item["context"] for item in response.data["results"]]
+    while response.data["next"]:
+        response = api_client.get(response.data["next"])
+        contexts += [item["context"] for item in response.data["results"]]
+
+    assert contexts == [f"liked {i}" for i in reversed(range(5))]
+
+
+@pytest.mark.django_db
+def test_like_list_paginates_only_when_requested(api_client, user):
+    post = PostFactory()
+    for _ in range(3):
+        LikeFactory(post=post)
+    LikeFactory(user=user, post=post)
+
+    response = api_client.get("/api/likes/", {"post_id": post.post_id})
+    assert len(response.data) == 4
+
+    response = api_client.get("/api/likes/", {"post_id": post.post_id, "page_size": 3})
+    assert len(response.data["results"]) == 3
+    assert response.data["results"][0]["user"]["user_id"] == user.user_id
+    response = api_client.get(response.data["next"])
+    assert len(response.data["results"]) == 1
+    assert response.data["next"] is None
+
+
+@pytest.mark.django_db
+def test_like_drops_post_cached_before_commit(
+    api_client, user, another_user, monkeypatch, django_capture_on_commit_callbacks
+):
+    post = PostFactory(user=another_user)
+    key = object_cache.cache_key(Post, post.post_id)
+    invalidate = object_cache.invalidate
+
+    def invalidate_then_reread(model, *pks):
+        invalidate(model, *pks)
+        # コミット前に別のリクエストが（古い like_count の）投稿を読んでキャッシュする
+        object_cache.get_many(Post.objects.all(), pks)
+
+    monkeypatch.setattr(object_cache, "invalidate", invalidate_then_reread)
+    api_client.force_authenticate(user=user)
+    with django_capture_on_commit_callbacks() as callbacks:
+        assert api_client.post("/api/likes/", {"post_id": post.post_id}).status_code == 201
+    assert cache.get(key) is not None
+
+    monkeypatch.undo()
+    for callback in callbacks:
+        callback()
+    assert cache.get(key) is None
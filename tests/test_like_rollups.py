@@ -0,0 +1,101 @@
+from datetime import datetime, timedelta, timezone as dt_timezone
+
+import pytest
+from django.core.management import call_command
+
+from api.services import like_rollups
+from post.models import AuthorLikeBucket, LikeBucketBase, PostLikeBucket
+
+from .factories import LikeFactory, PostFactory, UserFactory
+
+NOW = datetime(2026, 5, 10, 12, 30, tzinfo=dt_timezone.utc)
+
+
+def _counts(model, **filters):
+    return sorted(
+        model.objects.filter(**filters).values_list("granularity", "bucket_start", "count")
+    )
+
+
+@pytest.mark.django_db
+def test_like_and_unlike_update_post_and_author_buckets(api_client, user, another_user):
+    post = PostFactory(user=another_user)
+    api_client.force_authenticate(user=user)
+
+    response = api_client.post("/api/likes/", {"post_id": post.post_id}, format="json")
+    assert response.status_code == 201
+    assert PostLikeBucket.objects.get(post=post).count == 1
+    assert AuthorLikeBucket.objects.get(author=another_user).count == 1
+
+    response = api_client.delete(f"/api/likes/{response.data['id']}/")
+    assert response.status_code == 204
+    assert PostLikeBucket.objects.get(post=post).count == 0
+    assert AuthorLikeBucket.objects.get(author=another_user).count == 0
+
+
+@pytest.mark.django_db
+def test_compact_folds_old_hourly_buckets_into_daily(settings):
+    settings.ROLLUP_HOURLY_RETENTION_HOURS = 48
+    post = PostFactory()
+    old = NOW - timedelta(days=3)
+    like_rollups.record_like(post, old.replace(hour=1))
+    like_rollups.record_like(post, old.replace(hour=5))
+    like_rollups.record_like(post, NOW)
+
+    assert like_rollups.compact(NOW) == 4
+
+    day = like_rollups.day_start(old)
+    assert _counts(PostLikeBucket, post=post) == [
+        (LikeBucketBase.DAILY, day, 2),
+        (LikeBucketBase.HOURLY, like_rollups.hour_start(NOW), 1),
+    ]
+    assert _counts(AuthorLikeBucket, granularity=LikeBucketBase.DAILY) == [
+        (LikeBucketBase.DAILY, day, 2)
+    ]
+
+    # 日次にまとめた後の解除は日次バケットから引く
+    like_rollups.record_unlike(post, old.replace(hour=5))
+    assert PostLikeBucket.objects.get(post=post, granularity=LikeBucketBase.DAILY).count == 1
+
+
+@pytest.mark.django_db
+def test_windowed_rankings_sum_buckets_inside_window():
+    top, other = PostFactory(), PostFactory()
+    like_rollups.record_like(top, NOW - timedelta(days=2))
+    like_rollups.record_like(top, NOW - timedelta(days=2))
+    like_rollups.record_like(other, NOW - timedelta(hours=1))
+    like_rollups.compact(NOW)
+    qs = top.__class__.objects.all()
+
+    assert [p.post_id for p in like_rollups.post_ranking(qs, "24h", NOW)] == [other.post_id]
+    ranked = list(like_rollups.post_ranking(qs, "7d", NOW))
+    assert [(p.post_id, p.window_likes) for p in ranked] == [(top.post_id, 2), (other.post_id, 1)]
+
+    authors = list(like_rollups.author_ranking(top.user.__class__.objects.all(), "7d", NOW))
+    assert [a.user_id for a in authors] == [top.user_id, other.user_id]
+
+
+@pytest.mark.django_db
+def test_prune_deletes_expired_buckets(settings):
+    settings.ROLLUP_RETENTION_DAYS = 31
+    post = PostFactory()
+    like_rollups.record_like(post, NOW - timedelta(days=40))
+    like_rollups.record_like(post, NOW - timedelta(days=5))
+
+    assert like_rollups.prune(NOW) == 2
+    assert PostLikeBucket.objects.count() == 1
+    assert AuthorLikeBucket.objects.count() == 1
+
+
+@pytest.mark.django_db
+def test_compact_command_rebuilds_from_likes():
+    author = UserFactory()
+    post = PostFactory(user=author)
+    for _ in range(3):
+        LikeFactory(post=post)
+    PostLikeBucket.objects.all().delete()
+
+    call_command("compact_like_rollups", "--rebuild")
+
+    assert sum(PostLikeBucket.objects.filter(post=post).values_list("count", flat=True)) == 3
+    assert AuthorLikeBucket.objects.get(author=author).count == 3
@@ -0,0 +1,61 @@
+import pytest
+
+from accounts.models import UserStats
+from api.loadtest import Sample, compare, percentile, seed_dataset, summarize
+from post.models import Like, Post
+
+
+def test_percentile_nearest_rank():
+    values = list(range(1, 101))
+
+    assert percentile(values, 50) == 50
+    assert percentile(values, 95) == 95
+    assert percentile(values, 99) == 99
+    assert percentile([], 50) == 0.0
+
+
+def test_summarize_groups_by_endpoint():
+    samples = [
+        Sample("timeline_latest", 0.010, 200, 3),
+        Sample("timeline_latest", 0.030, 200, 5),
+        Sample("like_create", 0.020, 500, None),
+        Sample("like_create", 0.001, 429, 0),
+        Sample("like_create", 0.002, 400, 2),
+    ]
+
+    summary = summarize(samples, elapsed=2.0)
+
+    assert summary["timeline_latest"]["requests"] == 2
+    assert summary["timeline_latest"]["rps"] == 1.0
+    assert summary["timeline_latest"]["avg_queries"] == 4
+    assert summary["like_create"]["errors"] == 1
+    assert summary["like_create"]["throttled"] == 1
+    assert summary["like_create"]["client_errors"] == 1
+
+
+@pytest.mark.django_db
+def test_seed_dataset_keeps_counters_consistent():
+    dataset = seed_dataset(users=10, posts=30, follows_per_user=3, likes_per_user=5, seed=1)
+
+    assert len(dataset.user_ids) == 10
+    assert len(dataset.post_ids) == 30
+    assert set(dataset.tokens) == set(dataset.user_ids)
+    assert dataset.hot_post_id == dataset.post_ids[0]
+    for post in Post.objects.all():
+        assert post.like_count == Like.objects.filter(post=post).count()
+    for stats in UserStats.objects.all():
+        assert stats.total_likes_given == Like.objects.filter(user_id=stats.user_id).count()
+        assert stats.following_count == 3
+
+
+def test_compare_reports_deltas_per_endpoint():
+    baseline = summarize([Sample("timeline_latest", 0.040, 200, 3)], elapsed=1.0)
+    current = summarize(
+        [Sample("timeline_latest", 0.010, 200, 3), Sample("timeline_latest", 0.010, 200, 3)],
+        elapsed=1.0,
+    )
+
+    deltas = compare(baseline, current)
+
+    assert deltas["timeline_latest"]["rps"] == 1.0
+    assert deltas["timeline_latest"]["p50_ms"] == pytest.approx(-30.0)
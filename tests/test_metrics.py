@@ -0,0 +1,118 @@
+import json
+import os
+import threading
+import time
+
+import pytest
+
+from api import metrics
+
+from .factories import PostFactory
+
+
+def test_render_histogram_and_counter():
+    snapshot = {
+        "pid": 1,
+        "flushed_at": time.time(),
+        "counters": [["cache_requests_total", [["cache", "profile"], ["result", "hit"]], 3],
+                     ["cache_requests_total", [["cache", "profile"], ["result", "miss"]], 1]],
+        "histograms": [
+            ["http_request_duration_seconds", [["view", "timeline"]],
+             [1] + [0] * (len(metrics.DEFAULT_BUCKETS) - 1) + [1, 0.5]],
+        ],
+        "gauges": [],
+    }
+
+    text = metrics.render([snapshot])
+
+    assert '# TYPE http_request_duration_seconds histogram' in text
+    assert 'http_request_duration_seconds_bucket{view="timeline",le="0.005"} 1' in text
+    assert 'http_request_duration_seconds_bucket{view="timeline",le="+Inf"} 2' in text
+    assert 'http_request_duration_seconds_count{view="timeline"} 2' in text
+    assert 'cache_hit_ratio{cache="profile"} 0.75' in text
+    assert 'metrics_flush_lag_seconds{pid="1"}' in text
+
+
+def test_multiprocess_snapshots_are_merged(settings, tmp_path):
+    settings.METRICS_MULTIPROC_DIR = str(tmp_path)
+    other = {
+        "pid": os.getpid() + 1,
+        "flushed_at": time.time(),
+        "counters": [["notification_sends_total", [["result", "success"]], 5]],
+        "histograms": [],
+        "gauges": [],
+    }
+    (tmp_path / f"metrics_{other['pid']}.json").write_text(json.dumps(other))
+    metrics.inc("notification_sends_total", result="success")
+
+    snapshots = metrics.collect()
+
+    assert {data["pid"] for data in snapshots} == {os.getpid(), other["pid"]}
+    text = metrics.render(snapshots)
+    line = next(l for l in text.splitlines() if l.startswith('notification_sends_total{result="success"}'))
+    assert int(float(line.split()[-1])) >= 6
+
+
+@pytest.mark.django_db
+def test_metrics_endpoint_reports_view_latency(api_client, settings):
+    settings.METRICS_TOKEN = None
+    PostFactory()
+    api_client.get("/api/timeline/")
+
+    response = api_client.get("/metrics")
+
+    assert response.status_code == 200
+    body = response.content.decode()
+    assert 'http_request_duration_seconds_count{method="GET",view="timeline"}' in body
+    assert 'db_queries_per_request_bucket{view="timeline"' in body
+    assert 'serializer_duration_seconds_count{serializer="PostSerializer"}' in body
+
+
+@pytest.mark.django_db
+def test_metrics_endpoint_requires_token_when_configured(api_client, settings):
+    settings.METRICS_TOKEN = "secret"
+
+    assert api_client.get("/metrics").status_code == 401
+    assert api_client.get("/metrics", HTTP_AUTHORIZATION="Bearer secret").status_code == 200
+
+
+def test_pool_stats_are_exported_as_gauges(monkeypatch):
+    class FakePool:
+        def get_stats(self):
+            return {"pool_size": 8, "pool_available": 5, "requests_waiting": 1, "requests_num": 42}
+
+    class FakeConnection:
+        alias = "default"
+        pool = FakePool()
+
+    monkeypatch.setattr("django.db.connections.all", lambda: [FakeConnection()])
+
+    text = metrics.render([metrics.snapshot()])
+
+    assert 'db_pool_size{database="default",pid="%d"} 8' % os.getpid() in text
+    assert 'db_pool_available{database="default",pid="%d"} 5' % os.getpid() in text
+    assert 'db_pool_requests_waiting{database="default",pid="%d"} 1' % os.getpid() in text
+
+
+def test_query_counts_use_their_own_buckets():
+    metrics.observe("db_queries_per_request", 30, view="query_buckets")
+
+    text = metrics.render([metrics.snapshot()])
+
+    assert 'db_queries_per_request_bucket{view="query_buckets",le="20.0"} 0' in text
+    assert 'db_queries_per_request_bucket{view="query_buckets",le="50.0"} 1' in text
+
+
+def test_finished_thread_shards_are_folded():
+    def record():
+        metrics.inc("http_requests_total", view="shard_fold")
+
+    for _ in range(5):
+        thread = threading.Thread(target=record)
+        thread.start()
+        thread.join()
+
+    text = metrics.render([metrics.snapshot()])
+
+    assert all(thread.is_alive() for thread, _ in metrics._shards)
+    assert 'http_requests_total{view="shard_fold"} 5' in text
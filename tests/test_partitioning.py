@@ -0,0 +1,61 @@
+from datetime import datetime, timezone as dt_timezone
+
+import pytest
+from django.core.management import CommandError, call_command
+
+from api.services import partitioning
+
+from .factories import LikeFactory, PostFactory
+
+
+def test_month_arithmetic_wraps_years():
+    start = partitioning.month_start(datetime(2026, 11, 19, 8, tzinfo=dt_timezone.utc))
+
+    assert start == datetime(2026, 11, 1, tzinfo=dt_timezone.utc)
+    assert partitioning.add_months(start, 2) == datetime(2027, 1, 1, tzinfo=dt_timezone.utc)
+    assert partitioning.partition_name("post", start) == "post_p202611"
+
+
+def test_create_partition_sql_covers_one_month():
+    sql = partitioning.create_partition_sql("like", datetime(2026, 12, 1, tzinfo=dt_timezone.utc))
+
+    assert sql == (
+        'CREATE TABLE IF NOT EXISTS "like_p202612" PARTITION OF "like" '
+        "FOR VALUES FROM ('2026-12-01T00:00:00+00:00') TO ('2027-01-01T00:00:00+00:00')"
+    )
+
+
+def test_latest_ordering_uses_partition_key_when_enabled(settings):
+    settings.POST_PARTITIONING = False
+    assert partitioning.latest_ordering() == ("-post_id",)
+
+    settings.POST_PARTITIONING = True
+    assert partitioning.latest_ordering() == ("-time", "-post_id")
+
+
+@pytest.mark.django_db
+def test_timeline_orders_by_time_when_partitioned(api_client, user, settings):
+    settings.POST_PARTITIONING = True
+    newer = PostFactory(user=user, time=datetime(2026, 5, 2, tzinfo=dt_timezone.utc))
+    older = PostFactory(user=user, time=datetime(2026, 5, 1, tzinfo=dt_timezone.utc))
+
+    response = api_client.get("/api/timeline/", {"tab": "latest"})
+
+    assert response.status_code == 200
+    assert [item["post_id"] for item in response.data["results"]] == [
+        newer.post_id,
+        older.post_id,
+    ]
+
+
+@pytest.mark.django_db
+def test_like_copies_post_time(user):
+    post = PostFactory(time=datetime(2026, 3, 4, tzinfo=dt_timezone.utc))
+
+    assert LikeFactory(user=user, post=post).post_time == post.time
+
+
+@pytest.mark.django_db
+def test_partition_tables_requires_postgres():
+    with pytest.raises(CommandError):
+        call_command("partition_tables")
@@ -0,0 +1,93 @@
+import threading
+
+import pytest
+from django.core.cache import cache
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+
+from accounts.models import CustomUser
+from api.services import profile_cache
+from api.views import CustomUserViewSet
+
+from .factories import PostFactory
+
+
+@pytest.mark.django_db
+def test_profile_is_served_from_cache_until_stats_change(api_client, user, another_user):
+    post = PostFactory(user=another_user)
+    url = f"/api/users/{another_user.user_id}/"
+    assert api_client.get(url).data["stats"]["total_likes_received"] == 0
+
+    api_client.force_authenticate(user=user)
+    assert api_client.post("/api/likes/", {"post_id": post.post_id}).status_code == 201
+
+    response = api_client.get(url)
+    assert response.data["stats"]["total_likes_received"] == 1
+    assert response.data["is_following"] is False
+
+
+@pytest.mark.django_db
+def test_user_save_bumps_profile_version(api_client, user):
+    url = f"/api/users/{user.user_id}/"
+    api_client.get(url)
+    user.user_bio = "changed"
+    user.save()
+
+    assert api_client.get(url).data["user_bio"] == "changed"
+
+
+@pytest.mark.django_db
+def test_missing_profile_returns_404(api_client):
+    assert api_client.get("/api/users/999999/").status_code == 404
+
+
+@pytest.mark.django_db
+def test_profile_miss_loads_through_get_object(api_client, user, monkeypatch):
+    url = f"/api/users/{user.user_id}/"
+    monkeypatch.setattr(CustomUserViewSet, "get_queryset", lambda self: CustomUser.objects.none())
+    assert api_client.get(url).status_code == 404
+
+    monkeypatch.undo()
+    first = api_client.get(url)
+    with CaptureQueriesContext(connection) as captured:
+        second = api_client.get(url)
+
+    assert second.data == first.data
+    assert not [query for query in captured.captured_queries if "accounts_customuser" in query["sql"]]
+
+
+@pytest.mark.django_db
+def test_post_author_embedding_shares_profile_cache(api_client, user):
+    PostFactory(user=user)
+    api_client.get(f"/api/users/{user.user_id}/")
+    version = profile_cache.get_versions([user.user_id])[user.user_id]
+
+    response = api_client.get("/api/timeline/")
+
+    assert response.data["results"][0]["user"]["username"] == user.username
+    assert cache.get(profile_cache.payload_key(user.user_id, version)) is not None
+
+
+def test_get_or_build_waits_for_concurrent_builder():
+    version = profile_cache.get_versions([424242])[424242]
+    key = profile_cache.payload_key(424242, version)
+    cache.add(f"{key}:lock", 1, 5)
+    builds = []
+
+    def finish_other_build():
+        profile_cache.store(424242, version, {"username": "built elsewhere"})
+
+    timer = threading.Timer(0.05, finish_other_build)
+    timer.start()
+    payload = profile_cache.get_or_build(424242, lambda: builds.append(1) or {"username": "mine"})
+    timer.join()
+
+    assert payload == {"username": "built elsewhere"}
+    assert builds == []
+
+
+def test_bump_changes_version():
+    before = profile_cache.get_versions([7])[7]
+    profile_cache.bump(7)
+
+    assert profile_cache.get_versions([7])[7] == before + 1
@@ -0,0 +1,79 @@
+import threading
+import time
+
+import pytest
+from rest_framework.authtoken.models import Token
+
+from api import profiling
+from api.profiling import SamplingProfiler, read_profile, store_profile
+
+from .factories import PostFactory, UserFactory
+
+
+def _busy_wait(seconds):
+    deadline = time.perf_counter() + seconds
+    while time.perf_counter() < deadline:
+        pass
+
+
+def test_sampling_profiler_collects_collapsed_stacks():
+    profiler = SamplingProfiler(threading.get_ident(), interval=0.001).start()
+    _busy_wait(0.05)
+    stacks = profiler.stop()
+
+    assert sum(stacks.values()) > 0
+    assert any(stack.endswith("tests.test_profiling:_busy_wait") for stack in stacks)
+
+
+def test_store_profile_merges_counts(settings, tmp_path):
+    settings.PROFILING_OUTPUT_DIR = str(tmp_path)
+
+    store_profile("post-list", {"a;b": 2})
+    path = store_profile("post-list", {"a;b": 1, "a;c": 4})
+
+    assert read_profile(path) == {"a;b": 3, "a;c": 4}
+
+
+@pytest.mark.django_db
+def test_profile_header_is_honoured_for_staff_only(api_client, settings, tmp_path):
+    settings.PROFILING_OUTPUT_DIR = str(tmp_path)
+    settings.PROFILING_INTERVAL = 0.0005
+    PostFactory()
+
+    api_client.force_authenticate(user=UserFactory())
+    response = api_client.get("/api/timeline/", HTTP_X_PROFILE="1")
+    assert "X-Profile-Samples" not in response
+    assert not list(tmp_path.iterdir())
+
+    staff = UserFactory(is_staff=True)
+    api_client.force_authenticate(user=staff)
+    response = api_client.get("/api/timeline/", HTTP_X_PROFILE="1")
+    assert "X-Profile-Samples" in response
+    assert (tmp_path / "timeline.collapsed").exists()
+
+    listing = api_client.get("/api/profiles/")
+    assert [row["endpoint"] for row in listing.data["profiles"]] == ["timeline"]
+    download = api_client.get("/api/profiles/timeline/")
+    assert download.status_code == 200
+    assert download["Content-Type"].startswith("text/plain")
+
+
+@pytest.mark.django_db
+def test_profiles_require_staff(api_client, user):
+    api_client.force_authenticate(user=user)
+
+    assert api_client.get("/api/profiles/").status_code == 403
+
+
+@pytest.mark.django_db
+def test_profile_header_from_non_staff_token_never_starts_sampler(client, monkeypatch, user):
+    started = []
+    monkeypatch.setattr(profiling.SamplingProfiler, "start", lambda self: started.append(self))
+    token = Token.objects.create(user=user)
+
+    response = client.get(
+        "/api/timeline/", HTTP_X_PROFILE="1", HTTP_AUTHORIZATION=f"Token {token.key}"
+    )
+
+    assert response.status_code == 200
+    assert started == []
@@ -0,0 +1,123 @@
+"""
+Declared query budgets for every API endpoint.
+
+Budgets are for a full page of N items (see the ``query_dataset`` fixture) and
+must not grow with N: a per-row query in a serializer breaks them immediately.
+"""
+
+import pytest
+
+from follow.models import Follow
+from post.models import Like
+
+from .factories import PostFactory, UserFactory
+from .query_budget import assert_max_queries
+
+# (name, path, params, authenticated, budget)
+LIST_BUDGETS = [
+    ("timeline-latest", "/api/timeline/", {"tab": "latest"}, True, 4),
+    ("timeline-popular", "/api/timeline/", {"tab": "popular"}, True, 4),
+    ("timeline-following", "/api/timeline/", {"tab": "following"}, True, 4),
+    ("timeline-latest-anonymous", "/api/timeline/", {"tab": "latest"}, False, 2),
+    ("liked-posts", "/api/users/{user_id}/liked-posts/", {}, True, 4),
+    ("ranking-posts", "/api/rankings/posts/likes/", {}, True, 4),
+    ("ranking-posts-24h", "/api/rankings/posts/likes/", {"range": "24h"}, True, 4),
+    ("ranking-posts-7d", "/api/rankings/posts/likes/", {"range": "7d"}, True, 4),
+    ("ranking-users-total-likes", "/api/rankings/users/total-likes/", {}, True, 4),
+    (
+        "ranking-users-total-likes-7d",
+        "/api/rankings/users/total-likes/",
+        {"range": "7d"},
+        True,
+        4,
+    ),
+    ("ranking-users-level", "/api/rankings/users/level/", {}, True, 4),
+    ("ranking-users-followers", "/api/rankings/users/followers/", {}, True, 4),
+    ("search-users", "/api/search/users/", {"q": "author"}, True, 4),
+    ("search-posts", "/api/search/posts/", {"q": "hello"}, True, 5),
+    ("post-list", "/api/posts/", {}, True, 4),
+    ("user-list", "/api/users/", {}, True, 3),
+    ("like-list", "/api/likes/", {}, True, 4),
+    ("like-list-paginated", "/api/likes/", {"page_size": 20}, True, 4),
+    ("follow-list", "/api/follows/", {}, True, 3),
+    ("follow-list-paginated", "/api/follows/", {"page_size": 20}, True, 3),
+    ("liked-status", "/api/posts/liked-status/", {"ids": "1,2,3"}, True, 1),
+    ("follow-status", "/api/follows/status/", {"ids": "1,2,3"}, True, 1),
+    ("follow-suggestions", "/api/users/suggestions/", {}, True, 4),
+]
+
+
+@pytest.mark.django_db
+@pytest.mark.parametrize(
+    "name,path,params,authenticated,budget",
+    LIST_BUDGETS,
+    ids=[row[0] for row in LIST_BUDGETS],
+)
+def test_list_endpoint_query_budget(
+    api_client, user, query_dataset, name, path, params, authenticated, budget
+):
+    if authenticated:
+        api_client.force_authenticate(user=user)
+
+    with assert_max_queries(budget):
+        response = api_client.get(path.format(user_id=user.user_id), params)
+
+    assert response.status_code == 200
+
+
+@pytest.mark.django_db
+def test_detail_endpoint_query_budgets(api_client, user, query_dataset):
+    post = query_dataset["posts"][0]
+    api_client.force_authenticate(user=user)
+
+    with assert_max_queries(4):
+        assert api_client.get(f"/api/posts/{post.post_id}/").status_code == 200
+    # プロフィールは初回にユーザと順位を読み、以降はキャッシュから返す
+    with assert_max_queries(2):
+        assert api_client.get(f"/api/users/{user.user_id}/").status_code == 200
+    with assert_max_queries(0):
+        assert api_client.get(f"/api/users/{user.user_id}/").status_code == 200
+    with assert_max_queries(0):
+        assert api_client.get("/api/users/me/").status_code == 200
+
+
+@pytest.mark.django_db
+def test_like_create_and_destroy_query_budget(api_client, user, query_dataset):
+    post = PostFactory(user=UserFactory())
+    api_client.force_authenticate(user=user)
+
+    # いいね本体は投稿の取得・INSERT ... ON CONFLICT DO NOTHING・like_count の加算の 3 文。
+    # ほかにバケット 2 行の upsert、両ユーザの stats をまとめた UPDATE 1 文、
+    # 応答用の順位・フォロー状態、投稿者の端末トークンの取得と、テストの SAVEPOINT / RELEASE
+    with assert_max_queries(11) as captured:
+        response = api_client.post("/api/likes/", {"post_id": post.post_id})
+    assert response.status_code == 201
+    assert response.data["post"]["like_count"] == 1
+    like_statements = [
+        query["sql"]
+        for query in captured.captured_queries
+        if query["sql"].startswith(('SELECT "post"', 'INSERT INTO "like"', 'UPDATE "post"'))
+    ]
+    assert len(like_statements) == 3
+
+    with assert_max_queries(9):
+        response = api_client.delete(f"/api/likes/{response.data['id']}/")
+    assert response.status_code == 204
+    assert not Like.objects.filter(user=user, post=post).exists()
+
+
+@pytest.mark.django_db
+def test_follow_create_and_destroy_query_budget(api_client, user, query_dataset):
+    target = UserFactory()
+    api_client.force_authenticate(user=user)
+
+    # おすすめユーザの再計算キューへの upsert 1 回を含む。
+    # 相手ユーザ（stats 付き）の取得と INSERT ... ON CONFLICT DO NOTHING の 2 回で存在・重複を判定する
+    with assert_max_queries(9):
+        response = api_client.post("/api/follows/", {"aim_user_id": target.pk})
+    assert response.status_code == 201
+
+    with assert_max_queries(5):
+        response = api_client.delete(f"/api/follows/{response.data['id']}/")
+    assert response.status_code == 204
+    assert not Follow.objects.filter(user=user, aim_user=target).exists()
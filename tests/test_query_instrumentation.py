@@ -0,0 +1,55 @@
+import json
+import logging
+
+import pytest
+
+from api.middleware import QueryStats, normalize_sql
+
+from .factories import PostFactory
+
+
+def test_normalize_sql_collapses_in_lists_and_numbers():
+    sql = 'SELECT * FROM "like" WHERE "user_id" = %s AND "post_id" IN (%s, %s, %s) LIMIT 21'
+
+    assert normalize_sql(sql) == (
+        'SELECT * FROM "like" WHERE "user_id" = %s AND "post_id" IN (...) LIMIT ?'
+    )
+
+
+def test_query_stats_reports_repeated_shapes():
+    stats = QueryStats(track_shapes=True)
+    execute = lambda sql, params, many, context: None  # noqa: E731
+    for _ in range(6):
+        stats(execute, "SELECT 1 FROM user_stats WHERE id = %s", (1,), False, {})
+    stats(execute, "SELECT 1 FROM post", (), False, {})
+
+    assert stats.count == 7
+    assert stats.repeated_shapes(5) == [("SELECT ? FROM user_stats WHERE id = %s", 6)]
+
+
+@pytest.mark.django_db
+def test_middleware_sets_server_timing_header(api_client):
+    PostFactory()
+
+    response = api_client.get("/api/timeline/")
+
+    assert response.status_code == 200
+    assert response["Server-Timing"].startswith("db;dur=")
+    assert "queries" in response["Server-Timing"]
+
+
+@pytest.mark.django_db
+def test_middleware_logs_sampled_request(api_client, settings, caplog):
+    settings.QUERY_INSTRUMENTATION_SAMPLE_RATE = 1.0
+    settings.QUERY_INSTRUMENTATION_N_PLUS_ONE_THRESHOLD = 1
+    for _ in range(3):
+        PostFactory()
+
+    with caplog.at_level(logging.INFO, logger="api.sql"):
+        api_client.get("/api/posts/")
+
+    record = next(r for r in caplog.records if r.name == "api.sql")
+    payload = json.loads(record.getMessage())
+    assert payload["view"] == "post-list"
+    assert payload["queries"] >= 1
+    assert payload["n_plus_one"]
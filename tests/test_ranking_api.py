@@ -2,6 +2,8 @@ import pytest
 from datetime import timedelta
 from django.utils import timezone
 
+from api.services import like_rollups
+
 from .factories import LikeFactory, PostFactory, UserFactory
 
 
@@ -19,20 +21,41 @@ def test_post_like_ranking_orders_by_like_count(api_client, user):
 
 
 @pytest.mark.django_db
-def test_post_like_ranking_supports_24h_filter(api_client, user):
-    old = PostFactory(
-        user=user, context="old", like_count=50, time=timezone.now() - timedelta(days=3)
-    )
+def test_post_like_ranking_24h_counts_likes_within_window(api_client, user):
+    old_post = PostFactory(user=user, context="old", like_count=50)
     recent = PostFactory(user=user, context="recent", like_count=5)
-    PostFactory(user=user, context="recent2", like_count=10)
+    recent2 = PostFactory(user=user, context="recent2", like_count=1)
+    like_rollups.record_like(old_post, timezone.now() - timedelta(days=3))
+    like_rollups.record_like(recent)
+    for _ in range(2):
+        like_rollups.record_like(recent2)
 
     response = api_client.get("/api/rankings/posts/likes/", {"range": "24h"})
 
     assert response.status_code == 200
-    contexts = [item["context"] for item in response.data["results"]]
-    assert "old" not in contexts
-    assert contexts[0] == "recent2"
-    assert recent.post_id in [item["post_id"] for item in response.data["results"]]
+    assert [item["context"] for item in response.data["results"]] == ["recent2", "recent"]
+
+    response = api_client.get("/api/rankings/posts/likes/", {"range": "7d"})
+
+    assert [item["context"] for item in response.data["results"]] == ["recent2", "recent", "old"]
+
+
+@pytest.mark.django_db
+def test_user_total_likes_ranking_with_range(api_client):
+    first = UserFactory()
+    second = UserFactory()
+    like_rollups.record_like(PostFactory(user=first), timezone.now() - timedelta(days=10))
+    like_rollups.record_like(PostFactory(user=second))
+
+    response = api_client.get("/api/rankings/users/total-likes/", {"range": "7d"})
+
+    assert response.status_code == 200
+    assert [item["username"] for item in response.data["results"]] == [second.username]
+
+    response = api_client.get("/api/rankings/users/total-likes/", {"range": "30d"})
+
+    usernames = [item["username"] for item in response.data["results"]]
+    assert set(usernames) == {first.username, second.username}
 
 
 @pytest.mark.django_db
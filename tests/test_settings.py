@@ -0,0 +1,43 @@
+import runpy
+import sys
+from pathlib import Path
+
+import pytest
+from django.core.exceptions import ImproperlyConfigured
+
+SETTINGS_PATH = Path(__file__).resolve().parent.parent / "short_app" / "settings.py"
+
+
+def _load_settings(monkeypatch, **env):
+    for name in ("USE_SQLITE", "DATABASE_URL", "DATABASE_REPLICA_URLS", "DB_POOL_ENABLED"):
+        monkeypatch.delenv(name, raising=False)
+    for name, value in env.items():
+        monkeypatch.setenv(name, value)
+    return runpy.run_path(str(SETTINGS_PATH))
+
+
+def test_postgres_settings_enable_the_pool(monkeypatch):
+    pytest.importorskip("psycopg_pool", reason="psycopg[pool] (psycopg 3) is not installed")
+
+    values = _load_settings(monkeypatch, WEB_THREADS="4")
+
+    database = values["DATABASES"]["default"]
+    assert database["OPTIONS"]["pool"]["max_size"] == 4
+    assert database["OPTIONS"]["pool"]["check"] is values["ConnectionPool"].check_connection
+    assert database["CONN_MAX_AGE"] == 0
+
+
+def test_pool_defaults_off_without_psycopg3(monkeypatch):
+    monkeypatch.setitem(sys.modules, "psycopg_pool", None)
+
+    database = _load_settings(monkeypatch)["DATABASES"]["default"]
+
+    assert "pool" not in database["OPTIONS"]
+    assert database["CONN_MAX_AGE"] == 600
+
+
+def test_explicit_pool_without_psycopg3_fails_fast(monkeypatch):
+    monkeypatch.setitem(sys.modules, "psycopg_pool", None)
+
+    with pytest.raises(ImproperlyConfigured):
+        _load_settings(monkeypatch, DB_POOL_ENABLED="1")
@@ -0,0 +1,45 @@
+import pytest
+
+from api import slow_queries
+from api.models import SlowQueryLog
+
+from .factories import PostFactory
+
+
+@pytest.fixture
+def capture_inline(settings):
+    settings.SLOW_QUERY_LOG_ASYNC = False
+    settings.SLOW_QUERY_THRESHOLD_MS = 0
+    slow_queries._last_logged.clear()
+    yield
+    slow_queries._last_logged.clear()
+
+
+@pytest.mark.django_db
+def test_slow_queries_are_logged_with_plan(api_client, capture_inline):
+    PostFactory(context="hello world")
+
+    response = api_client.get("/api/search/posts/", {"q": "hello"})
+
+    assert response.status_code == 200
+    entries = SlowQueryLog.objects.filter(view="search-posts")
+    assert entries.exists()
+    select = next(e for e in entries if '"post"' in e.sql and "LIKE" in e.sql)
+    assert select.plan
+    assert "hello" in select.params
+
+
+@pytest.mark.django_db
+def test_slow_queries_are_rate_limited_per_fingerprint(api_client, capture_inline):
+    api_client.get("/api/search/posts/", {"q": "hello"})
+    first = SlowQueryLog.objects.count()
+
+    api_client.get("/api/search/posts/", {"q": "other"})
+
+    assert SlowQueryLog.objects.count() == first
+
+
+def test_fingerprint_ignores_literal_values():
+    assert slow_queries.fingerprint("SELECT 1 FROM post LIMIT 20") == slow_queries.fingerprint(
+        "SELECT 1 FROM post LIMIT 50"
+    )
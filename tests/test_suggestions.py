@@ -0,0 +1,91 @@
+import pytest
+from django.core.management import call_command
+
+from api.services import suggestions
+from follow.models import FollowSuggestion, FollowSuggestionQueue
+
+from .factories import FollowFactory, UserFactory
+
+
+def _graph(following, popular=(), counts=None, top_k=10):
+    return {
+        "following": following,
+        "popular": list(popular),
+        "follower_counts": counts or {},
+        "top_k": top_k,
+        "popularity_weight": 0.5,
+    }
+
+
+def test_score_user_ranks_two_hop_neighbours_by_mutual_count():
+    graph = _graph({1: {2, 3}, 2: {4, 5, 1}, 3: {4}}, popular=[9], counts={9: 5})
+
+    ranked = suggestions.score_user(1, graph)
+
+    assert [(row[0], row[2]) for row in ranked] == [(4, 2), (5, 1), (9, 0)]
+    assert all(row[0] not in (1, 2, 3) for row in ranked)
+
+
+def test_score_user_keeps_top_k():
+    graph = _graph({1: {2}, 2: {3, 4, 5}}, top_k=2)
+
+    assert [row[0] for row in suggestions.score_user(1, graph)] == [3, 4]
+
+
+@pytest.mark.django_db
+def test_follow_marks_user_dirty_and_refresh_stores_candidates(api_client, user, another_user):
+    friend_of_friend = UserFactory(username="fof")
+    FollowFactory(user=another_user, aim_user=friend_of_friend)
+    api_client.force_authenticate(user=user)
+
+    response = api_client.post("/api/follows/", {"aim_user_id": another_user.pk})
+    assert response.status_code == 201
+    assert FollowSuggestionQueue.objects.filter(user=user).exists()
+
+    call_command("refresh_follow_suggestions")
+
+    assert not FollowSuggestionQueue.objects.exists()
+    stored = FollowSuggestion.objects.get(user=user, suggested=friend_of_friend)
+    assert stored.mutual_count == 1
+
+    response = api_client.get("/api/users/suggestions/")
+    assert response.status_code == 200
+    assert response.data[0]["user_id"] == friend_of_friend.user_id
+
+
+@pytest.mark.django_db
+def test_suggestions_exclude_users_followed_after_refresh(api_client, user, another_user):
+    target = UserFactory(username="target")
+    FollowSuggestion.objects.create(user=user, suggested=target, score=2, mutual_count=2)
+    FollowSuggestion.objects.create(user=user, suggested=another_user, score=1, mutual_count=1)
+    FollowFactory(user=user, aim_user=target)
+    api_client.force_authenticate(user=user)
+
+    response = api_client.get("/api/users/suggestions/")
+
+    assert [row["user_id"] for row in response.data] == [another_user.user_id]
+
+
+@pytest.mark.django_db
+def test_suggestions_fall_back_to_popular_users(api_client, user):
+    popular = UserFactory(username="popular", stats={"follower_count": 10})
+    api_client.force_authenticate(user=user)
+
+    response = api_client.get("/api/users/suggestions/")
+
+    assert response.data[0]["user_id"] == popular.user_id
+    assert user.user_id not in [row["user_id"] for row in response.data]
+
+
+@pytest.mark.django_db
+def test_refresh_with_process_pool_matches_serial(user, another_user):
+    others = [UserFactory(username=f"other{i}") for i in range(3)]
+    FollowFactory(user=user, aim_user=another_user)
+    for other in others:
+        FollowFactory(user=another_user, aim_user=other)
+
+    suggestions.refresh_all()
+    serial = set(FollowSuggestion.objects.values_list("user_id", "suggested_id", "mutual_count"))
+    suggestions.refresh_all(workers=2)
+
+    assert set(FollowSuggestion.objects.values_list("user_id", "suggested_id", "mutual_count")) == serial
@@ -0,0 +1,91 @@
+import pytest
+
+from api import metrics, throttling
+
+from .factories import PostFactory, UserFactory
+
+RATES = {"like": "2/min", "unlike": "2/min", "follow": "1/min", "unfollow": "1/min", "auth": "2/min"}
+
+
+@pytest.fixture(autouse=True)
+def rates(settings):
+    settings.THROTTLE_RATES = RATES
+
+
+def test_parse_rate():
+    assert throttling.parse_rate("30/min") == (30, 0.5)
+    assert throttling.parse_rate("10/s") == (10, 10)
+
+
+@pytest.mark.django_db
+def test_like_create_is_limited_with_retry_after(api_client, user):
+    posts = PostFactory.create_batch(3, user=user)
+    api_client.force_authenticate(user=user)
+    for post in posts[:2]:
+        assert api_client.post("/api/likes/", {"post_id": post.post_id}).status_code == 201
+
+    response = api_client.post("/api/likes/", {"post_id": posts[2].post_id})
+    assert response.status_code == 429
+    # 2/min なので次の 1 トークンまで 30 秒
+    assert 0 < int(response["Retry-After"]) <= 30
+
+
+@pytest.mark.django_db
+def test_buckets_are_per_user_and_per_action(api_client, user, another_user):
+    posts = PostFactory.create_batch(3, user=user)
+    api_client.force_authenticate(user=user)
+    for post in posts[:2]:
+        api_client.post("/api/likes/", {"post_id": post.post_id})
+    assert api_client.post("/api/likes/", {"post_id": posts[2].post_id}).status_code == 429
+
+    # いいね解除とフォローは別バケット
+    like_id = api_client.get("/api/likes/", {"post_id": posts[0].post_id}).data[0]["id"]
+    assert api_client.delete(f"/api/likes/{like_id}/").status_code == 204
+    target = UserFactory(username="throttle-target")
+    assert api_client.post("/api/follows/", {"aim_user_id": target.user_id}).status_code == 201
+
+    api_client.force_authenticate(user=another_user)
+    assert api_client.post("/api/likes/", {"post_id": posts[2].post_id}).status_code == 201
+
+
+@pytest.mark.django_db
+def test_anonymous_auth_requests_are_limited_per_ip(api_client):
+    for _ in range(2):
+        assert api_client.post("/api/auth/google/", {}).status_code == 400
+    assert api_client.post("/api/auth/google/", {}).status_code == 429
+    # Apple 側も同じ auth スコープのバケット
+    assert api_client.post("/api/auth/apple/", {}).status_code == 429
+    assert api_client.post("/api/auth/google/", {}, REMOTE_ADDR="10.0.0.2").status_code == 400
+
+
+@pytest.mark.django_db
+def test_tokens_refill_over_time(api_client, user, monkeypatch):
+    now = [1000.0]
+    monkeypatch.setattr(throttling.time, "time", lambda: now[0])
+    posts = PostFactory.create_batch(3, user=user)
+    api_client.force_authenticate(user=user)
+    for post in posts[:2]:
+        api_client.post("/api/likes/", {"post_id": post.post_id})
+    assert api_client.post("/api/likes/", {"post_id": posts[2].post_id}).status_code == 429
+
+    now[0] += 30
+    assert api_client.post("/api/likes/", {"post_id": posts[2].post_id}).status_code == 201
+
+
+@pytest.mark.django_db
+def test_reads_are_not_throttled_and_rejections_are_counted(api_client, user):
+    api_client.force_authenticate(user=user)
+    targets = [UserFactory(username=f"throttle-target{i}") for i in range(2)]
+    assert api_client.post("/api/follows/", {"aim_user_id": targets[0].user_id}).status_code == 201
+    assert api_client.post("/api/follows/", {"aim_user_id": targets[1].user_id}).status_code == 429
+    for _ in range(3):
+        assert api_client.get("/api/follows/").status_code == 200
+
+    assert 'throttled_requests_total{scope="follow"}' in metrics.render([metrics.snapshot()])
+
+
+@pytest.mark.django_db
+def test_disabled_throttle_allows_everything(api_client, settings):
+    settings.THROTTLE_ENABLED = False
+    for _ in range(5):
+        assert api_client.post("/api/auth/google/", {}).status_code == 400
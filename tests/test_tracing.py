@@ -0,0 +1,72 @@
+import json
+
+import pytest
+
+from accounts.models import DeviceToken
+from api import tracing
+
+from .factories import PostFactory, UserFactory
+
+
+def test_span_is_noop_without_active_trace():
+    with tracing.span("orphan") as span:
+        assert span is None
+
+
+def test_spans_nest_through_contextvars(settings):
+    settings.TRACING_SLOW_THRESHOLD_MS = 10_000
+
+    with tracing.start_trace("root") as root:
+        with tracing.span("outer") as outer:
+            with tracing.span("inner") as inner:
+                pass
+
+    assert outer.parent_id == root.span_id
+    assert inner.parent_id == outer.span_id
+    assert [s.name for s in root.trace.spans] == ["root", "outer", "inner"]
+
+
+def test_to_otlp_builds_resource_spans():
+    with tracing.start_trace("root") as root:
+        with tracing.span("child", post_id=3):
+            pass
+
+    body = tracing.to_otlp(root.trace)
+    spans = body["resourceSpans"][0]["scopeSpans"][0]["spans"]
+    assert spans[1]["parentSpanId"] == spans[0]["spanId"]
+    assert spans[1]["attributes"] == [{"key": "post_id", "value": {"intValue": "3"}}]
+
+
+@pytest.mark.django_db
+def test_slow_like_request_is_exported_with_phase_spans(api_client, user, settings, tmp_path):
+    path = tmp_path / "traces.jsonl"
+    settings.TRACING_EXPORTER = "file"
+    settings.TRACING_FILE_PATH = str(path)
+    settings.TRACING_SLOW_THRESHOLD_MS = 0
+    post = PostFactory(user=UserFactory())
+    DeviceToken.objects.create(user=post.user, token="fcm-token", platform="ios")
+    api_client.force_authenticate(user=user)
+
+    response = api_client.post("/api/likes/", {"post_id": post.post_id})
+    tracing.flush()
+
+    assert response.status_code == 201
+    trace = json.loads(path.read_text().splitlines()[-1])
+    names = {span["name"] for span in trace["spans"]}
+    assert "POST like-list" in names
+    assert {"like.transaction", "like.stats", "user_stats.register_like"} <= names
+    assert "notifications.send_push_to_user" in names
+    assert "db.query" in names
+
+
+@pytest.mark.django_db
+def test_fast_requests_are_dropped_by_tail_sampling(api_client, settings, tmp_path):
+    path = tmp_path / "traces.jsonl"
+    settings.TRACING_EXPORTER = "file"
+    settings.TRACING_FILE_PATH = str(path)
+    settings.TRACING_SLOW_THRESHOLD_MS = 60_000
+
+    api_client.get("/api/timeline/")
+    tracing.flush()
+
+    assert not path.exists()
@@ -0,0 +1,87 @@
+from datetime import timedelta
+
+import pytest
+from django.utils import timezone
+
+from api.services import trending
+from post.models import Like, Post
+
+from .factories import LikeFactory, PostFactory
+
+
+@pytest.mark.django_db
+def test_like_and_unlike_update_trending_score(api_client, user, another_user):
+    post = PostFactory(user=another_user)
+    api_client.force_authenticate(user=user)
+
+    response = api_client.post("/api/likes/", {"post_id": post.post_id}, format="json")
+    assert response.status_code == 201
+    post.refresh_from_db()
+    assert post.trending_score == pytest.approx(1.0)
+
+    like = Like.objects.get(user=user, post=post)
+    api_client.delete(f"/api/likes/{like.id}/")
+    post.refresh_from_db()
+    assert post.trending_score == pytest.approx(0.0, abs=1e-3)
+
+
+@pytest.mark.django_db
+def test_unlike_removes_decayed_weight(settings, user):
+    settings.TRENDING_HALF_LIFE_HOURS = 6
+    liked_at = timezone.now() - timedelta(hours=6)
+    post = PostFactory(user=user, trending_score=2.0)
+
+    Post.objects.filter(pk=post.pk).update(**trending.on_unlike(liked_at))
+
+    post.refresh_from_db()
+    assert post.trending_score == pytest.approx(1.5, abs=1e-3)
+
+
+@pytest.mark.django_db
+def test_decay_halves_scores_per_half_life_and_drops_stale_posts(settings, user):
+    settings.TRENDING_HALF_LIFE_HOURS = 1
+    settings.TRENDING_MIN_SCORE = 0.5
+    hot = PostFactory(user=user, trending_score=8.0)
+    fading = PostFactory(user=user, trending_score=0.8)
+    cold = PostFactory(user=user, trending_score=0)
+
+    updated = trending.decay(3600, batch_size=1)
+
+    assert updated == 2
+    values = dict(Post.objects.values_list("post_id", "trending_score"))
+    assert values[hot.post_id] == pytest.approx(4.0)
+    assert values[fading.post_id] == 0
+    assert values[cold.post_id] == 0
+
+
+@pytest.mark.django_db
+def test_recompute_weights_likes_by_age(settings, user, another_user):
+    settings.TRENDING_HALF_LIFE_HOURS = 6
+    post = PostFactory(user=user)
+    like = LikeFactory(user=another_user, post=post)
+    Like.objects.filter(pk=like.pk).update(created_at=timezone.now() - timedelta(hours=12))
+
+    [recomputed] = trending.recompute([post])
+
+    assert recomputed.trending_score == pytest.approx(0.25, abs=1e-3)
+
+
+@pytest.mark.django_db
+def test_popular_pages_stay_consistent_across_decay(api_client, settings, user):
+    settings.TRENDING_HALF_LIFE_HOURS = 1
+    settings.TRENDING_MIN_SCORE = 0.01
+    scores = [100.0 - i for i in range(19)] + [80.0, 80.0, 70.0]
+    posts = [PostFactory(user=user, trending_score=score) for score in scores]
+
+    first = api_client.get("/api/timeline/", {"tab": "popular"})
+    trending.decay(3600)
+    second = api_client.get(first.data["next"])
+
+    seen = [post["post_id"] for post in first.data["results"] + second.data["results"]]
+    assert len(first.data["results"]) == 20
+    assert sorted(seen) == sorted(post.post_id for post in posts)
+    trending.decay(3600)
+    back = api_client.get(second.data["previous"])
+    assert [post["post_id"] for post in back.data["results"]] == [
+        post["post_id"] for post in first.data["results"]
+    ]
@@ -1,5 +1,8 @@
 import pytest
 
+from accounts.models import DeviceToken
+from api.services import notifications, profile_cache
+
 
 @pytest.mark.django_db
 def test_user_stats_auto_created(user):
@@ -24,6 +27,29 @@ def test_user_stats_level_up_and_experience(user):
     assert stats.last_level_up is not None
 
 
+@pytest.mark.django_db
+def test_level_up_notifies_through_signal(user, monkeypatch):
+    sent = []
+    monkeypatch.setattr(
+        notifications, "notify_level_up", lambda user_id, level, tokens: sent.append((user_id, level))
+    )
+    monkeypatch.setattr(notifications, "check_and_notify_user_level_ranking", lambda *args: None)
+    DeviceToken.objects.create(user=user, token="token-1", platform="ios")
+
+    user.stats.gain_experience(10)
+
+    assert sent == [(user.user_id, 2)]
+
+
+@pytest.mark.django_db
+def test_stats_save_bumps_profile_version(user):
+    before = profile_cache.get_versions([user.user_id])[user.user_id]
+
+    user.stats.register_post_created()
+
+    assert profile_cache.get_versions([user.user_id])[user.user_id] != before
+
+
 @pytest.mark.django_db
 def test_user_stats_counters_update(user):
     stats = user.stats